@@ -7,6 +7,7 @@ docker exec -it manufacturing-superset python /app/create-default-dashboard.py
 
 import os
 import json
+import hashlib
 from datetime import datetime
 from superset import db
 from superset.models.core import Database
@@ -14,47 +15,12 @@ from superset.connectors.sqla.models import SqlaTable
 from superset.models.slice import Slice
 from superset.models.dashboard import Dashboard
 
-def create_manufacturing_dashboard():
-    # Get the manufacturing database
-    manufacturing_db = db.session.query(Database).filter_by(
-        database_name='Manufacturing TimescaleDB'
-    ).first()
-    
-    if not manufacturing_db:
-        print("Manufacturing database not found!")
-        return None
-    
-    # Create datasets for all views
-    views = [
-        'dashboard_production_overview',
-        'dashboard_equipment_performance',
-        'dashboard_realtime_kpis'
-    ]
-    
-    tables = {}
-    for view_name in views:
-        table = db.session.query(SqlaTable).filter_by(
-            table_name=view_name,
-            database_id=manufacturing_db.id
-        ).first()
-        
-        if not table:
-            table = SqlaTable(
-                table_name=view_name,
-                database_id=manufacturing_db.id
-            )
-            db.session.add(table)
-            db.session.commit()
-            print(f"Created dataset: {view_name}")
-        tables[view_name] = table
-    
-    # Create charts
-    charts = []
-    
+# Charts of the default dashboard: (slice name, viz type, view, params)
+# The datasource is filled in once the view's dataset ID is known
+CHART_DEFINITIONS = [
     # 1. Production Trend Chart
-    production_chart_params = {
+    ("Production Trend - 24 Hours", 'line', 'dashboard_production_overview', {
         "viz_type": "line",
-        "datasource": f"{tables['dashboard_production_overview'].id}__table",
         "time_range": "Last 24 hours",
         "metrics": [{
             "expressionType": "SIMPLE",
@@ -75,20 +41,10 @@ def create_manufacturing_dashboard():
             },
             "aggregate": "SUM"
         }
-    }
-    
-    production_chart = create_or_get_slice(
-        "Production Trend - 24 Hours",
-        'line',
-        tables['dashboard_production_overview'].id,
-        production_chart_params
-    )
-    charts.append(production_chart)
-    
+    }),
     # 2. OEE Gauge Chart
-    oee_chart_params = {
+    ("Current OEE", 'big_number_total', 'dashboard_realtime_kpis', {
         "viz_type": "big_number_total",
-        "datasource": f"{tables['dashboard_realtime_kpis'].id}__table",
         "time_range": "Last hour",
         "metric": {
             "expressionType": "SIMPLE",
@@ -100,20 +56,10 @@ def create_manufacturing_dashboard():
             "label": "Current OEE %"
         },
         "subheader": "Overall Equipment Effectiveness"
-    }
-    
-    oee_chart = create_or_get_slice(
-        "Current OEE",
-        'big_number_total',
-        tables['dashboard_realtime_kpis'].id,
-        oee_chart_params
-    )
-    charts.append(oee_chart)
-    
+    }),
     # 3. Equipment Performance Table
-    equipment_chart_params = {
+    ("Equipment Performance", 'table', 'dashboard_equipment_performance', {
         "viz_type": "table",
-        "datasource": f"{tables['dashboard_equipment_performance'].id}__table",
         "time_range": "Last hour",
         "groupby": ["equipmentId", "plantCode"],
         "metrics": [
@@ -132,15 +78,72 @@ def create_manufacturing_dashboard():
         ],
         "table_timestamp_format": "%Y-%m-%d %H:%M",
         "page_length": 10
+    }),
+]
+
+def prefetch_tables(database_id):
+    """All datasets of a database, by table name, in one query"""
+    return {
+        table.table_name: table
+        for table in db.session.query(SqlaTable).filter_by(database_id=database_id).all()
+    }
+
+def prefetch_slices(names):
+    """All table slices with one of the given names, by name, in one query"""
+    return {
+        chart.slice_name: chart
+        for chart in db.session.query(Slice).filter(
+            Slice.slice_name.in_(list(names)),
+            Slice.datasource_type == 'table'
+        ).all()
     }
+
+def seed_catalog(database_id, chart_definitions):
+    """Stage every dataset and chart of a catalog in the current transaction
     
-    equipment_chart = create_or_get_slice(
-        "Equipment Performance",
-        'table',
-        tables['dashboard_equipment_performance'].id,
-        equipment_chart_params
-    )
-    charts.append(equipment_chart)
+    Existing objects are prefetched with one query per model instead of one
+    lookup per object, and new rows are flushed in one batch per level
+    (datasets, then the charts that need their IDs). Nothing is committed.
+    """
+    existing_tables = prefetch_tables(database_id)
+    existing_slices = prefetch_slices(name for name, _, _, _ in chart_definitions)
+    
+    tables = {}
+    for _, _, view_name, _ in chart_definitions:
+        if view_name in tables:
+            continue
+        table = existing_tables.get(view_name)
+        if not table:
+            table = SqlaTable(
+                table_name=view_name,
+                database_id=database_id
+            )
+            db.session.add(table)
+            print(f"Created dataset: {view_name}")
+        tables[view_name] = table
+    db.session.flush()
+    
+    charts = []
+    for name, viz_type, view_name, params in chart_definitions:
+        datasource_id = tables[view_name].id
+        params = dict(params, datasource=f"{datasource_id}__table")
+        charts.append(stage_slice(existing_slices.get(name), name, viz_type, datasource_id, params))
+    db.session.flush()
+    
+    return tables, charts
+
+def create_manufacturing_dashboard():
+    # Get the manufacturing database
+    manufacturing_db = db.session.query(Database).filter_by(
+        database_name='Manufacturing TimescaleDB'
+    ).first()
+    
+    if not manufacturing_db:
+        print("Manufacturing database not found!")
+        return None
+    
+    # Create datasets for all views and the charts on top of them
+    tables, charts = seed_catalog(manufacturing_db.id, CHART_DEFINITIONS)
     
     # Create dashboard
     dashboard_title = "Manufacturing Overview"
@@ -149,6 +152,7 @@ def create_manufacturing_dashboard():
     ).first()
     
     if existing_dashboard:
+        db.session.commit()
         print(f"Dashboard already exists with ID: {existing_dashboard.id}")
         return existing_dashboard.id
     
@@ -223,13 +227,25 @@ def create_manufacturing_dashboard():
     
     return dashboard.id
 
-def create_or_get_slice(name, viz_type, datasource_id, params):
-    """Create or get existing slice"""
-    existing_slice = db.session.query(Slice).filter_by(
-        slice_name=name
-    ).first()
-    
+def slice_fingerprint(viz_type, datasource_id, params):
+    """Content hash of the managed fields of a slice"""
+    if isinstance(params, str):
+        params = json.loads(params or '{}')
+    canonical = json.dumps(
+        {"viz_type": viz_type, "datasource_id": datasource_id, "params": params},
+        sort_keys=True
+    )
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def stage_slice(existing_slice, name, viz_type, datasource_id, params):
+    """Add a new slice, or update an existing one whose spec changed, without committing"""
     if existing_slice:
+        current = slice_fingerprint(existing_slice.viz_type, existing_slice.datasource_id, existing_slice.params)
+        if current != slice_fingerprint(viz_type, datasource_id, params):
+            existing_slice.viz_type = viz_type
+            existing_slice.datasource_id = datasource_id
+            existing_slice.params = json.dumps(params)
+            print(f"Updated chart: {name}")
         return existing_slice
     
     chart = Slice(
@@ -240,10 +256,20 @@ def create_or_get_slice(name, viz_type, datasource_id, params):
         params=json.dumps(params)
     )
     db.session.add(chart)
-    db.session.commit()
     print(f"Created chart: {name}")
     return chart
 
+def create_or_get_slice(name, viz_type, datasource_id, params):
+    """Create a slice, or update the existing one if its spec changed"""
+    existing_slice = db.session.query(Slice).filter_by(
+        slice_name=name,
+        datasource_type='table'
+    ).first()
+    
+    chart = stage_slice(existing_slice, name, viz_type, datasource_id, params)
+    db.session.commit()
+    return chart
+
 if __name__ == "__main__":
     try:
         dashboard_id = create_manufacturing_dashboard()
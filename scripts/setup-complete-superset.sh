@@ -212,9 +212,9 @@ else
     exit 1
 fi
 
-# Copy dashboard creation script to container
-print_status "Copying dashboard creation script..."
-docker cp scripts/superset/automated-dashboard-creator.py $SUPERSET_CONTAINER:/tmp/
+# Copy dashboard creation scripts to container
+print_status "Copying dashboard creation scripts..."
+docker cp scripts/superset/. $SUPERSET_CONTAINER:/tmp/superset-provisioning/
 
 # Install required Python packages in container
 print_status "Installing required packages in Superset container..."
@@ -222,7 +222,7 @@ docker exec $SUPERSET_CONTAINER pip install requests
 
 # Run dashboard creation script
 print_status "Creating manufacturing dashboards..."
-docker exec $SUPERSET_CONTAINER python /tmp/automated-dashboard-creator.py
+docker exec $SUPERSET_CONTAINER python /tmp/superset-provisioning/automated-dashboard-creator.py --concurrency 8
 
 # Get dashboard IDs from container
 if docker exec $SUPERSET_CONTAINER test -f /tmp/dashboard_ids.json; then
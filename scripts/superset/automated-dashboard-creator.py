@@ -6,75 +6,110 @@ Creates comprehensive manufacturing dashboards with real data integration
 
 import os
 import sys
+import argparse
 import json
 import requests
 import time
 from datetime import datetime, timedelta
+from pathlib import Path
 from typing import Dict, List, Optional, Any
 
+from cache_policy import dataset_cache_timeout
+from dashboard_compiler import SpecError, load_specs, render_position
+from dashboard_bundle import DATABASE_NAME, REPLICA_DATABASE_NAME, DashboardBundle, manufacturing_sqlalchemy_uri
+from dashboard_sync import DashboardSync
+from dataset_registry import DatasetRegistry
+from dataset_schema import DatasetSchemaCache, validate_charts
+from instrumentation import Instrumentation
+from provisioning_engine import ProvisioningGraph
+from provisioning_journal import ProvisioningJournal, default_journal_path
+from superset_api import fingerprint, list_all, saved_query_context
+from superset_auth import DEFAULT_CACHE_DIR, TokenManager
+from superset_transport import SupersetTransport
+
+# Dashboard definitions compiled from the specs in ./dashboards: the datasets
+# each dashboard needs, and the charts built on top of them in layout order
+DASHBOARD_SPECS: List[Dict[str, Any]] = load_specs()
+
+DASHBOARD_SPECS_BY_KEY: Dict[str, Dict[str, Any]] = {spec["key"]: spec for spec in DASHBOARD_SPECS}
+
 class SupersetDashboardCreator:
-    def __init__(self, base_url: str = "http://localhost:8088", username: str = "admin", password: str = "admin"):
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8088",
+        username: str = "admin",
+        password: str = "admin",
+        specs: Optional[List[Dict[str, Any]]] = None,
+        pool_size: int = 10,
+        timeout: float = 60,
+        max_retries: int = 4,
+        token_cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+        journal_path: Optional[Path] = None,
+        instrumentation: Optional[Instrumentation] = None,
+        database_name: str = DATABASE_NAME
+    ):
         self.base_url = base_url
+        # Datasets (and so every chart query and cache warm-up) go to this connection
+        self.database_name = database_name
         self.username = username
         self.password = password
-        self.session = requests.Session()
+        self.session = SupersetTransport(pool_size=pool_size, timeout=(5, timeout), max_retries=max_retries)
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+        self.instrumentation.transport = self.session.metrics
         self.csrf_token = None
         self.access_token = None
+        self.auth = TokenManager(
+            self.session, self.base_url, username, password,
+            cache_dir=token_cache_dir, instrumentation=self.instrumentation
+        )
+        self.datasets = DatasetRegistry(self.session, self.base_url)
+        self.schemas = DatasetSchemaCache(self.session, self.base_url)
+        self.specs = specs if specs is not None else DASHBOARD_SPECS
+        self.journal = ProvisioningJournal(journal_path) if journal_path is not None else None
         
     def authenticate(self) -> bool:
-        """Authenticate with Superset and get access token"""
+        """Authenticate with Superset, reusing cached tokens when they are still valid"""
         try:
-            # Get CSRF token
-            csrf_response = self.session.get(f"{self.base_url}/api/v1/security/csrf_token/")
-            if csrf_response.status_code == 200:
-                self.csrf_token = csrf_response.json()["result"]
-                self.session.headers.update({"X-CSRFToken": self.csrf_token})
-            
-            # Login
-            login_data = {
-                "username": self.username,
-                "password": self.password,
-                "provider": "db",
-                "refresh": True
-            }
-            
-            login_response = self.session.post(
-                f"{self.base_url}/api/v1/security/login",
-                json=login_data
-            )
-            
-            if login_response.status_code == 200:
-                self.access_token = login_response.json()["access_token"]
-                self.session.headers.update({"Authorization": f"Bearer {self.access_token}"})
-                print("✅ Authentication successful")
-                return True
-            else:
-                print(f"❌ Authentication failed: {login_response.text}")
+            if not self.auth.authenticate():
                 return False
+            self.csrf_token = self.auth.csrf_token
+            self.access_token = self.auth.access_token
+            self.session.token_manager = self.auth
+            print("✅ Authentication successful" + (" (cached token)" if not self.auth.logins else ""))
+            return True
                 
         except Exception as e:
             print(f"❌ Authentication error: {str(e)}")
             return False
     
-    def wait_for_superset(self, max_retries: int = 30) -> bool:
-        """Wait for Superset to be ready"""
-        for i in range(max_retries):
+    def wait_for_superset(self, max_wait: float = 300, initial_interval: float = 0.25, max_interval: float = 10) -> bool:
+        """Wait for Superset to be ready, polling quickly at first and backing off to max_interval"""
+        deadline = time.monotonic() + max_wait
+        interval = initial_interval
+        attempt = 0
+        while True:
+            attempt += 1
             try:
-                response = self.session.get(f"{self.base_url}/health")
+                response = self.session.get(f"{self.base_url}/health", timeout=(2, 5), retries=0)
                 if response.status_code == 200:
                     print("✅ Superset is ready")
                     return True
-            except:
+            except requests.RequestException:
                 pass
             
-            print(f"⏳ Waiting for Superset... ({i+1}/{max_retries})")
-            time.sleep(10)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            print(f"⏳ Waiting for Superset... (attempt {attempt}, next check in {interval:.2f}s)")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
         
         print("❌ Superset failed to start")
         return False
     
-    def get_database_id(self, database_name: str = "Manufacturing TimescaleDB") -> Optional[int]:
-        """Get database ID by name"""
+    def get_database_id(self, database_name: Optional[str] = None) -> Optional[int]:
+        """Get database ID by name (default: the connection the dashboards are provisioned on)"""
+        database_name = database_name or self.database_name
         try:
             response = self.session.get(f"{self.base_url}/api/v1/database/")
             if response.status_code == 200:
@@ -88,6 +123,56 @@ class SupersetDashboardCreator:
             return None
     
     def create_dataset(self, table_name: str, database_id: int) -> Optional[int]:
+        """Resolve a table/view to a dataset, creating it only if it is not registered yet"""
+        with self.instrumentation.span("dataset") as span:
+            dataset_id = self.datasets.resolve(
+                database_id, "public", table_name,
+                create=lambda: self._journaled(
+                    "dataset", table_name,
+                    {"database": database_id, "table_name": table_name, "schema": "public"},
+                    lambda: self._post_dataset(table_name, database_id)
+                )
+            )
+            if dataset_id:
+                self.apply_cache_policy(dataset_id, table_name, database_id)
+            span.ok = bool(dataset_id)
+        return dataset_id
+    
+    def apply_cache_policy(self, dataset_id: int, table_name: str, database_id: int) -> None:
+        """Set the dataset's cache_timeout from its freshness tier, if it is not set already"""
+        cache_timeout = dataset_cache_timeout(table_name)
+        key = (database_id, "public", table_name)
+        if cache_timeout is None or self.datasets.cache_timeouts.get(key) == cache_timeout:
+            return
+        try:
+            response = self.session.put(
+                f"{self.base_url}/api/v1/dataset/{dataset_id}",
+                json={"cache_timeout": cache_timeout}
+            )
+            if response.status_code == 200:
+                self.datasets.cache_timeouts[key] = cache_timeout
+                print(f"⏱️ Cache timeout of {table_name}: {cache_timeout}s")
+            else:
+                print(f"⚠️ Failed to set cache timeout of {table_name}: {response.text}")
+        except Exception as e:
+            print(f"⚠️ Error setting cache timeout of {table_name}: {str(e)}")
+    
+    def _journaled(self, kind: str, name: str, payload: Dict[str, Any], create) -> Optional[int]:
+        """Reuse an object an interrupted run already created from the same payload, else create and journal it"""
+        if self.journal is None:
+            return create()
+        spec_hash = fingerprint(payload)
+        object_id = self.journal.lookup(kind, name, spec_hash)
+        if object_id:
+            print(f"⏭️ Resumed {kind}: {name} (ID: {object_id})")
+            self.instrumentation.count("journal_resumed", kind=kind)
+            return object_id
+        object_id = create()
+        if object_id:
+            self.journal.record(kind, name, object_id, spec_hash)
+        return object_id
+    
+    def _post_dataset(self, table_name: str, database_id: int) -> Optional[int]:
         """Create a dataset from a table/view"""
         try:
             dataset_data = {
@@ -115,6 +200,14 @@ class SupersetDashboardCreator:
     
     def create_chart(self, chart_config: Dict[str, Any]) -> Optional[int]:
         """Create a chart with given configuration"""
+        with self.instrumentation.span("chart") as span:
+            chart_id = self._journaled(
+                "chart", chart_config["slice_name"], chart_config, lambda: self._post_chart(chart_config)
+            )
+            span.ok = bool(chart_id)
+        return chart_id
+    
+    def _post_chart(self, chart_config: Dict[str, Any]) -> Optional[int]:
         try:
             response = self.session.post(
                 f"{self.base_url}/api/v1/chart/",
@@ -135,6 +228,14 @@ class SupersetDashboardCreator:
     
     def create_dashboard(self, dashboard_config: Dict[str, Any]) -> Optional[int]:
         """Create a dashboard with given configuration"""
+        with self.instrumentation.span("dashboard") as span:
+            dashboard_id = self._journaled(
+                "dashboard", dashboard_config["slug"], dashboard_config, lambda: self._post_dashboard(dashboard_config)
+            )
+            span.ok = bool(dashboard_id)
+        return dashboard_id
+    
+    def _post_dashboard(self, dashboard_config: Dict[str, Any]) -> Optional[int]:
         try:
             response = self.session.post(
                 f"{self.base_url}/api/v1/dashboard/",
@@ -153,21 +254,38 @@ class SupersetDashboardCreator:
             print(f"❌ Error creating dashboard {dashboard_config['dashboard_title']}: {str(e)}")
             return None
     
-    def create_manufacturing_overview_dashboard(self, database_id: int) -> Optional[int]:
-        """Create the main manufacturing overview dashboard"""
+    def chart_config(self, chart_spec: Dict[str, Any], dataset_id: int) -> Dict[str, Any]:
+        """Build the chart POST payload for a compiled chart spec bound to a dataset"""
+        return {
+            "slice_name": chart_spec["slice_name"],
+            "viz_type": chart_spec["viz_type"],
+            "datasource_id": dataset_id,
+            "datasource_type": "table",
+            "params": chart_spec["params_json"],
+            "query_context": saved_query_context(chart_spec, dataset_id),
+            "query_context_generation": True,
+            "cache_timeout": chart_spec.get("cache_timeout")
+        }
+    
+    def dashboard_config(self, spec: Dict[str, Any], chart_ids: Dict[str, int]) -> Dict[str, Any]:
+        """Build the dashboard POST payload from a compiled spec and its chart IDs by slice_name"""
+        dashboard_config = {
+            "dashboard_title": spec["dashboard_title"],
+            "slug": spec["slug"],
+            "position_json": json.dumps(render_position(spec, chart_ids))
+        }
+        if "css" in spec:
+            dashboard_config["css"] = spec["css"]
+        if "json_metadata" in spec:
+            dashboard_config["json_metadata"] = json.dumps(spec["json_metadata"])
+        return dashboard_config
+    
+    def build_dashboard(self, spec: Dict[str, Any], database_id: int) -> Optional[int]:
+        """Create the datasets, charts and dashboard described by a spec, one call at a time"""
         
         # Create datasets
         datasets = {}
-        dataset_views = [
-            "v_realtime_production",
-            "v_equipment_status", 
-            "v_oee_hourly_trend",
-            "v_quality_metrics",
-            "v_kpi_summary",
-            "v_downtime_analysis"
-        ]
-        
-        for view in dataset_views:
+        for view in spec["datasets"]:
             dataset_id = self.create_dataset(view, database_id)
             if dataset_id:
                 datasets[view] = dataset_id
@@ -176,336 +294,210 @@ class SupersetDashboardCreator:
             print("❌ No datasets created, cannot create dashboard")
             return None
         
-        # Chart configurations
-        charts = []
-        
-        # 1. OEE Gauge
-        if "v_kpi_summary" in datasets:
-            oee_chart = {
-                "slice_name": "Current OEE",
-                "viz_type": "gauge_chart",
-                "datasource_id": datasets["v_kpi_summary"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metric": "oee",
-                    "groupby": [],
-                    "min_val": 0,
-                    "max_val": 100,
-                    "value_color": "green"
-                })
-            }
-            chart_id = self.create_chart(oee_chart)
-            if chart_id:
-                charts.append({
-                    "id": chart_id,
-                    "type": "CHART",
-                    "meta": {"width": 4, "height": 4}
-                })
-        
-        # 2. Production Trend
-        if "v_realtime_production" in datasets:
-            production_chart = {
-                "slice_name": "Production Trend",
-                "viz_type": "line",
-                "datasource_id": datasets["v_realtime_production"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": ["production_count"],
-                    "groupby": ["timestamp"],
-                    "granularity_sqla": "timestamp",
-                    "time_range": "Last 24 hours"
-                })
-            }
-            chart_id = self.create_chart(production_chart)
+        chart_ids = {}
+        for chart_spec in spec["charts"]:
+            if chart_spec["dataset"] not in datasets:
+                continue
+            chart_id = self.create_chart(self.chart_config(chart_spec, datasets[chart_spec["dataset"]]))
             if chart_id:
-                charts.append({
-                    "id": chart_id,
-                    "type": "CHART", 
-                    "meta": {"width": 8, "height": 4}
-                })
-        
-        # 3. Equipment Status Table
-        if "v_equipment_status" in datasets:
-            equipment_chart = {
-                "slice_name": "Equipment Status",
-                "viz_type": "table",
-                "datasource_id": datasets["v_equipment_status"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": [],
-                    "groupby": ["equipment_name", "status", "availability", "last_maintenance"],
-                    "row_limit": 10
-                })
-            }
-            chart_id = self.create_chart(equipment_chart)
-            if chart_id:
-                charts.append({
-                    "id": chart_id,
-                    "type": "CHART",
-                    "meta": {"width": 6, "height": 5}
-                })
-        
-        # 4. Quality Metrics
-        if "v_quality_metrics" in datasets:
-            quality_chart = {
-                "slice_name": "Quality Metrics",
-                "viz_type": "big_number_total",
-                "datasource_id": datasets["v_quality_metrics"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metric": "first_pass_yield",
-                    "granularity_sqla": "timestamp"
-                })
-            }
-            chart_id = self.create_chart(quality_chart)
-            if chart_id:
-                charts.append({
-                    "id": chart_id,
-                    "type": "CHART",
-                    "meta": {"width": 6, "height": 3}
-                })
+                chart_ids[chart_spec["slice_name"]] = chart_id
         
         # Create dashboard
-        if charts:
-            dashboard_config = {
-                "dashboard_title": "Manufacturing Overview",
-                "slug": "manufacturing-overview",
-                "position_json": json.dumps({
-                    "CHART-" + str(chart["id"]): {
-                        "id": "CHART-" + str(chart["id"]),
-                        "type": chart["type"],
-                        "children": [],
-                        "meta": {
-                            "chartId": chart["id"],
-                            "width": chart["meta"]["width"],
-                            "height": chart["meta"]["height"]
-                        }
-                    } for chart in charts
-                }),
-                "css": "",
-                "json_metadata": json.dumps({
-                    "refresh_frequency": 30,
-                    "timed_refresh_immune_slices": [],
-                    "default_filters": {}
-                })
-            }
-            
-            return self.create_dashboard(dashboard_config)
+        if chart_ids:
+            return self.create_dashboard(self.dashboard_config(spec, chart_ids))
         
         return None
     
+    def create_manufacturing_overview_dashboard(self, database_id: int) -> Optional[int]:
+        """Create the main manufacturing overview dashboard"""
+        return self.build_dashboard(DASHBOARD_SPECS_BY_KEY["overview"], database_id)
+    
     def create_production_dashboard(self, database_id: int) -> Optional[int]:
         """Create production-specific dashboard"""
-        
-        # Create datasets
-        datasets = {}
-        dataset_views = ["v_realtime_production", "v_shift_performance"]
-        
-        for view in dataset_views:
-            dataset_id = self.create_dataset(view, database_id)
-            if dataset_id:
-                datasets[view] = dataset_id
-        
-        charts = []
-        
-        # Production volume chart
-        if "v_realtime_production" in datasets:
-            volume_chart = {
-                "slice_name": "Production Volume",
-                "viz_type": "area",
-                "datasource_id": datasets["v_realtime_production"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": ["production_count", "target_count"],
-                    "groupby": ["timestamp"],
-                    "granularity_sqla": "timestamp"
-                })
-            }
-            chart_id = self.create_chart(volume_chart)
-            if chart_id:
-                charts.append({"id": chart_id, "type": "CHART", "meta": {"width": 12, "height": 6}})
-        
-        # Shift performance
-        if "v_shift_performance" in datasets:
-            shift_chart = {
-                "slice_name": "Shift Performance",
-                "viz_type": "bar",
-                "datasource_id": datasets["v_shift_performance"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": ["shift_oee"],
-                    "groupby": ["shift_name"]
-                })
-            }
-            chart_id = self.create_chart(shift_chart)
-            if chart_id:
-                charts.append({"id": chart_id, "type": "CHART", "meta": {"width": 6, "height": 4}})
-        
-        # Create dashboard
-        if charts:
-            dashboard_config = {
-                "dashboard_title": "Production Metrics",
-                "slug": "production-metrics",
-                "position_json": json.dumps({
-                    "CHART-" + str(chart["id"]): {
-                        "id": "CHART-" + str(chart["id"]),
-                        "type": chart["type"],
-                        "children": [],
-                        "meta": {
-                            "chartId": chart["id"],
-                            "width": chart["meta"]["width"],
-                            "height": chart["meta"]["height"]
-                        }
-                    } for chart in charts
-                })
-            }
-            
-            return self.create_dashboard(dashboard_config)
-        
-        return None
+        return self.build_dashboard(DASHBOARD_SPECS_BY_KEY["production"], database_id)
     
     def create_quality_dashboard(self, database_id: int) -> Optional[int]:
         """Create quality-specific dashboard"""
-        
-        # Create datasets
-        datasets = {}
-        dataset_views = ["v_quality_metrics", "v_scrap_analysis"]
-        
-        for view in dataset_views:
-            dataset_id = self.create_dataset(view, database_id)
-            if dataset_id:
-                datasets[view] = dataset_id
-        
-        charts = []
-        
-        # Quality trend
-        if "v_quality_metrics" in datasets:
-            quality_chart = {
-                "slice_name": "Quality Trend",
-                "viz_type": "line",
-                "datasource_id": datasets["v_quality_metrics"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": ["first_pass_yield", "defect_rate"],
-                    "groupby": ["timestamp"],
-                    "granularity_sqla": "timestamp"
-                })
-            }
-            chart_id = self.create_chart(quality_chart)
-            if chart_id:
-                charts.append({"id": chart_id, "type": "CHART", "meta": {"width": 8, "height": 5}})
-        
-        # Scrap analysis
-        if "v_scrap_analysis" in datasets:
-            scrap_chart = {
-                "slice_name": "Scrap by Reason",
-                "viz_type": "pie",
-                "datasource_id": datasets["v_scrap_analysis"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": ["scrap_cost"],
-                    "groupby": ["scrap_reason"]
-                })
-            }
-            chart_id = self.create_chart(scrap_chart)
-            if chart_id:
-                charts.append({"id": chart_id, "type": "CHART", "meta": {"width": 4, "height": 5}})
-        
-        # Create dashboard
-        if charts:
-            dashboard_config = {
-                "dashboard_title": "Quality Analytics",
-                "slug": "quality-analytics",
-                "position_json": json.dumps({
-                    "CHART-" + str(chart["id"]): {
-                        "id": "CHART-" + str(chart["id"]),
-                        "type": chart["type"],
-                        "children": [],
-                        "meta": {
-                            "chartId": chart["id"],
-                            "width": chart["meta"]["width"],
-                            "height": chart["meta"]["height"]
-                        }
-                    } for chart in charts
-                })
-            }
-            
-            return self.create_dashboard(dashboard_config)
-        
-        return None
+        return self.build_dashboard(DASHBOARD_SPECS_BY_KEY["quality"], database_id)
     
     def create_equipment_dashboard(self, database_id: int) -> Optional[int]:
         """Create equipment-specific dashboard"""
-        
-        # Create datasets
-        datasets = {}
-        dataset_views = ["v_equipment_status", "v_downtime_analysis", "v_oee_hourly_trend"]
-        
-        for view in dataset_views:
-            dataset_id = self.create_dataset(view, database_id)
-            if dataset_id:
-                datasets[view] = dataset_id
-        
-        charts = []
-        
-        # Equipment OEE heatmap
-        if "v_oee_hourly_trend" in datasets:
-            oee_chart = {
-                "slice_name": "OEE by Equipment",
-                "viz_type": "heatmap",
-                "datasource_id": datasets["v_oee_hourly_trend"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": ["oee_score"],
-                    "groupby": ["equipment_name"],
-                    "columns": ["hour_of_day"]
-                })
-            }
-            chart_id = self.create_chart(oee_chart)
-            if chart_id:
-                charts.append({"id": chart_id, "type": "CHART", "meta": {"width": 8, "height": 6}})
-        
-        # Downtime analysis
-        if "v_downtime_analysis" in datasets:
-            downtime_chart = {
-                "slice_name": "Downtime by Reason",
-                "viz_type": "bar",
-                "datasource_id": datasets["v_downtime_analysis"],
-                "datasource_type": "table",
-                "params": json.dumps({
-                    "metrics": ["total_downtime_hours"],
-                    "groupby": ["downtime_reason"]
-                })
+        return self.build_dashboard(DASHBOARD_SPECS_BY_KEY["equipment"], database_id)
+    
+    def validate_specs(self, database_id: int, concurrency: int = 8) -> List[str]:
+        """Check every chart against the columns of its view and print one report of all mismatches"""
+        with self.instrumentation.span("validate"):
+            report = validate_charts(self.schemas, self.specs, database_id, max_workers=concurrency)
+        self.instrumentation.count("validation_problems", len(report))
+        if report:
+            print(f"⚠️ Pre-flight validation found {len(report)} problem(s):")
+            for problem in report:
+                print(f"   - {problem}")
+        else:
+            print(f"✅ Pre-flight validation passed ({self.schemas.fetches} views described)")
+        return report
+    
+    def import_all_dashboards(self, database_id: int, password: Optional[str] = None) -> Dict[str, Optional[int]]:
+        """Provision every dashboard with a single ZIP bundle import instead of per-object calls
+
+        The import overwrites each dataset's columns with those in the bundle, so
+        the views are described first; a dataset whose view could not be
+        described is refreshed from the database after the import instead.
+        """
+        views = sorted({view for spec in self.specs for view in spec["datasets"]})
+        self.schemas.prefetch(database_id, "public", views)
+        bundle = DashboardBundle(
+            self.specs, self.database_name,
+            manufacturing_sqlalchemy_uri(replica=self.database_name == REPLICA_DATABASE_NAME),
+            columns={view: self.schemas.columns(database_id, "public", view) for view in views}
+        )
+        try:
+            adopted = bundle.adopt_existing(self.session, self.base_url, database_id)
+            print(f"📦 Rendering import bundle ({adopted} existing objects adopted)")
+            
+            response = self.session.post(
+                f"{self.base_url}/api/v1/dashboard/import/",
+                files={"formData": ("manufacturing_dashboards.zip", bundle.render(), "application/zip")},
+                data={
+                    "overwrite": "true",
+                    "passwords": json.dumps(bundle.passwords(password))
+                }
+            )
+            if response.status_code != 200:
+                print(f"❌ Failed to import dashboard bundle: {response.text}")
+                return {}
+            print("✅ Imported dashboard bundle")
+            
+            undescribed = bundle.undescribed_views()
+            if undescribed and not self.refresh_datasets(database_id, undescribed):
+                return {}
+            
+            # The import drops the query_context of every chart, as its datasource IDs may be stale
+            if not self.save_query_contexts(database_id):
+                return {}
+            
+            ids_by_slug = {
+                dashboard["slug"]: dashboard["id"]
+                for dashboard in list_all(self.session, self.base_url, "dashboard", columns=["id", "slug"])
             }
-            chart_id = self.create_chart(downtime_chart)
-            if chart_id:
-                charts.append({"id": chart_id, "type": "CHART", "meta": {"width": 4, "height": 6}})
+            return {spec["key"]: ids_by_slug.get(spec["slug"]) for spec in self.specs}
         
-        # Create dashboard
-        if charts:
-            dashboard_config = {
-                "dashboard_title": "Equipment Performance",
-                "slug": "equipment-performance",
-                "position_json": json.dumps({
-                    "CHART-" + str(chart["id"]): {
-                        "id": "CHART-" + str(chart["id"]),
-                        "type": chart["type"],
-                        "children": [],
-                        "meta": {
-                            "chartId": chart["id"],
-                            "width": chart["meta"]["width"],
-                            "height": chart["meta"]["height"]
-                        }
-                    } for chart in charts
-                })
-            }
+        except Exception as e:
+            print(f"❌ Error importing dashboard bundle: {str(e)}")
+            return {}
+    
+    def refresh_datasets(self, database_id: int, table_names: List[str]) -> bool:
+        """Re-read the columns of the given datasets from the database (PUT /api/v1/dataset/<id>/refresh)"""
+        datasets = list_all(
+            self.session, self.base_url, "dataset",
+            columns=["id", "table_name"],
+            filters=f"(col:database,opr:rel_o_m,value:{database_id})"
+        )
+        ok = True
+        for dataset in datasets:
+            if dataset["table_name"] not in table_names:
+                continue
+            response = self.session.put(f"{self.base_url}/api/v1/dataset/{dataset['id']}/refresh")
+            if response.status_code == 200:
+                print(f"🔄 Refreshed the columns of {dataset['table_name']}")
+            else:
+                print(f"❌ Failed to refresh the columns of {dataset['table_name']}: {response.text}")
+                ok = False
+        return ok
+    
+    def save_query_contexts(self, database_id: int) -> bool:
+        """Save the query_context of every imported chart, which the cache warm-up runs them from"""
+        dataset_ids = {
+            dataset["table_name"]: dataset["id"]
+            for dataset in list_all(
+                self.session, self.base_url, "dataset",
+                columns=["id", "table_name"],
+                filters=f"(col:database,opr:rel_o_m,value:{database_id})"
+            )
+        }
+        chart_ids = {
+            chart["slice_name"]: chart["id"]
+            for chart in list_all(self.session, self.base_url, "chart", columns=["id", "slice_name"])
+        }
+        ok = True
+        for spec in self.specs:
+            for chart_spec in spec["charts"]:
+                chart_id = chart_ids.get(chart_spec["slice_name"])
+                dataset_id = dataset_ids.get(chart_spec["dataset"])
+                if chart_id is None or dataset_id is None:
+                    continue
+                response = self.session.put(
+                    f"{self.base_url}/api/v1/chart/{chart_id}",
+                    json={
+                        "query_context": saved_query_context(chart_spec, dataset_id),
+                        "query_context_generation": True,
+                    }
+                )
+                if response.status_code != 200:
+                    print(f"❌ Failed to save the query context of {chart_spec['slice_name']}: {response.text}")
+                    ok = False
+        return ok
+    
+    def build_provisioning_graph(self, database_id: int, specs: List[Dict[str, Any]]) -> ProvisioningGraph:
+        """Build the datasets -> charts -> dashboard dependency graph for the given specs"""
+        graph = ProvisioningGraph()
+        
+        for spec in specs:
+            for view in spec["datasets"]:
+                key = f"dataset:{view}"
+                if key not in graph:
+                    graph.add(key, lambda deps, view=view: self.create_dataset(view, database_id))
+        
+        for spec in specs:
+            chart_keys = []
+            for index, chart_spec in enumerate(spec["charts"]):
+                if chart_spec["dataset"] not in spec["datasets"]:
+                    continue
+                dataset_key = f"dataset:{chart_spec['dataset']}"
+                chart_key = f"chart:{spec['key']}:{index}"
+                
+                def create(deps, chart_spec=chart_spec, dataset_key=dataset_key):
+                    if not deps[dataset_key]:
+                        return None
+                    return self.create_chart(self.chart_config(chart_spec, deps[dataset_key]))
+                
+                graph.add(chart_key, create, deps=[dataset_key])
+                chart_keys.append((chart_key, chart_spec))
+            
+            def create_dashboard(deps, spec=spec, chart_keys=chart_keys):
+                chart_ids = {
+                    chart_spec["slice_name"]: deps[chart_key]
+                    for chart_key, chart_spec in chart_keys if deps[chart_key]
+                }
+                if not chart_ids:
+                    return None
+                return self.create_dashboard(self.dashboard_config(spec, chart_ids))
             
-            return self.create_dashboard(dashboard_config)
+            graph.add(f"dashboard:{spec['key']}", create_dashboard, deps=[key for key, _ in chart_keys])
         
-        return None
+        return graph
     
-    def create_all_dashboards(self) -> Dict[str, Optional[int]]:
-        """Create all manufacturing dashboards"""
+    def create_all_dashboards(
+        self,
+        concurrency: int = 1,
+        sync: bool = False,
+        prune: bool = False,
+        import_bundle: bool = False,
+        validate: str = "strict"
+    ) -> Dict[str, Optional[int]]:
+        """Create all manufacturing dashboards
+        
+        With concurrency > 1 the datasets, charts and dashboards are created
+        from a dependency graph, running independent calls in parallel.
+        With sync the current state is diffed against the specs and only the
+        changed charts/dashboards are written (prune also deletes stale charts).
+        With import_bundle everything is uploaded as one Superset import ZIP.
+        When a journal is configured, every created object is checkpointed and
+        a run that died half-way is resumed instead of repeated.
+        validate ("strict", "warn" or "off") checks every chart against its
+        view's columns first; strict (the default) aborts before anything is
+        created, warn only reports the mismatches.
+        """
         
         print("🚀 Starting Superset dashboard creation...")
         
@@ -520,25 +512,44 @@ class SupersetDashboardCreator:
         # Get database ID
         database_id = self.get_database_id()
         if not database_id:
-            print("❌ Manufacturing database not found")
+            print(f"❌ Database '{self.database_name}' not found")
             return {}
         
-        print(f"✅ Found Manufacturing database (ID: {database_id})")
+        print(f"✅ Found database '{self.database_name}' (ID: {database_id})")
+        
+        if validate != "off":
+            report = self.validate_specs(database_id, concurrency=max(concurrency, 1))
+            if report and validate == "strict":
+                print("❌ Aborting: fix the chart specs or rerun with --validate warn")
+                return {}
         
         # Create dashboards
         dashboards = {}
         
-        print("\n📊 Creating Manufacturing Overview Dashboard...")
-        dashboards["overview"] = self.create_manufacturing_overview_dashboard(database_id)
-        
-        print("\n🏭 Creating Production Dashboard...")
-        dashboards["production"] = self.create_production_dashboard(database_id)
-        
-        print("\n✅ Creating Quality Dashboard...")
-        dashboards["quality"] = self.create_quality_dashboard(database_id)
-        
-        print("\n⚙️ Creating Equipment Dashboard...")
-        dashboards["equipment"] = self.create_equipment_dashboard(database_id)
+        journal = self.journal if not import_bundle else None
+        if journal is not None:
+            journal.begin()
+        
+        dashboard_sync = None
+        if import_bundle:
+            with self.instrumentation.span("bundle_import") as span:
+                dashboards = self.import_all_dashboards(database_id, os.environ.get("MANUFACTURING_DB_PASSWORD"))
+                span.ok = bool(dashboards) and all(dashboards.values())
+        elif sync:
+            dashboard_sync = DashboardSync(self, prune=prune)
+            with self.instrumentation.span("sync"):
+                dashboards = dashboard_sync.sync_all(self.specs, database_id)
+        elif concurrency > 1:
+            print(f"\n⚡ Creating all dashboards concurrently (max {concurrency} in flight)...")
+            results = self.build_provisioning_graph(database_id, self.specs).run(
+                max_workers=concurrency, session=self.session
+            )
+            for spec in self.specs:
+                dashboards[spec["key"]] = results.get(f"dashboard:{spec['key']}")
+        else:
+            for spec in self.specs:
+                print(f"\n{spec['title']}")
+                dashboards[spec["key"]] = self.build_dashboard(spec, database_id)
         
         # Print summary
         print("\n" + "="*50)
@@ -552,6 +563,19 @@ class SupersetDashboardCreator:
             else:
                 print(f"❌ {name.capitalize()}: Failed to create")
         
+        print(f"\n🗂️ Dataset registry: {self.datasets.summary()}")
+        if dashboard_sync:
+            print(f"🔁 Sync: {dashboard_sync.summary()}")
+        if journal is not None:
+            if dashboards and all(dashboards.values()):
+                journal.complete()
+            print(f"📓 Journal: run {journal.run_id}, {journal.resume_hits} objects resumed ({journal.path})")
+            journal.close()
+        print(f"🔑 Tokens: {self.auth.logins} logins, {self.auth.refreshes} refreshes")
+        print(f"📡 Transport: {self.session.metrics.summary()}")
+        if self.instrumentation.enabled:
+            print(f"📊 Instrumentation: {json.dumps(self.instrumentation.summary(), sort_keys=True)}")
+        
         print("\n🎯 Update your analytics page with these dashboard IDs:")
         print("const dashboards = {")
         for name, dashboard_id in dashboards.items():
@@ -563,14 +587,129 @@ class SupersetDashboardCreator:
 
 def main():
     """Main function"""
-    creator = SupersetDashboardCreator()
-    dashboards = creator.create_all_dashboards()
+    parser = argparse.ArgumentParser(description="Create the manufacturing dashboards in Superset")
+    parser.add_argument("--url", default=os.environ.get("SUPERSET_URL", "http://localhost:8088"))
+    parser.add_argument("--username", default=os.environ.get("SUPERSET_USERNAME", "admin"))
+    parser.add_argument("--password", default=os.environ.get("SUPERSET_PASSWORD", "admin"))
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("SUPERSET_CONCURRENCY", 1)),
+        help="Maximum number of Superset API calls in flight (1 = sequential)"
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Diff against the existing charts/dashboards and only write what changed"
+    )
+    parser.add_argument("--prune", action="store_true", help="With --sync, delete charts removed from a dashboard spec")
+    parser.add_argument(
+        "--import-bundle",
+        action="store_true",
+        help="Upload all dashboards as a single Superset import ZIP"
+    )
+    parser.add_argument("--export-bundle", metavar="PATH", help="Write the import ZIP to PATH and exit")
+    parser.add_argument("--timeout", type=float, default=60, help="Read timeout per API call in seconds")
+    parser.add_argument("--max-retries", type=int, default=4, help="Retries on 429/5xx and connection errors")
+    parser.add_argument("--no-token-cache", action="store_true", help="Always log in instead of reusing cached tokens")
+    parser.add_argument(
+        "--validate",
+        choices=["off", "warn", "strict"],
+        default="strict",
+        help="Check chart columns/metrics against each view before creating anything "
+             "(strict aborts on mismatches, warn creates the charts anyway)"
+    )
+    parser.add_argument("--journal", type=Path, help="Checkpoint journal path (default: one per Superset URL)")
+    parser.add_argument("--no-journal", action="store_true", help="Do not checkpoint or resume provisioning runs")
+    parser.add_argument("--rollback", action="store_true", help="Delete everything the last unfinished run created")
+    parser.add_argument("--spec-dir", type=Path, help="Directory of JSON/YAML dashboard specs (default: ./dashboards)")
+    parser.add_argument(
+        "--database",
+        default=os.environ.get("SUPERSET_DATABASE", DATABASE_NAME),
+        help=f"Superset database the datasets query, e.g. '{REPLICA_DATABASE_NAME}' to keep dashboards off the primary"
+    )
+    parser.add_argument(
+        "--metrics-textfile",
+        type=Path,
+        help="Write Prometheus metrics to PATH (*.prom) for the node_exporter textfile collector"
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=["prometheus", "openmetrics"],
+        default="prometheus",
+        help="Exposition format of --metrics-textfile"
+    )
+    parser.add_argument(
+        "--metrics-pushgateway",
+        default=os.environ.get("PUSHGATEWAY_URL"),
+        help="Push the run's metrics to this Prometheus Pushgateway URL"
+    )
+    parser.add_argument("--metrics-json", type=Path, help="Write the instrumentation summary as JSON to PATH")
+    args = parser.parse_args()
+    
+    try:
+        specs = load_specs(args.spec_dir) if args.spec_dir else DASHBOARD_SPECS
+    except SpecError as e:
+        print(f"❌ {str(e)}")
+        sys.exit(1)
+    
+    if args.export_bundle:
+        bundle = DashboardBundle(
+            specs, args.database, manufacturing_sqlalchemy_uri(replica=args.database == REPLICA_DATABASE_NAME)
+        )
+        with open(args.export_bundle, "wb") as f:
+            f.write(bundle.render())
+        print(f"💾 Dashboard bundle written to {args.export_bundle}")
+        return
+    
+    instrumentation = Instrumentation(
+        enabled=bool(args.metrics_textfile or args.metrics_pushgateway or args.metrics_json)
+    )
+    creator = SupersetDashboardCreator(
+        args.url,
+        args.username,
+        args.password,
+        specs=specs,
+        pool_size=max(10, args.concurrency),
+        timeout=args.timeout,
+        max_retries=args.max_retries,
+        token_cache_dir=None if args.no_token_cache else DEFAULT_CACHE_DIR,
+        journal_path=None if args.no_journal else (args.journal or default_journal_path(args.url)),
+        instrumentation=instrumentation,
+        database_name=args.database
+    )
+    
+    if args.rollback:
+        if creator.journal is None or not creator.authenticate():
+            sys.exit(1)
+        sys.exit(0 if creator.journal.rollback(creator.session, creator.base_url) else 1)
+    
+    dashboards = creator.create_all_dashboards(
+        concurrency=args.concurrency,
+        sync=args.sync,
+        prune=args.prune,
+        import_bundle=args.import_bundle,
+        validate=args.validate
+    )
     
     # Write dashboard IDs to file for integration
     if any(dashboards.values()):
         with open("/tmp/dashboard_ids.json", "w") as f:
             json.dump(dashboards, f, indent=2)
         print(f"\n💾 Dashboard IDs saved to /tmp/dashboard_ids.json")
+    
+    instrumentation.count("dashboards_provisioned", sum(1 for dashboard_id in dashboards.values() if dashboard_id))
+    if args.metrics_json:
+        instrumentation.write_json(args.metrics_json)
+    if args.metrics_textfile:
+        instrumentation.write_textfile(args.metrics_textfile, openmetrics=args.metrics_format == "openmetrics")
+        print(f"📈 Metrics written to {args.metrics_textfile}")
+    if args.metrics_pushgateway:
+        try:
+            instrumentation.push(args.metrics_pushgateway)
+            print(f"📈 Metrics pushed to {args.metrics_pushgateway}")
+        except requests.RequestException as e:
+            print(f"⚠️ Could not push metrics to {args.metrics_pushgateway}: {str(e)}")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
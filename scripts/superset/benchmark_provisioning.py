@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Provisioning benchmark against a local mock Superset
+Compares wall-clock time of sequential, concurrent and bundle-import dashboard creation
+"""
+
+import argparse
+import contextlib
+import io
+import time
+from typing import Tuple
+
+from mock_superset import MockSuperset
+from superset_api import load_creator_module
+
+
+def run_once(creator_module, mock: MockSuperset, concurrency: int, import_bundle: bool = False) -> Tuple[float, int]:
+    mock.state.reset()
+    creator = creator_module.SupersetDashboardCreator(mock.url)
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        dashboards = creator.create_all_dashboards(concurrency=concurrency, import_bundle=import_bundle, validate="off")
+    elapsed = time.perf_counter() - started
+    return elapsed, sum(1 for dashboard_id in dashboards.values() if dashboard_id)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark dashboard provisioning against a mock Superset")
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every mock request")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock requests failing with 503")
+    args = parser.parse_args()
+
+    creator_module = load_creator_module()
+
+    print(f"⏱️  Provisioning benchmark (mock latency {args.latency * 1000:.0f}ms, best of {args.repeat})")
+    print(f"{'concurrency':>12} {'requests':>9} {'dashboards':>11} {'wall (s)':>9} {'speedup':>8}")
+
+    baseline = None
+    with MockSuperset(latency=args.latency, error_rate=args.error_rate) as mock:
+        for concurrency in args.concurrency:
+            best, created = min(run_once(creator_module, mock, concurrency) for _ in range(args.repeat))
+            baseline = baseline or best
+            print(f"{concurrency:>12} {mock.state.request_count:>9} {created:>11} {best:>9.3f} {baseline / best:>7.1f}x")
+
+        best, created = min(run_once(creator_module, mock, 1, import_bundle=True) for _ in range(args.repeat))
+        print(f"{'zip import':>12} {mock.state.request_count:>9} {created:>11} {best:>9.3f} {baseline / best:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
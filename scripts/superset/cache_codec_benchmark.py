@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Data cache codec benchmark
+Caches chart results shaped like the manufacturing data (the production export
+in sample-manufacturing-data.csv, grown to N rows) with the pickle serializer
+the data cache uses today and with the Arrow IPC codec of
+manufacturing_superset.arrow_codec (uncompressed, lz4 and zstd), and reports
+the stored size, write time, hit latency (decode and read "df") and the
+latency of a hit that only reads metadata. With --redis-url the values go
+through Redis: sizes are Redis' MEMORY USAGE and hits include the GET.
+Every codec is first checked to return each frame with its own dtypes and
+values, including frames with nulls built the way Superset builds them
+(integer columns with nulls are object); the benchmark exits 1 if one does not.
+
+Usage:
+    python cache_codec_benchmark.py --rows 1 100 5000 --repeat 20
+    python cache_codec_benchmark.py --redis-url redis://localhost:6379/15 --output cache-codec-benchmark.json
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from cachelib.serializers import RedisSerializer
+
+from render_benchmark import latency_stats
+
+REPO_ROOT = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(REPO_ROOT / "superset"))
+
+from manufacturing_superset.arrow_codec import CODECS, ArrowSerializer  # noqa: E402
+
+SAMPLE_CSV = REPO_ROOT / "sample-manufacturing-data.csv"
+KEY_PREFIX = "cache_codec_benchmark_"
+
+
+def production_frame(sample: pd.DataFrame, rows: int, seed: int = 42) -> pd.DataFrame:
+    """`rows` rows drawn from the sample, numbers jittered and timestamps spread a minute apart"""
+    rng = np.random.default_rng(seed)
+    df = sample.iloc[rng.integers(0, len(sample), rows)].reset_index(drop=True)
+    for column in df.columns:
+        if pd.api.types.is_bool_dtype(df[column]):
+            continue
+        if pd.api.types.is_float_dtype(df[column]):
+            df[column] = (df[column] * rng.normal(1, 0.05, rows)).round(4)
+        elif pd.api.types.is_integer_dtype(df[column]):
+            df[column] = (df[column] * rng.normal(1, 0.05, rows)).round().astype("int64")
+        elif pd.api.types.is_datetime64_any_dtype(df[column]):
+            df[column] = df[column] + pd.to_timedelta(np.arange(rows), unit="min")
+    return df
+
+
+def superset_frame(df: pd.DataFrame, null_every: int = 10) -> pd.DataFrame:
+    """df with every null_every-th numeric and bool value nulled, through Arrow as SupersetResultSet builds frames"""
+    df = df.copy()
+    for column in df.columns:
+        if pd.api.types.is_numeric_dtype(df[column]) or pd.api.types.is_bool_dtype(df[column]):
+            df[column] = df[column].astype(object)
+            df.loc[df.index[::null_every], column] = None
+    return pa.Table.from_pandas(df).to_pandas(integer_object_nulls=True)
+
+
+def load_sample(path: Path) -> pd.DataFrame:
+    sample = pd.read_csv(path)
+    for column in sample.columns:
+        if pd.api.types.is_string_dtype(sample[column]) and sample[column].str.match(r"^\d{4}-\d\d-\d\dT").all():
+            sample[column] = pd.to_datetime(sample[column])
+    return sample
+
+
+def cache_value(df: pd.DataFrame) -> Dict[str, Any]:
+    """What Superset's QueryCacheManager stores for one chart query"""
+    return {
+        "df": df,
+        "query": "SELECT * FROM public.v_realtime_production WHERE created_at >= now() - interval '7 days' LIMIT 5000",
+        "annotation_data": {},
+        "applied_template_filters": [],
+        "applied_filter_columns": ["created_at"],
+        "rejected_filter_columns": [],
+        "status": "success",
+        "error_message": None,
+        "is_loaded": True,
+        "stacktrace": None,
+        "sql_rowcount": len(df),
+        "dttm": time.time(),
+    }
+
+
+def timed(repeat: int, operation: Callable[[], Any]) -> List[float]:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        operation()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def serializers(compression_level: Optional[int]) -> Dict[str, RedisSerializer]:
+    codecs: Dict[str, RedisSerializer] = {"pickle": RedisSerializer()}
+    for compression in CODECS:
+        name = "arrow" if compression == "none" else f"arrow+{compression}"
+        codecs[name] = ArrowSerializer(compression, compression_level if compression != "none" else None, min_rows=0)
+    return codecs
+
+
+def check_round_trip(frames: Dict[str, pd.DataFrame], codecs: Dict[str, RedisSerializer]) -> List[str]:
+    """Every codec and frame whose decoded frame differs from the original in dtypes or values"""
+    problems = []
+    for label, df in frames.items():
+        for name, serializer in codecs.items():
+            decoded = serializer.loads(serializer.dumps(cache_value(df)))["df"]
+            changed = [
+                f"{column} {df[column].dtype} -> {decoded[column].dtype}"
+                for column in df.columns if decoded[column].dtype != df[column].dtype
+            ]
+            if changed:
+                problems.append(f"{name}, {label}: dtypes changed: {', '.join(changed)}")
+                continue
+            try:
+                pd.testing.assert_frame_equal(decoded, df)
+            except AssertionError as e:
+                problems.append(f"{name}, {label}: values changed: {str(e).splitlines()[0]}")
+    return problems
+
+
+def run(frames: Dict[int, pd.DataFrame], codecs: Dict[str, RedisSerializer], repeat: int, client=None) -> List[Dict[str, Any]]:
+    results = []
+    for rows, df in frames.items():
+        value = cache_value(df)
+        for name, serializer in codecs.items():
+            payload = serializer.dumps(value)
+            write = timed(repeat, lambda: serializer.dumps(value))
+            if client is not None:
+                key = f"{KEY_PREFIX}{name}_{rows}"
+                client.set(key, payload)
+                stored = client.memory_usage(key, samples=0)
+                fetch = lambda: client.get(key)  # noqa: E731
+            else:
+                stored = len(payload)
+                fetch = lambda: payload  # noqa: E731
+            hit = timed(repeat, lambda: serializer.loads(fetch())["df"])
+            meta_hit = timed(repeat, lambda: serializer.loads(fetch())["status"])
+            results.append({
+                "rows": rows,
+                "codec": name,
+                "bytes": stored,
+                "write": latency_stats(write),
+                "hit": latency_stats(hit),
+                "meta_hit": latency_stats(meta_hit),
+            })
+    if client is not None:
+        client.delete(*client.keys(f"{KEY_PREFIX}*"))
+    return results
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"{'rows':>6} {'codec':<11} {'bytes':>11} {'vs pickle':>9} {'write p50':>10} {'hit p50':>9} {'hit p95':>9} {'meta p50':>9}")
+    pickled = {result["rows"]: result["bytes"] for result in results if result["codec"] == "pickle"}
+    for result in results:
+        ratio = result["bytes"] / pickled[result["rows"]] if pickled.get(result["rows"]) else 0
+        print(
+            f"{result['rows']:>6} {result['codec']:<11} {result['bytes']:>11,} {ratio:>8.2f}x "
+            f"{result['write']['p50_ms']:>8.1f}ms {result['hit']['p50_ms']:>7.1f}ms "
+            f"{result['hit']['p95_ms']:>7.1f}ms {result['meta_hit']['p50_ms']:>7.1f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare pickle and Arrow IPC encodings of cached chart results")
+    parser.add_argument("--rows", type=int, nargs="+", default=[1, 50, 500, 5000], help="Rows per cached result")
+    parser.add_argument("--repeat", type=int, default=20, help="Samples per codec and size")
+    parser.add_argument("--compression-level", type=int, help="zstd/lz4 level (default: the codec's own)")
+    parser.add_argument("--sample", type=Path, default=SAMPLE_CSV, help="CSV whose columns the cached results have")
+    parser.add_argument("--redis-url", help="Store the results in this Redis (use a spare DB) and measure its memory")
+    parser.add_argument("--output", type=Path, help="Also write the results as JSON")
+    args = parser.parse_args()
+
+    sample = load_sample(args.sample)
+    frames = {rows: production_frame(sample, rows) for rows in args.rows}
+
+    client = None
+    if args.redis_url:
+        import redis
+
+        client = redis.Redis.from_url(args.redis_url)
+        client.ping()
+
+    codecs = serializers(args.compression_level)
+    checked = {f"{rows} rows": df for rows, df in frames.items()}
+    checked.update({f"{rows} rows with nulls": superset_frame(df) for rows, df in frames.items()})
+    problems = check_round_trip(checked, codecs)
+    if problems:
+        print("❌ Round trip changed the cached frames:")
+        for problem in problems:
+            print(f"   - {problem}")
+        sys.exit(1)
+    print(f"✅ Round trip: every codec returned the {len(checked)} frames with their dtypes and values")
+
+    where = f"Redis {args.redis_url}" if client is not None else "in process"
+    print(f"🗜️  Data cache codec benchmark ({len(sample.columns)} columns, {where}, {args.repeat} samples)")
+    results = run(frames, codecs, args.repeat, client)
+    print_report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"\n💾 Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
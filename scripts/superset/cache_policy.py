@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Data-freshness cache policy for the provisioned datasets and charts
+Maps every view to a freshness tier, and each tier to the cache_timeout that
+Superset applies to its chart queries (chart > dataset > global default), so
+real-time tiles stay current while daily rollups are not recomputed every 5 minutes
+"""
+
+from typing import Any, Dict, Optional
+
+# Seconds a cached query result may be served, by how often the data behind it changes
+FRESHNESS_TIERS: Dict[str, int] = {
+    # Live fact tables written by the MQTT ingest
+    "realtime": 30,
+    # Per-day aggregates over live facts: only today's bucket moves
+    "operational": 300,
+    # Built on materialized views; the refresh task invalidates them early
+    "rollup": 4 * 3600,
+}
+
+DATASET_FRESHNESS: Dict[str, str] = {
+    "v_realtime_production": "realtime",
+    "v_equipment_status": "realtime",
+    "v_quality_metrics": "operational",
+    "v_downtime_analysis": "operational",
+    "v_scrap_analysis": "operational",
+    "v_oee_hourly_trend": "rollup",
+    "v_shift_performance": "rollup",
+    "v_kpi_summary": "rollup",
+    # Continuous aggregates, refreshed by TimescaleDB every 1-60 minutes
+    "sensor_1min": "realtime",
+    "oee_5min": "operational",
+    "oee_hourly": "operational",
+}
+
+
+def dataset_cache_timeout(table_name: str) -> Optional[int]:
+    """cache_timeout for a view, or None to fall back to the database/global default"""
+    tier = DATASET_FRESHNESS.get(table_name)
+    return FRESHNESS_TIERS[tier] if tier else None
+
+
+def chart_cache_timeout(chart_spec: Dict[str, Any]) -> Optional[int]:
+    """An explicit chart cache_timeout (or freshness tier) wins over its dataset's tier"""
+    if chart_spec.get("cache_timeout") is not None:
+        return chart_spec["cache_timeout"]
+    if chart_spec.get("freshness") is not None:
+        return FRESHNESS_TIERS[chart_spec["freshness"]]
+    return dataset_cache_timeout(chart_spec["dataset"])
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Continuous-aggregate routing for time-series charts
+The TimescaleDB metrics schema keeps the oee_5min, oee_hourly and sensor_1min
+continuous aggregates up to date. A chart whose every column and metric can be
+answered from one of them is pointed at the coarsest aggregate that still
+satisfies its time grain and range, so a week-long trend reads a few thousand
+pre-bucketed rows instead of every raw sample. Metrics are rewritten to ad-hoc
+metrics over the aggregate's columns, keeping their label. An ad-hoc SIMPLE
+metric is translated by its column, and only if it uses the aggregate's function.
+
+Only the relations the aggregates are built from are routed: the MQTT
+manufacturing_metrics hypertable (and its oee_metrics pivot) and sensor_readings.
+The star-schema views (v_realtime_production over fact_production,
+v_oee_hourly_trend over view_oee_daily, ...) are a different data source whose
+numbers an aggregate would silently replace, so their charts stay on them.
+"""
+
+import copy
+from typing import Any, Dict, Optional, Tuple
+
+from query_guard import grain_seconds, time_range_seconds
+
+# A chart without a time grain is routed only if its range spans this many aggregate buckets
+MIN_BUCKETS_PER_RANGE = 24
+
+# Column translations of each aggregate family: source column -> aggregate column,
+# and source metric -> (aggregate column, aggregate function). The sources are the
+# columns of oee_metrics and sensor_readings (prisma/migrations/timescaledb).
+FAMILIES: Dict[str, Dict[str, Any]] = {
+    "oee": {
+        "columns": {
+            "timestamp": "bucket",
+            "equipment_id": "equipment_id",
+        },
+        "metrics": {
+            "oee_score": ("avg_oee", "AVG"),
+            "availability_score": ("avg_availability", "AVG"),
+            "performance_score": ("avg_performance", "AVG"),
+            "quality_score": ("avg_quality", "AVG"),
+            "production_count": ("total_production", "SUM"),
+            "good_count": ("total_good", "SUM"),
+            "reject_count": ("total_reject", "SUM"),
+        },
+    },
+    "sensor": {
+        "columns": {
+            "timestamp": "bucket",
+            "equipment_id": "equipment_id",
+            "sensor_name": "sensor_name",
+        },
+        "metrics": {
+            "sensor_value": ("avg_value", "AVG"),
+            "avg_value": ("avg_value", "AVG"),
+            "min_value": ("min_value", "MIN"),
+            "max_value": ("max_value", "MAX"),
+        },
+    },
+}
+
+# Continuous aggregates by family, with their bucket width in seconds
+CONTINUOUS_AGGREGATES: Dict[str, Dict[str, Any]] = {
+    "oee_5min": {"family": "oee", "bucket": 300},
+    "oee_hourly": {"family": "oee", "bucket": 3600},
+    "sensor_1min": {"family": "sensor", "bucket": 60},
+}
+
+# Relations the aggregates of a family are built from, whose charts may be answered from them
+DATASET_FAMILIES: Dict[str, str] = {
+    "oee_metrics": "oee",
+    "manufacturing_metrics": "oee",
+    "sensor_readings": "sensor",
+}
+
+COLUMN_PARAMS = ("groupby", "columns", "all_columns")
+METRIC_PARAMS = ("metrics", "metric", "percent_metrics", "timeseries_limit_metric")
+
+
+def translate_params(params: Dict[str, Any], family: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """params rewritten onto an aggregate family's columns, or None if any reference has no translation"""
+    translated = copy.deepcopy(params)
+    columns, metrics = family["columns"], family["metrics"]
+
+    for param in COLUMN_PARAMS:
+        values = params.get(param) or []
+        if any(not isinstance(column, str) or column not in columns for column in values):
+            return None
+        if values:
+            translated[param] = [columns[column] for column in values]
+
+    for param in ("granularity_sqla", "x_axis"):
+        if params.get(param):
+            if params[param] not in columns:
+                return None
+            translated[param] = columns[params[param]]
+
+    for param in METRIC_PARAMS:
+        values = params.get(param)
+        if not values:
+            continue
+        rewritten = []
+        for metric in values if isinstance(values, list) else [values]:
+            if isinstance(metric, str) and metric in metrics:
+                column, aggregate = metrics[metric]
+                label = metric
+            elif isinstance(metric, dict) and metric.get("expressionType") == "SIMPLE":
+                source = (metric.get("column") or {}).get("column_name")
+                if source not in metrics or metrics[source][1] != metric.get("aggregate"):
+                    return None
+                column, aggregate = metrics[source]
+                label = metric.get("label") or source
+            else:
+                return None
+            rewritten.append({
+                "expressionType": "SIMPLE",
+                "column": {"column_name": column},
+                "aggregate": aggregate,
+                "label": label,
+            })
+        translated[param] = rewritten if isinstance(values, list) else rewritten[0]
+
+    for index, adhoc in enumerate(params.get("adhoc_filters") or []):
+        # Free-form SQL filters may name columns the aggregate does not have
+        if adhoc.get("expressionType") == "SQL" or adhoc.get("subject") not in columns:
+            return None
+        translated["adhoc_filters"][index]["subject"] = columns[adhoc["subject"]]
+    return translated
+
+
+def pick_aggregate(family: str, params: Dict[str, Any]) -> Optional[str]:
+    """The coarsest aggregate of a family whose buckets fit the chart's grain (or range)"""
+    grain = grain_seconds(params.get("time_grain_sqla"))
+    range_seconds = time_range_seconds(params.get("time_range"))
+    best: Optional[Tuple[int, str]] = None
+    for name, aggregate in CONTINUOUS_AGGREGATES.items():
+        if aggregate["family"] != family:
+            continue
+        if grain is not None:
+            fits = grain % aggregate["bucket"] == 0
+        else:
+            fits = range_seconds is not None and range_seconds >= aggregate["bucket"] * MIN_BUCKETS_PER_RANGE
+        if fits and (best is None or aggregate["bucket"] > best[0]):
+            best = (aggregate["bucket"], name)
+    return best[1] if best else None
+
+
+def route_chart(chart_spec: Dict[str, Any]) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(aggregate, params) to answer a chart from, or None to leave it on its dataset
+
+    A chart opts out with "rollup": false. Only charts with a time column are
+    routed, since the aggregates are bucketed by time.
+    """
+    family = DATASET_FAMILIES.get(chart_spec["dataset"])
+    params = chart_spec["params"]
+    if family is None or chart_spec.get("rollup") is False or not params.get("granularity_sqla"):
+        return None
+    translated = translate_params(params, FAMILIES[family])
+    if translated is None:
+        return None
+    aggregate = pick_aggregate(family, params)
+    if aggregate is None:
+        return None
+    return aggregate, translated
@@ -0,0 +1,303 @@
+#!/usr/bin/env python3
+"""
+In-memory Superset import bundle
+Renders the database, datasets, charts and dashboards of the dashboard specs
+as the ZIP layout accepted by POST /api/v1/dashboard/import/, with stable
+UUIDs so that re-imports overwrite the same objects instead of duplicating them.
+An overwriting import syncs a dataset's columns and metrics to its YAML, so each
+dataset is rendered with the columns of its view as Superset describes them
+"""
+
+import io
+import json
+import os
+import re
+import uuid
+import zipfile
+from datetime import datetime, timezone
+from collections import Counter
+from typing import Any, Dict, List, Optional
+from urllib.parse import quote
+
+import requests
+import yaml
+
+from cache_policy import dataset_cache_timeout
+from dashboard_compiler import pack_rows
+from dataset_schema import TEMPORAL_TYPES
+from superset_api import list_all
+
+# Namespace for the deterministic UUIDs of everything this tooling provisions
+UUID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "manufacturing-analytics-platform/superset")
+EXPORT_VERSION = "1.0.0"
+MASKED_PASSWORD = "XXXXXXXXXX"
+DATABASE_NAME = "Manufacturing TimescaleDB"
+REPLICA_DATABASE_NAME = "Manufacturing TimescaleDB (read replica)"
+# Registration settings of an existing database that a bundle import must not reset
+# (superset_config.py registers the connections with engine params and, for the
+# replica, without DML)
+ADOPTED_DATABASE_FIELDS = ("allow_run_async", "allow_ctas", "allow_cvas", "allow_dml", "expose_in_sqllab")
+# The saved metric Superset adds to every new dataset, which an overwriting import would otherwise drop
+COUNT_METRIC = {
+    "metric_name": "count",
+    "verbose_name": "COUNT(*)",
+    "metric_type": "count",
+    "expression": "COUNT(*)",
+    "description": None,
+    "d3format": None,
+    "extra": None,
+    "warning_text": None,
+}
+
+
+def stable_uuid(kind: str, name: str) -> str:
+    return str(uuid.uuid5(UUID_NAMESPACE, f"{kind}:{name}"))
+
+
+def manufacturing_sqlalchemy_uri(password: str = MASKED_PASSWORD, replica: bool = False) -> str:
+    """Manufacturing TimescaleDB URI, with a masked password as Superset exports it unless one is given"""
+    host = os.environ.get('MANUFACTURING_DB_HOST', 'timescaledb')
+    port = os.environ.get('MANUFACTURING_DB_PORT', '5432')
+    if replica:
+        host = os.environ.get('MANUFACTURING_DB_REPLICA_HOST', host)
+        port = os.environ.get('MANUFACTURING_DB_REPLICA_PORT', port)
+    return (
+        f"postgresql://{os.environ.get('MANUFACTURING_DB_USER', 'postgres')}:{quote(password, safe='')}"
+        f"@{host}:{port}/{os.environ.get('MANUFACTURING_DB_NAME', 'manufacturing')}"
+    )
+
+
+def is_temporal(column_type: str) -> bool:
+    return any(marker in column_type.upper() for marker in TEMPORAL_TYPES)
+
+
+def render_column(name: str, column_type: str) -> Dict[str, Any]:
+    return {
+        "column_name": name,
+        "verbose_name": None,
+        "is_dttm": is_temporal(column_type),
+        "is_active": True,
+        "type": column_type,
+        "advanced_data_type": None,
+        "groupby": True,
+        "filterable": True,
+        "expression": None,
+        "description": None,
+        "python_date_format": None,
+        "extra": None,
+    }
+
+
+def file_name(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", name).strip("_")
+
+
+class DashboardBundle:
+    def __init__(
+        self,
+        specs: List[Dict[str, Any]],
+        database_name: str,
+        sqlalchemy_uri: str,
+        schema: str = "public",
+        columns: Optional[Dict[str, Optional[Dict[str, str]]]] = None
+    ):
+        self.specs = specs
+        self.database_name = database_name
+        self.sqlalchemy_uri = sqlalchemy_uri
+        self.schema = schema
+        self.database_uuid = stable_uuid("database", database_name)
+        self.database_path = f"databases/{file_name(database_name)}.yaml"
+        # Column name -> type of each view (DatasetSchemaCache.columns); None if it could not be described
+        self.columns: Dict[str, Optional[Dict[str, str]]] = dict(columns or {})
+        # Settings of the registered database kept by adopt_existing()
+        self.database_settings: Dict[str, Any] = {}
+        # UUIDs of objects that already exist under another UUID (e.g. created through
+        # the REST API), keyed by "kind:name", so the import overwrites them in place
+        self.uuid_overrides: Dict[str, str] = {}
+
+    def adopt_existing(self, session: requests.Session, base_url: str, database_id: int) -> int:
+        """Reuse the UUIDs of the database, datasets, charts and dashboards already in Superset"""
+        response = session.get(f"{base_url}/api/v1/database/{database_id}")
+        response.raise_for_status()
+        database = response.json()["result"]
+        if database.get("uuid"):
+            self.database_uuid = database["uuid"]
+        self.database_settings = {field: database[field] for field in ADOPTED_DATABASE_FIELDS if field in database}
+        if database.get("extra"):
+            extra = database["extra"]
+            self.database_settings["extra"] = json.loads(extra) if isinstance(extra, str) else extra
+
+        views = {view for spec in self.specs for view in spec["datasets"]}
+        chart_names = {chart_spec["slice_name"] for spec in self.specs for chart_spec in spec["charts"]}
+        slugs = {spec["slug"] for spec in self.specs}
+
+        datasets = list_all(
+            session, base_url, "dataset",
+            columns=["id", "table_name", "schema", "uuid"],
+            filters=f"(col:database,opr:rel_o_m,value:{database_id})"
+        )
+        for dataset in datasets:
+            if dataset["table_name"] in views and (dataset.get("schema") or self.schema) == self.schema:
+                self.uuid_overrides[f"dataset:{dataset['table_name']}"] = dataset["uuid"]
+        for chart in list_all(session, base_url, "chart", columns=["id", "slice_name", "uuid"]):
+            if chart["slice_name"] in chart_names:
+                self.uuid_overrides[f"chart:{chart['slice_name']}"] = chart["uuid"]
+        for dashboard in list_all(session, base_url, "dashboard", columns=["id", "slug", "uuid"]):
+            if dashboard.get("slug") in slugs:
+                self.uuid_overrides[f"dashboard:{dashboard['slug']}"] = dashboard["uuid"]
+        return len(self.uuid_overrides)
+
+    def dataset_uuid(self, table_name: str) -> str:
+        return self.uuid_overrides.get(f"dataset:{table_name}") or stable_uuid(
+            "dataset", f"{self.database_name}/{self.schema}/{table_name}"
+        )
+
+    def undescribed_views(self) -> List[str]:
+        """Views rendered without columns, whose datasets need a refresh after the import"""
+        views = {view for spec in self.specs for view in spec["datasets"]}
+        return sorted(view for view in views if not self.columns.get(view))
+
+    def main_dttm_col(self, table_name: str) -> Optional[str]:
+        """The view's time column the charts use most, else its first temporal column"""
+        columns = self.columns.get(table_name) or {}
+        used = Counter(
+            chart_spec["params"]["granularity_sqla"]
+            for spec in self.specs for chart_spec in spec["charts"]
+            if chart_spec["dataset"] == table_name and chart_spec["params"].get("granularity_sqla") in columns
+        )
+        if used:
+            return used.most_common(1)[0][0]
+        return next((name for name, column_type in columns.items() if is_temporal(column_type)), None)
+
+    def render_database(self) -> Dict[str, Any]:
+        settings = {**self.database_settings, "extra": {
+            "allows_virtual_table_explore": True, **self.database_settings.get("extra", {})
+        }}
+        return {
+            "database_name": self.database_name,
+            "sqlalchemy_uri": self.sqlalchemy_uri,
+            "cache_timeout": None,
+            "expose_in_sqllab": True,
+            "allow_run_async": True,
+            "allow_ctas": True,
+            "allow_cvas": True,
+            "allow_dml": True,
+            "allow_file_upload": False,
+            **settings,
+            "uuid": self.database_uuid,
+            "version": EXPORT_VERSION,
+        }
+
+    def render_dataset(self, table_name: str) -> Dict[str, Any]:
+        return {
+            "table_name": table_name,
+            "main_dttm_col": self.main_dttm_col(table_name),
+            "description": None,
+            "default_endpoint": None,
+            "offset": 0,
+            "cache_timeout": dataset_cache_timeout(table_name),
+            "schema": self.schema,
+            "sql": None,
+            "params": None,
+            "template_params": None,
+            "filter_select_enabled": True,
+            "fetch_values_predicate": None,
+            "extra": None,
+            "uuid": self.dataset_uuid(table_name),
+            "metrics": [dict(COUNT_METRIC)],
+            "columns": [
+                render_column(name, column_type)
+                for name, column_type in (self.columns.get(table_name) or {}).items()
+            ],
+            "version": EXPORT_VERSION,
+            "database_uuid": self.database_uuid,
+        }
+
+    def render_chart(self, spec: Dict[str, Any], chart_spec: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "slice_name": chart_spec["slice_name"],
+            "description": None,
+            "certified_by": None,
+            "certification_details": None,
+            "viz_type": chart_spec["viz_type"],
+            "params": dict(chart_spec["params"], viz_type=chart_spec["viz_type"]),
+            "query_context": None,
+            "cache_timeout": chart_spec.get("cache_timeout"),
+            "uuid": self.chart_uuid(spec, chart_spec),
+            "version": EXPORT_VERSION,
+            "dataset_uuid": self.dataset_uuid(chart_spec["dataset"]),
+        }
+
+    def chart_uuid(self, spec: Dict[str, Any], chart_spec: Dict[str, Any]) -> str:
+        return (
+            chart_spec.get("uuid")
+            or self.uuid_overrides.get(f"chart:{chart_spec['slice_name']}")
+            or stable_uuid("chart", f"{spec['slug']}/{chart_spec['slice_name']}")
+        )
+
+    def render_dashboard(self, spec: Dict[str, Any]) -> Dict[str, Any]:
+        charts = [
+            {
+                "key": chart_spec["key"],
+                "width": chart_spec["width"],
+                "meta": {
+                    "uuid": self.chart_uuid(spec, chart_spec),
+                    "chartId": None,
+                    "width": chart_spec["width"],
+                    "height": chart_spec["height"],
+                    "sliceName": chart_spec["slice_name"],
+                },
+            }
+            for chart_spec in spec["charts"]
+        ]
+        return {
+            "dashboard_title": spec["dashboard_title"],
+            "description": None,
+            "css": spec.get("css", ""),
+            "slug": spec["slug"],
+            "certified_by": None,
+            "certification_details": None,
+            "published": True,
+            "uuid": (
+                spec.get("uuid")
+                or self.uuid_overrides.get(f"dashboard:{spec['slug']}")
+                or stable_uuid("dashboard", spec["slug"])
+            ),
+            "position": pack_rows(charts),
+            "metadata": spec.get("json_metadata", {}),
+            "version": EXPORT_VERSION,
+        }
+
+    def files(self) -> Dict[str, Dict[str, Any]]:
+        """Every YAML document of the bundle, keyed by its path inside the ZIP"""
+        files = {
+            "metadata.yaml": {
+                "version": EXPORT_VERSION,
+                "type": "Dashboard",
+                "timestamp": datetime.now(timezone.utc).isoformat(),
+            },
+            self.database_path: self.render_database(),
+        }
+        for spec in self.specs:
+            for view in spec["datasets"]:
+                files[f"datasets/{file_name(self.database_name)}/{view}.yaml"] = self.render_dataset(view)
+            for chart_spec in spec["charts"]:
+                chart = self.render_chart(spec, chart_spec)
+                files[f"charts/{file_name(chart_spec['slice_name'])}_{chart['uuid'][:8]}.yaml"] = chart
+            dashboard = self.render_dashboard(spec)
+            files[f"dashboards/{file_name(spec['dashboard_title'])}_{dashboard['uuid'][:8]}.yaml"] = dashboard
+        return files
+
+    def render(self, root: str = "manufacturing_dashboards") -> bytes:
+        """Render the bundle as an in-memory ZIP archive"""
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+            for path, document in self.files().items():
+                archive.writestr(f"{root}/{path}", yaml.safe_dump(document, sort_keys=False))
+        return buffer.getvalue()
+
+    def passwords(self, password: Optional[str]) -> Dict[str, str]:
+        """The `passwords` form field: database YAML path -> password for a masked URI"""
+        if not password or MASKED_PASSWORD not in self.sqlalchemy_uri:
+            return {}
+        return {self.database_path: password}
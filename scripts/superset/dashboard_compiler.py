@@ -0,0 +1,235 @@
+#!/usr/bin/env python3
+"""
+Declarative dashboard spec compiler
+Turns a JSON/YAML dashboard spec into validated chart params and a row-packed
+Superset v2 position_json in one pass. Compiled output is cached by spec hash,
+so re-compiling identical specs (e.g. one dashboard per line) is a dict lookup.
+"""
+
+import copy
+import json
+import re
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from cache_policy import FRESHNESS_TIERS, chart_cache_timeout
+from continuous_aggregates import route_chart
+from query_guard import guarded_params, unbounded_problem
+from superset_api import fingerprint
+
+GRID_COLUMNS = 12
+SPEC_DIR = Path(__file__).with_name("dashboards")
+
+# Viz types whose query is driven by a single `metric` rather than a `metrics` list
+SINGLE_METRIC_VIZ_TYPES = {"big_number_total", "big_number", "gauge_chart", "pie"}
+LIST_PARAMS = ("metrics", "groupby", "columns")
+STRING_PARAMS = ("time_range", "granularity_sqla", "time_grain_sqla")
+
+_compiled_cache: Dict[str, Dict[str, Any]] = {}
+
+
+class SpecError(ValueError):
+    """Raised with every problem found in a dashboard spec"""
+
+    def __init__(self, source: str, problems: List[str]):
+        self.source = source
+        self.problems = problems
+        super().__init__(f"Invalid dashboard spec {source}:\n  - " + "\n  - ".join(problems))
+
+
+def chart_key(slice_name: str) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", slice_name.lower()).strip("-")
+
+
+def validate_spec(spec: Dict[str, Any]) -> List[str]:
+    """Return every problem with a spec (an empty list means it is valid)"""
+    problems = []
+    for field in ("key", "dashboard_title", "slug", "datasets", "charts"):
+        if field not in spec:
+            problems.append(f"missing required field '{field}'")
+    if problems:
+        return problems
+
+    if not re.fullmatch(r"[a-z0-9][a-z0-9-]*", spec["slug"]):
+        problems.append(f"slug '{spec['slug']}' must be lowercase letters, digits and dashes")
+
+    seen_names = set()
+    for index, chart in enumerate(spec["charts"]):
+        label = f"chart {index} ({chart.get('slice_name', '?')})"
+        for field in ("slice_name", "viz_type", "dataset", "params", "width", "height"):
+            if field not in chart:
+                problems.append(f"{label}: missing required field '{field}'")
+        if any(field not in chart for field in ("slice_name", "dataset", "params")):
+            continue
+
+        if chart["slice_name"] in seen_names:
+            problems.append(f"{label}: duplicate slice_name")
+        seen_names.add(chart["slice_name"])
+
+        if chart["dataset"] not in spec["datasets"]:
+            problems.append(f"{label}: dataset '{chart['dataset']}' is not listed in datasets")
+        if not isinstance(chart.get("width"), int) or not 1 <= chart["width"] <= GRID_COLUMNS:
+            problems.append(f"{label}: width must be an integer between 1 and {GRID_COLUMNS}")
+        if not isinstance(chart.get("height"), int) or chart["height"] < 1:
+            problems.append(f"{label}: height must be a positive integer")
+        if "cache_timeout" in chart and not (chart["cache_timeout"] is None or isinstance(chart["cache_timeout"], int)):
+            problems.append(f"{label}: cache_timeout must be an integer number of seconds")
+        if "freshness" in chart and chart["freshness"] not in FRESHNESS_TIERS:
+            problems.append(f"{label}: freshness must be one of {', '.join(FRESHNESS_TIERS)}")
+        if "allow_unbounded" in chart and not isinstance(chart["allow_unbounded"], bool):
+            problems.append(f"{label}: allow_unbounded must be true or false")
+        if "rollup" in chart and not isinstance(chart["rollup"], bool):
+            problems.append(f"{label}: rollup must be true or false")
+
+        params = chart["params"]
+        if not isinstance(params, dict):
+            problems.append(f"{label}: params must be an object")
+            continue
+        if chart.get("viz_type") in SINGLE_METRIC_VIZ_TYPES:
+            if not isinstance(params.get("metric"), (str, dict)):
+                problems.append(f"{label}: {chart['viz_type']} needs a single 'metric'")
+        elif chart.get("viz_type") != "table" and not params.get("metrics"):
+            problems.append(f"{label}: {chart.get('viz_type')} needs at least one entry in 'metrics'")
+        for name in LIST_PARAMS:
+            if name in params and not isinstance(params[name], list):
+                problems.append(f"{label}: params.{name} must be a list")
+        for name in STRING_PARAMS:
+            if name in params and not isinstance(params[name], str):
+                problems.append(f"{label}: params.{name} must be a string")
+        if "row_limit" in params and (not isinstance(params["row_limit"], int) or params["row_limit"] < 1):
+            problems.append(f"{label}: params.row_limit must be a positive integer")
+        if "viz_type" in chart and all(isinstance(params.get(name, ""), str) for name in STRING_PARAMS):
+            unbounded = unbounded_problem(chart, guarded_params(chart))
+            if unbounded:
+                problems.append(f"{label}: {unbounded}")
+
+    return problems
+
+
+def pack_rows(charts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Lay charts out left to right in rows of at most 12 grid columns (Superset v2 position)
+
+    Each chart needs a `key` and `width`; its `meta` is copied into the layout.
+    """
+    position: Dict[str, Any] = {
+        "DASHBOARD_VERSION_KEY": "v2",
+        "ROOT_ID": {"id": "ROOT_ID", "type": "ROOT", "children": ["GRID_ID"]},
+        "GRID_ID": {"id": "GRID_ID", "type": "GRID", "children": [], "parents": ["ROOT_ID"]},
+    }
+    row_id = None
+    row_width = GRID_COLUMNS
+    for chart in charts:
+        if row_id is None or row_width + chart["width"] > GRID_COLUMNS:
+            row_id = f"ROW-{len(position['GRID_ID']['children']) + 1}"
+            row_width = 0
+            position["GRID_ID"]["children"].append(row_id)
+            position[row_id] = {
+                "id": row_id,
+                "type": "ROW",
+                "children": [],
+                "parents": ["ROOT_ID", "GRID_ID"],
+                "meta": {"background": "BACKGROUND_TRANSPARENT"},
+            }
+        component_id = f"CHART-{chart['key']}"
+        position[row_id]["children"].append(component_id)
+        position[component_id] = {
+            "id": component_id,
+            "type": "CHART",
+            "children": [],
+            "parents": ["ROOT_ID", "GRID_ID", row_id],
+            "meta": dict(chart["meta"]),
+        }
+        row_width += chart["width"]
+    return position
+
+
+def compile_spec(spec: Dict[str, Any], source: str = "<spec>") -> Dict[str, Any]:
+    """Validate and compile a spec; identical specs are only compiled once"""
+    spec_hash = fingerprint(spec)
+    compiled = _compiled_cache.get(spec_hash)
+    if compiled is not None:
+        return compiled
+
+    problems = validate_spec(spec)
+    if problems:
+        raise SpecError(source, problems)
+
+    compiled = copy.deepcopy(spec)
+    compiled["fingerprint"] = spec_hash
+    compiled.setdefault("title", f"📊 Creating {spec['dashboard_title']} Dashboard...")
+    for chart in compiled["charts"]:
+        chart["key"] = chart_key(chart["slice_name"])
+        chart["params"] = guarded_params(chart)
+        routed = route_chart(chart)
+        if routed:
+            # Answer the chart from a continuous aggregate, registered as a dataset of its own
+            chart["routed_from"] = chart["dataset"]
+            chart["dataset"], chart["params"] = routed
+            if chart["dataset"] not in compiled["datasets"]:
+                compiled["datasets"].append(chart["dataset"])
+        chart["params_json"] = json.dumps(chart["params"])
+        chart["cache_timeout"] = chart_cache_timeout(chart)
+    compiled["position"] = pack_rows([
+        {
+            "key": chart["key"],
+            "width": chart["width"],
+            "meta": {
+                "chartId": None,
+                "width": chart["width"],
+                "height": chart["height"],
+                "sliceName": chart["slice_name"],
+            },
+        }
+        for chart in compiled["charts"]
+    ])
+
+    _compiled_cache[spec_hash] = compiled
+    return compiled
+
+
+def render_position(compiled: Dict[str, Any], chart_ids: Dict[str, int]) -> Dict[str, Any]:
+    """Fill the chart IDs (by slice_name) into a compiled layout, dropping charts without one"""
+    ids_by_component = {
+        f"CHART-{chart['key']}": chart_ids.get(chart["slice_name"]) for chart in compiled["charts"]
+    }
+    position: Dict[str, Any] = {}
+    for component_id, component in compiled["position"].items():
+        if component_id in ids_by_component:
+            if ids_by_component[component_id] is None:
+                continue
+            component = dict(component, meta=dict(component["meta"], chartId=ids_by_component[component_id]))
+        elif isinstance(component, dict) and component.get("children"):
+            component = dict(component, children=[
+                child for child in component["children"]
+                if ids_by_component.get(child, True) is not None
+            ])
+        position[component_id] = component
+
+    # Drop rows left empty by missing charts
+    empty_rows = [
+        component_id for component_id, component in position.items()
+        if isinstance(component, dict) and component.get("type") == "ROW" and not component["children"]
+    ]
+    for row_id in empty_rows:
+        del position[row_id]
+    position["GRID_ID"] = dict(position["GRID_ID"], children=[
+        child for child in position["GRID_ID"]["children"] if child not in empty_rows
+    ])
+    return position
+
+
+def load_spec_file(path: Path) -> Dict[str, Any]:
+    with open(path) as f:
+        if path.suffix in (".yaml", ".yml"):
+            import yaml
+            return yaml.safe_load(f)
+        return json.load(f)
+
+
+def load_specs(spec_dir: Optional[Path] = None) -> List[Dict[str, Any]]:
+    """Load and compile every spec of a directory, in file name order"""
+    spec_dir = spec_dir or SPEC_DIR
+    paths = sorted(
+        path for path in spec_dir.iterdir() if path.suffix in (".json", ".yaml", ".yml")
+    )
+    return [compile_spec(load_spec_file(path), source=str(path)) for path in paths]
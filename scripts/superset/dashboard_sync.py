@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Idempotent, diff-based dashboard sync
+Fingerprints every desired chart and dashboard, fetches the current state in
+bulk and only issues the create, update or delete calls needed to converge
+"""
+
+from typing import Any, Dict, List, Optional
+
+from superset_api import fingerprint, list_all, load_json_field
+
+CHART_FIELDS = ("slice_name", "viz_type", "datasource_id", "datasource_type", "params", "cache_timeout")
+DASHBOARD_FIELDS = ("dashboard_title", "slug", "position_json", "css", "json_metadata")
+JSON_FIELDS = ("params", "position_json", "json_metadata")
+
+
+def payload_fingerprint(payload: Dict[str, Any], fields) -> str:
+    """Hash the given fields of a chart/dashboard payload, decoding JSON-string fields first"""
+    return fingerprint({
+        field: load_json_field(payload.get(field)) if field in JSON_FIELDS else payload.get(field)
+        for field in fields
+    })
+
+
+def differs(current: Dict[str, Any], desired: Dict[str, Any], fields) -> bool:
+    """Compare only the managed fields the desired payload actually sets"""
+    managed = [field for field in fields if field in desired]
+    return payload_fingerprint(current, managed) != payload_fingerprint(desired, managed)
+
+
+class DashboardSync:
+    def __init__(self, creator, prune: bool = False):
+        self.creator = creator
+        self.session = creator.session
+        self.base_url = creator.base_url
+        self.prune = prune
+        self.charts_by_name: Dict[str, Dict[str, Any]] = {}
+        self.dashboards_by_slug: Dict[str, Dict[str, Any]] = {}
+        self.stats = {"created": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+
+    def fetch_current_state(self, specs: List[Dict[str, Any]]) -> None:
+        """Load all charts, and the full definition of every managed dashboard, in bulk"""
+        columns = [
+            "id", "slice_name", "viz_type", "params", "datasource_id", "datasource_type", "cache_timeout", "query_context"
+        ]
+        self.charts_by_name = {
+            chart["slice_name"]: chart
+            for chart in list_all(self.session, self.base_url, "chart", columns=columns)
+        }
+
+        managed_slugs = {spec["slug"] for spec in specs}
+        for dashboard in list_all(self.session, self.base_url, "dashboard", columns=["id", "slug"]):
+            if dashboard.get("slug") in managed_slugs:
+                response = self.session.get(f"{self.base_url}/api/v1/dashboard/{dashboard['id']}")
+                response.raise_for_status()
+                self.dashboards_by_slug[dashboard["slug"]] = response.json()["result"]
+
+    def _write(self, method: str, path: str, payload: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        response = self.session.request(method, f"{self.base_url}{path}", json=payload)
+        if response.status_code in (200, 201):
+            return response.json()
+        print(f"❌ {method} {path} failed: {response.text}")
+        return None
+
+    def sync_chart(self, chart_spec: Dict[str, Any], dataset_id: int) -> Optional[int]:
+        desired = self.creator.chart_config(chart_spec, dataset_id)
+        current = self.charts_by_name.get(desired["slice_name"])
+
+        if current is None:
+            chart_id = self.creator.create_chart(desired)
+            if chart_id:
+                self.stats["created"] += 1
+            return chart_id
+
+        # query_context follows from the params, but charts provisioned before it was saved have none
+        if not differs(current, desired, CHART_FIELDS) and current.get("query_context"):
+            self.stats["unchanged"] += 1
+            return current["id"]
+
+        if self._write("PUT", f"/api/v1/chart/{current['id']}", desired) is None:
+            return None
+        print(f"🔄 Updated chart: {desired['slice_name']} (ID: {current['id']})")
+        self.stats["updated"] += 1
+        return current["id"]
+
+    def sync_dashboard(self, spec: Dict[str, Any], database_id: int) -> Optional[int]:
+        datasets = {}
+        for view in spec["datasets"]:
+            dataset_id = self.creator.create_dataset(view, database_id)
+            if dataset_id:
+                datasets[view] = dataset_id
+
+        chart_ids = {}
+        for chart_spec in spec["charts"]:
+            if chart_spec["dataset"] not in datasets:
+                continue
+            chart_id = self.sync_chart(chart_spec, datasets[chart_spec["dataset"]])
+            if chart_id:
+                chart_ids[chart_spec["slice_name"]] = chart_id
+
+        if not chart_ids:
+            return None
+
+        desired = self.creator.dashboard_config(spec, chart_ids)
+        current = self.dashboards_by_slug.get(spec["slug"])
+
+        if current is None:
+            dashboard_id = self.creator.create_dashboard(desired)
+            if dashboard_id:
+                self.stats["created"] += 1
+            return dashboard_id
+
+        # Superset enriches json_metadata on save, so only compare the keys we manage
+        current_metadata = load_json_field(current.get("json_metadata"))
+        desired_metadata = load_json_field(desired.get("json_metadata"))
+        comparable = dict(current)
+        if isinstance(current_metadata, dict) and isinstance(desired_metadata, dict):
+            comparable["json_metadata"] = {key: current_metadata.get(key) for key in desired_metadata}
+
+        if differs(comparable, desired, DASHBOARD_FIELDS):
+            if self._write("PUT", f"/api/v1/dashboard/{current['id']}", desired) is None:
+                return None
+            print(f"🔄 Updated dashboard: {desired['dashboard_title']} (ID: {current['id']})")
+            self.stats["updated"] += 1
+        else:
+            self.stats["unchanged"] += 1
+
+        if self.prune:
+            self.prune_charts(current, set(chart_ids.values()))
+
+        return current["id"]
+
+    def prune_charts(self, current_dashboard: Dict[str, Any], kept_chart_ids: set) -> None:
+        """Delete charts that were laid out on the dashboard but are no longer in its spec"""
+        position = load_json_field(current_dashboard.get("position_json"))
+        previous_chart_ids = {
+            component["meta"]["chartId"]
+            for component in position.values()
+            if isinstance(component, dict) and component.get("type") == "CHART"
+        }
+        for chart_id in sorted(previous_chart_ids - kept_chart_ids):
+            if self._write("DELETE", f"/api/v1/chart/{chart_id}") is not None:
+                print(f"🗑️ Deleted stale chart ID {chart_id}")
+                self.stats["deleted"] += 1
+
+    def sync_all(self, specs: List[Dict[str, Any]], database_id: int) -> Dict[str, Optional[int]]:
+        self.fetch_current_state(specs)
+        dashboards = {}
+        for spec in specs:
+            print(f"\n{spec['title'].replace('Creating', 'Syncing')}")
+            dashboards[spec["key"]] = self.sync_dashboard(spec, database_id)
+        return dashboards
+
+    def summary(self) -> str:
+        writes = self.stats["created"] + self.stats["updated"] + self.stats["deleted"]
+        return (
+            f"{self.stats['created']} created, {self.stats['updated']} updated, "
+            f"{self.stats['deleted']} deleted, {self.stats['unchanged']} unchanged ({writes} write calls)"
+        )
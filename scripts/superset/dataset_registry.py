@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Dataset registry shared by all dashboard builders
+Lists the datasets that already exist in Superset once, indexes them by
+(database_id, schema, table_name) and creates each missing view only once per run
+"""
+
+import threading
+from typing import Callable, Dict, Optional, Tuple
+
+import requests
+
+from superset_api import list_all
+
+DatasetKey = Tuple[int, str, str]
+
+
+class DatasetRegistry:
+    def __init__(self, session: requests.Session, base_url: str, page_size: int = 100):
+        self.session = session
+        self.base_url = base_url
+        self.page_size = page_size
+        self.index: Dict[DatasetKey, int] = {}
+        self.cache_timeouts: Dict[DatasetKey, Optional[int]] = {}
+        self.loaded_databases = set()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[DatasetKey, threading.Lock] = {}
+
+    def load(self, database_id: int) -> int:
+        """Index every existing dataset of a database with paginated list calls"""
+        loaded = 0
+        datasets = list_all(
+            self.session, self.base_url, "dataset",
+            columns=["id", "table_name", "schema", "database.id", "cache_timeout"],
+            filters=f"(col:database,opr:rel_o_m,value:{database_id})",
+            page_size=self.page_size
+        )
+        for dataset in datasets:
+            database = dataset.get("database") or {}
+            key = (database.get("id", database_id), dataset.get("schema") or "public", dataset["table_name"])
+            with self._lock:
+                self.index[key] = dataset["id"]
+                self.cache_timeouts[key] = dataset.get("cache_timeout")
+            loaded += 1
+
+        with self._lock:
+            self.loaded_databases.add(database_id)
+        return loaded
+
+    def resolve(
+        self,
+        database_id: int,
+        schema: str,
+        table_name: str,
+        create: Callable[[], Optional[int]]
+    ) -> Optional[int]:
+        """Return the dataset ID for a view, calling create() only if it does not exist yet
+
+        Concurrent callers asking for the same view wait for a single create call.
+        """
+        if database_id not in self.loaded_databases:
+            with self._lock:
+                database_lock = self._key_locks.setdefault((database_id, "", ""), threading.Lock())
+            with database_lock:
+                if database_id not in self.loaded_databases:
+                    try:
+                        self.load(database_id)
+                    except requests.RequestException as e:
+                        # Fall back to creating datasets blindly rather than failing the run
+                        print(f"⚠️ Could not list existing datasets: {str(e)}")
+                        with self._lock:
+                            self.loaded_databases.add(database_id)
+
+        key = (database_id, schema, table_name)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                dataset_id = self.index.get(key)
+                if dataset_id is not None:
+                    self.hits += 1
+                    return dataset_id
+                self.misses += 1
+
+            dataset_id = create()
+            if dataset_id is not None:
+                with self._lock:
+                    self.index[key] = dataset_id
+            return dataset_id
+
+    def summary(self) -> str:
+        return f"{self.hits} hits, {self.misses} misses, {len(self.index)} datasets indexed"
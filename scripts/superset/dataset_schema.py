@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+"""
+Pre-flight validation of chart specs against the columns of their views
+Fetches the column schema of every view the specs use once, caches it, and
+checks each chart's metrics, groupby, columns and time column against it
+before anything is created, so a typo surfaces as one report instead of as a
+failing query on every dashboard load
+"""
+
+import difflib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import requests
+
+# Saved metrics Superset adds to every new dataset
+DEFAULT_SAVED_METRICS = {"count"}
+COLUMN_PARAMS = ("groupby", "columns", "all_columns")
+METRIC_PARAMS = ("metrics", "metric", "timeseries_limit_metric", "secondary_metric")
+TEMPORAL_TYPES = ("DATE", "TIME")
+
+SchemaKey = Tuple[int, str, str]
+
+
+class DatasetSchemaCache:
+    """Column name -> type of each view, fetched once per (database, schema, view)"""
+
+    def __init__(self, session: requests.Session, base_url: str):
+        self.session = session
+        self.base_url = base_url
+        self.schemas: Dict[SchemaKey, Optional[Dict[str, str]]] = {}
+        self.fetches = 0
+        self._lock = threading.Lock()
+        self._key_locks: Dict[SchemaKey, threading.Lock] = {}
+
+    def _fetch(self, database_id: int, schema: str, table_name: str) -> Optional[Dict[str, str]]:
+        """Read the view's columns from Superset's table metadata, without creating a dataset"""
+        response = self.session.get(
+            f"{self.base_url}/api/v1/database/{database_id}/table/{table_name}/{schema}/"
+        )
+        if response.status_code in (404, 405):
+            # Superset 4.1+ replaced the path-style endpoint with query parameters
+            response = self.session.get(
+                f"{self.base_url}/api/v1/database/{database_id}/table_metadata/",
+                params={"name": table_name, "schema": schema}
+            )
+        with self._lock:
+            self.fetches += 1
+        if response.status_code != 200:
+            return None
+        return {column["name"]: str(column.get("type") or "") for column in response.json().get("columns", [])}
+
+    def columns(self, database_id: int, schema: str, table_name: str) -> Optional[Dict[str, str]]:
+        """The view's columns by name, or None if Superset could not describe it"""
+        key = (database_id, schema, table_name)
+        with self._lock:
+            if key in self.schemas:
+                return self.schemas[key]
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self.schemas:
+                    return self.schemas[key]
+            try:
+                columns = self._fetch(database_id, schema, table_name)
+            except requests.RequestException as e:
+                print(f"⚠️ Could not describe {schema}.{table_name}: {str(e)}")
+                columns = None
+            with self._lock:
+                self.schemas[key] = columns
+            return columns
+
+    def prefetch(self, database_id: int, schema: str, table_names: List[str], max_workers: int = 8) -> None:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            list(executor.map(lambda table_name: self.columns(database_id, schema, table_name), table_names))
+
+
+def chart_references(chart_spec: Dict[str, Any]) -> Iterator[Tuple[str, str, str]]:
+    """Yield (param, kind, name) for every column or metric a chart's params refer to
+
+    kind is "column", "temporal", "metric" (a column inside an ad-hoc metric)
+    or "saved_metric" (a bare string, which Superset resolves as a saved metric).
+    Free-form SQL expressions are not checked.
+    """
+    params = chart_spec["params"]
+
+    for param in COLUMN_PARAMS:
+        for column in params.get(param) or []:
+            if isinstance(column, str):
+                yield param, "column", column
+
+    if params.get("granularity_sqla"):
+        yield "granularity_sqla", "temporal", params["granularity_sqla"]
+    if isinstance(params.get("x_axis"), str):
+        yield "x_axis", "column", params["x_axis"]
+
+    for param in METRIC_PARAMS:
+        metrics = params.get(param)
+        for metric in metrics if isinstance(metrics, list) else [metrics]:
+            if isinstance(metric, str):
+                yield param, "saved_metric", metric
+            elif isinstance(metric, dict) and metric.get("expressionType") == "SIMPLE":
+                column = metric.get("column") or {}
+                if column.get("column_name"):
+                    yield param, "metric", column["column_name"]
+
+
+def check_chart(chart_spec: Dict[str, Any], columns: Dict[str, str]) -> List[str]:
+    """Every reference of one chart that its view cannot satisfy"""
+    problems = []
+    for param, kind, name in chart_references(chart_spec):
+        if kind == "saved_metric":
+            if name in DEFAULT_SAVED_METRICS:
+                continue
+            if name in columns:
+                problems.append(
+                    f"{param} '{name}' is a bare column name; Superset looks it up as a saved metric "
+                    f"- use an ad-hoc SIMPLE metric over the column instead"
+                )
+                continue
+        elif name in columns:
+            column_type = columns[name].upper()
+            if kind == "temporal" and column_type and not any(marker in column_type for marker in TEMPORAL_TYPES):
+                problems.append(f"{param} '{name}' is not a temporal column ({columns[name]})")
+            continue
+
+        problem = f"{param} '{name}' is not a column of {chart_spec['dataset']}"
+        suggestions = difflib.get_close_matches(name, columns, n=2)
+        if suggestions:
+            problem += f" (did you mean {' or '.join(repr(s) for s in suggestions)}?)"
+        problems.append(problem)
+    return problems
+
+
+def validate_charts(
+    cache: DatasetSchemaCache,
+    specs: List[Dict[str, Any]],
+    database_id: int,
+    schema: str = "public",
+    max_workers: int = 8
+) -> List[str]:
+    """Check every chart of every spec against its view; returns one line per mismatch"""
+    views = sorted({view for spec in specs for view in spec["datasets"]})
+    cache.prefetch(database_id, schema, views, max_workers=max_workers)
+
+    report = []
+    for view in views:
+        if cache.columns(database_id, schema, view) is None:
+            report.append(f"{view}: view could not be described (missing, or no access)")
+    for spec in specs:
+        for chart_spec in spec["charts"]:
+            columns = cache.columns(database_id, schema, chart_spec["dataset"])
+            if columns is None:
+                continue
+            for problem in check_chart(chart_spec, columns):
+                report.append(f"{spec['dashboard_title']} / {chart_spec['slice_name']}: {problem}")
+    return report
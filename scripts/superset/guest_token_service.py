@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+Guest-token service for the embedded dashboards
+Mints Superset guest tokens for the Next.js embeds with the provisioning
+service account, caches each one per (user, dashboard, RLS filter) until
+shortly before it expires, and coalesces concurrent identical requests: the
+requests for one user and RLS filter that arrive within a short batch window
+share a single upstream call, minting one token that covers every dashboard
+they asked for
+
+Callers authenticate with the X-Service-Token header (GUEST_TOKEN_SERVICE_SECRET).
+Which dashboards a user may embed, and the row-level security of each token,
+come from the service's policy file, never from the request.
+
+Usage:
+    GUEST_TOKEN_SERVICE_SECRET=... python guest_token_service.py --policy guest-token-policy.json
+    curl -X POST localhost:8090/guest-token -H "X-Service-Token: $GUEST_TOKEN_SERVICE_SECRET" \\
+        -d '{"user": {"username": "hmi-line-3"}, "dashboard": "<embedded dashboard uuid>"}'
+"""
+
+import argparse
+import hmac
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from superset_api import fingerprint, load_creator_module
+from superset_auth import jwt_expiry
+
+# Guest tokens of unreadable lifetime are assumed to live GUEST_TOKEN_JWT_EXP_TIMEDELTA
+DEFAULT_TOKEN_TTL = 300
+
+CacheKey = Tuple[str, str, str]
+# A policy entry that applies to every dashboard (of a user) or every user
+WILDCARD = "*"
+
+
+class GuestTokenPolicy:
+    """Which embedded dashboards each user may get a guest token for, and with which RLS rules
+
+    The policy file maps usernames to dashboards (embedded UUIDs, or "*") and
+    the RLS rules of each, e.g.
+        {"users": {"hmi-line-3": {"<uuid>": [{"clause": "equipment_code = 'LINE-3'"}]}}}
+    A user or dashboard without an entry (or a "*" entry) gets no token.
+    """
+
+    def __init__(self, users: Dict[str, Dict[str, List[Dict[str, Any]]]]):
+        self.users = users
+
+    @classmethod
+    def load(cls, path: Path) -> "GuestTokenPolicy":
+        with open(path) as f:
+            policy = json.load(f)
+        users = policy.get("users")
+        if not isinstance(users, dict) or not all(
+            isinstance(dashboards, dict) and all(isinstance(rls, list) for rls in dashboards.values())
+            for dashboards in users.values()
+        ):
+            raise ValueError(f"{path}: 'users' must map usernames to {{dashboard: [rls rules]}}")
+        return cls(users)
+
+    def rls(self, username: str, dashboard: str) -> Optional[List[Dict[str, Any]]]:
+        """The user's RLS rules on the dashboard, or None if the user may not embed it"""
+        dashboards = self.users.get(username, self.users.get(WILDCARD))
+        if dashboards is None:
+            return None
+        return dashboards.get(dashboard, dashboards.get(WILDCARD))
+
+
+class GuestTokenService:
+    def __init__(
+        self,
+        session: requests.Session,
+        base_url: str,
+        refresh_margin: float = 30,
+        batch_window: float = 0.02,
+        timeout: float = 30
+    ):
+        self.session = session
+        self.base_url = base_url
+        # Cached tokens are handed out until this many seconds before they expire
+        self.refresh_margin = refresh_margin
+        # How long the first request of a batch waits for others to join it
+        self.batch_window = batch_window
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._cache: Dict[CacheKey, Tuple[str, float]] = {}
+        self._inflight: Dict[CacheKey, Future] = {}
+        # Requests waiting for their batch to be minted, by (username, rls) then dashboard
+        self._batches: Dict[Tuple[str, str], Dict[str, Future]] = {}
+        self.hits = 0
+        self.coalesced = 0
+        self.mints = 0
+        self.failures = 0
+
+    def guest_token(self, user: Dict[str, Any], dashboard: str, rls: Optional[List[Dict[str, Any]]] = None) -> Tuple[str, float]:
+        """A guest token for one user and embedded dashboard, and its expiry (epoch seconds)"""
+        rls = rls or []
+        group = (user["username"], fingerprint(rls))
+        key = (group[0], str(dashboard), group[1])
+        leader = False
+
+        with self._lock:
+            cached = self._cache.get(key)
+            if cached and cached[1] - time.time() > self.refresh_margin:
+                self.hits += 1
+                return cached
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+            else:
+                future = Future()
+                self._inflight[key] = future
+                batch = self._batches.get(group)
+                if batch is None:
+                    self._batches[group] = {str(dashboard): future}
+                    leader = True
+                else:
+                    batch[str(dashboard)] = future
+
+        if leader:
+            time.sleep(self.batch_window)
+            with self._lock:
+                batch = self._batches.pop(group)
+            self._mint(user, rls, group, batch)
+        return future.result(timeout=self.timeout)
+
+    def _mint(self, user: Dict[str, Any], rls: List[Dict[str, Any]], group: Tuple[str, str], batch: Dict[str, Future]) -> None:
+        """One upstream call for every dashboard of a batch; resolves all of its waiters"""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/v1/security/guest_token/",
+                json={
+                    "user": user,
+                    "resources": [{"type": "dashboard", "id": dashboard} for dashboard in batch],
+                    "rls": rls,
+                }
+            )
+            response.raise_for_status()
+            token = response.json()["token"]
+            result = (token, jwt_expiry(token) or time.time() + DEFAULT_TOKEN_TTL)
+        except Exception as e:
+            with self._lock:
+                self.failures += 1
+                for dashboard in batch:
+                    self._inflight.pop((group[0], dashboard, group[1]), None)
+            for future in batch.values():
+                future.set_exception(e)
+            return
+
+        with self._lock:
+            self.mints += 1
+            for dashboard in batch:
+                key = (group[0], dashboard, group[1])
+                self._cache[key] = result
+                self._inflight.pop(key, None)
+            self._evict_expired()
+        for future in batch.values():
+            future.set_result(result)
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        for key in [key for key, (_, expires_at) in self._cache.items() if expires_at <= now]:
+            del self._cache[key]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "cached": len(self._cache),
+                "hits": self.hits,
+                "coalesced": self.coalesced,
+                "mints": self.mints,
+                "failures": self.failures,
+            }
+
+
+def make_handler(service: GuestTokenService, policy: GuestTokenPolicy, shared_secret: Optional[str]):
+    class GuestTokenHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Cache-Control", "no-store")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _authorized(self) -> bool:
+            if not shared_secret:
+                # Only reachable with --insecure
+                return True
+            return hmac.compare_digest(self.headers.get("X-Service-Token", ""), shared_secret)
+
+        def do_GET(self):
+            if self.path == "/health":
+                self._send(200, {"status": "OK"})
+            elif self.path == "/stats" and self._authorized():
+                self._send(200, service.stats())
+            else:
+                self._send(404, {"message": "Not found"})
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            if self.path != "/guest-token":
+                self._send(404, {"message": "Not found"})
+                return
+            if not self._authorized():
+                self._send(401, {"message": "Missing or invalid X-Service-Token"})
+                return
+            try:
+                request = json.loads(body)
+                user, dashboard = request["user"], str(request["dashboard"])
+                if not user.get("username"):
+                    raise ValueError("user.username is required")
+                if request.get("rls"):
+                    raise ValueError("rls is set by the service's policy, not by the caller")
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                self._send(400, {"message": f"Invalid request: {str(e)}"})
+                return
+            rls = policy.rls(user["username"], dashboard)
+            if rls is None:
+                self._send(403, {"message": f"{user['username']} may not embed dashboard {dashboard}"})
+                return
+            try:
+                token, expires_at = service.guest_token(user, dashboard, rls)
+            except Exception as e:
+                self._send(502, {"message": f"Superset did not mint a guest token: {str(e)}"})
+                return
+            self._send(200, {"token": token, "expires_at": expires_at})
+
+    return GuestTokenHandler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve cached, coalesced Superset guest tokens to the embeds")
+    parser.add_argument("--url", default=os.environ.get("SUPERSET_URL", "http://localhost:8088"))
+    parser.add_argument("--username", default=os.environ.get("SUPERSET_USERNAME", "admin"))
+    parser.add_argument("--password", default=os.environ.get("SUPERSET_PASSWORD", "admin"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=int(os.environ.get("GUEST_TOKEN_SERVICE_PORT", 8090)))
+    parser.add_argument("--refresh-margin", type=float, default=30, help="Stop serving a cached token this many seconds before expiry")
+    parser.add_argument("--batch-window", type=float, default=0.02, help="Seconds a mint waits for identical requests to join")
+    parser.add_argument(
+        "--policy",
+        type=Path,
+        default=os.environ.get("GUEST_TOKEN_SERVICE_POLICY"),
+        help="JSON file of the dashboards and RLS rules of each user (see guest-token-policy.example.json)"
+    )
+    parser.add_argument(
+        "--insecure",
+        action="store_true",
+        help="Serve tokens without GUEST_TOKEN_SERVICE_SECRET, to any caller that can reach the port (development only)"
+    )
+    args = parser.parse_args()
+
+    shared_secret = os.environ.get("GUEST_TOKEN_SERVICE_SECRET")
+    if not shared_secret and not args.insecure:
+        parser.error("GUEST_TOKEN_SERVICE_SECRET is not set (pass --insecure to run without one)")
+    if args.policy is None:
+        parser.error("--policy (or GUEST_TOKEN_SERVICE_POLICY) is required")
+    try:
+        policy = GuestTokenPolicy.load(args.policy)
+    except (OSError, ValueError) as e:
+        parser.error(f"Could not load the policy: {str(e)}")
+
+    creator_module = load_creator_module()
+    creator = creator_module.SupersetDashboardCreator(args.url, args.username, args.password, pool_size=32)
+    if not creator.authenticate():
+        raise SystemExit(1)
+
+    service = GuestTokenService(
+        creator.session, args.url, refresh_margin=args.refresh_margin, batch_window=args.batch_window
+    )
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(service, policy, shared_secret))
+    server.daemon_threads = True
+    print(f"🎟️ Guest-token service listening on http://{args.host}:{args.port} (Superset {args.url})")
+    if not shared_secret:
+        print("⚠️ Running --insecure: any caller that can reach the port can mint guest tokens")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(f"📊 {service.stats()}")
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Structured instrumentation for the Superset provisioning tools
+Timing spans (login, CSRF fetch, dataset, chart, dashboard, ...) and counters,
+summarised as JSON and exported in the Prometheus text format, either as a
+node_exporter textfile or pushed to the Pushgateway of the monitoring stack.
+A disabled Instrumentation hands out one shared no-op span, so instrumented
+code costs a method call and nothing else when metrics are off.
+"""
+
+import json
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import requests
+
+METRIC_PREFIX = "superset_provisioning"
+# Histogram buckets of span durations, in seconds
+SPAN_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+Listener = Callable[[str, Dict[str, str], float, bool], None]
+
+
+class Span:
+    """Times one operation; set `ok = False` when it failed without raising"""
+
+    __slots__ = ("instrumentation", "name", "labels", "started", "ok")
+
+    def __init__(self, instrumentation: "Instrumentation", name: str, labels: Dict[str, str]):
+        self.instrumentation = instrumentation
+        self.name = name
+        self.labels = labels
+        self.started = 0.0
+        self.ok = True
+
+    def __enter__(self) -> "Span":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.instrumentation.record(self.name, self.labels, time.perf_counter() - self.started, self.ok and exc_type is None)
+
+
+class _NullSpan:
+    __slots__ = ()
+    ok = True
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        pass
+
+
+NULL_SPAN = _NullSpan()
+
+
+class Instrumentation:
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        # (span name, sorted labels) -> count, failures, total_s, max_s, bucket counts
+        self.spans: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Dict[str, Any]] = {}
+        self.counters: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], float] = {}
+        self.listeners: List[Listener] = []
+        # Per-endpoint HTTP timings and retries, exported with the spans when set
+        self.transport = None
+
+    def span(self, name: str, **labels: str):
+        if not self.enabled:
+            return NULL_SPAN
+        return Span(self, name, labels)
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def add_listener(self, listener: Listener) -> None:
+        """Call listener(span, labels, seconds, ok) as every span finishes, e.g. for progress output"""
+        self.listeners.append(listener)
+
+    def record(self, name: str, labels: Dict[str, str], elapsed: float, ok: bool) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            stats = self.spans.get(key)
+            if stats is None:
+                stats = self.spans[key] = {
+                    "count": 0, "failures": 0, "total_s": 0.0, "max_s": 0.0, "buckets": [0] * len(SPAN_BUCKETS)
+                }
+            stats["count"] += 1
+            stats["failures"] += int(not ok)
+            stats["total_s"] += elapsed
+            stats["max_s"] = max(stats["max_s"], elapsed)
+            for index, bound in enumerate(SPAN_BUCKETS):
+                if elapsed <= bound:
+                    stats["buckets"][index] += 1
+        for listener in self.listeners:
+            listener(name, labels, elapsed, ok)
+
+    def summary(self) -> Dict[str, Any]:
+        """JSON-serialisable totals per span name (labels folded together), counters and HTTP retries"""
+        spans: Dict[str, Dict[str, float]] = {}
+        with self._lock:
+            for (name, _), stats in sorted(self.spans.items()):
+                total = spans.setdefault(name, {"count": 0, "failures": 0, "total_s": 0.0, "max_s": 0.0})
+                total["count"] += stats["count"]
+                total["failures"] += stats["failures"]
+                total["total_s"] += stats["total_s"]
+                total["max_s"] = max(total["max_s"], stats["max_s"])
+            counters: Dict[str, float] = {}
+            for (name, _), value in sorted(self.counters.items()):
+                counters[name] = counters.get(name, 0) + value
+        for total in spans.values():
+            total["total_s"] = round(total["total_s"], 3)
+            total["max_s"] = round(total["max_s"], 3)
+            total["mean_s"] = round(total["total_s"] / total["count"], 3) if total["count"] else 0.0
+
+        summary: Dict[str, Any] = {
+            "duration_s": round(time.time() - self.started_at, 3),
+            "spans": spans,
+            "counters": counters,
+        }
+        if self.transport is not None:
+            endpoints = dict(self.transport.endpoints)
+            summary["http"] = {
+                "requests": int(sum(stats["calls"] for stats in endpoints.values())),
+                "retries": int(sum(stats["retries"] for stats in endpoints.values())),
+                "failures": int(sum(stats["failures"] for stats in endpoints.values())),
+            }
+        return summary
+
+    def render(self, openmetrics: bool = False) -> str:
+        """The metrics in the Prometheus text format (or OpenMetrics, which also ends with # EOF)"""
+        lines: List[str] = []
+
+        def family(name: str, metric_type: str, help_text: str) -> None:
+            # Prometheus text format names counter families with their _total suffix, OpenMetrics without
+            family_name = name[:-len("_total")] if openmetrics and name.endswith("_total") else name
+            lines.append(f"# HELP {family_name} {help_text}")
+            lines.append(f"# TYPE {family_name} {metric_type}")
+
+        def sample(name: str, labels: Dict[str, str], value: float) -> None:
+            rendered = ",".join(f'{key}="{escape(str(val))}"' for key, val in sorted(labels.items()))
+            number = str(int(value)) if float(value).is_integer() else repr(float(value))
+            lines.append(f"{name}{{{rendered}}} {number}" if rendered else f"{name} {number}")
+
+        with self._lock:
+            spans = {key: dict(stats, buckets=list(stats["buckets"])) for key, stats in self.spans.items()}
+            counters = dict(self.counters)
+
+        name = f"{METRIC_PREFIX}_span_seconds"
+        family(name, "histogram", "Duration of provisioning operations")
+        for (span, labels), stats in sorted(spans.items()):
+            labels_dict = dict(labels, span=span)
+            for bound, cumulative in zip(SPAN_BUCKETS, stats["buckets"]):
+                sample(f"{name}_bucket", dict(labels_dict, le=repr(float(bound))), cumulative)
+            sample(f"{name}_bucket", dict(labels_dict, le="+Inf"), stats["count"])
+            sample(f"{name}_sum", labels_dict, round(stats["total_s"], 6))
+            sample(f"{name}_count", labels_dict, stats["count"])
+
+        name = f"{METRIC_PREFIX}_span_failures_total"
+        family(name, "counter", "Provisioning operations that failed")
+        for (span, labels), stats in sorted(spans.items()):
+            sample(name, dict(labels, span=span), stats["failures"])
+
+        for counter in sorted({counter for counter, _ in counters}):
+            name = f"{METRIC_PREFIX}_{counter}_total"
+            family(name, "counter", f"Provisioning {counter.replace('_', ' ')}")
+            for (key, labels), value in sorted(counters.items()):
+                if key == counter:
+                    sample(name, dict(labels), value)
+
+        if self.transport is not None:
+            endpoints = dict(self.transport.endpoints)
+            for field, help_text in (
+                ("calls", "Superset API requests"),
+                ("retries", "Superset API requests retried after 429/5xx or connection errors"),
+                ("failures", "Superset API requests that failed after retrying"),
+            ):
+                name = f"{METRIC_PREFIX}_http_{'requests' if field == 'calls' else field}_total"
+                family(name, "counter", help_text)
+                for endpoint, stats in sorted(endpoints.items()):
+                    sample(name, {"endpoint": endpoint}, stats[field])
+
+        name = f"{METRIC_PREFIX}_last_run_timestamp_seconds"
+        family(name, "gauge", "When the provisioning run finished")
+        sample(name, {}, round(time.time(), 3))
+        name = f"{METRIC_PREFIX}_run_duration_seconds"
+        family(name, "gauge", "Wall-clock duration of the provisioning run")
+        sample(name, {}, round(time.time() - self.started_at, 3))
+
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def write_textfile(self, path: Path, openmetrics: bool = False) -> None:
+        """Atomically replace a node_exporter textfile-collector file (*.prom)"""
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+        with os.fdopen(fd, "w") as f:
+            f.write(self.render(openmetrics))
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+
+    def push(self, gateway_url: str, job: str = METRIC_PREFIX, instance: Optional[str] = None) -> None:
+        """Replace this job's metrics on a Prometheus Pushgateway"""
+        url = f"{gateway_url.rstrip('/')}/metrics/job/{job}"
+        if instance:
+            url += f"/instance/{instance}"
+        response = requests.put(
+            url, data=self.render().encode(), headers={"Content-Type": "text/plain; version=0.0.4"}, timeout=10
+        )
+        response.raise_for_status()
+
+    def write_json(self, path: Path) -> None:
+        with open(path, "w") as f:
+            json.dump(self.summary(), f, indent=2)
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
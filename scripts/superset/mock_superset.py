@@ -0,0 +1,511 @@
+#!/usr/bin/env python3
+"""
+Local mock of the Superset REST API used by the provisioning benchmarks
+Keeps datasets, charts and dashboards in memory and adds a fixed latency
+to every request to emulate a remote Superset instance
+"""
+
+import argparse
+import base64
+import hashlib
+import io
+import json
+import random
+import re
+import threading
+import time
+import uuid
+import zipfile
+from email.parser import BytesParser
+from email.policy import default
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import unquote
+
+import yaml
+
+RESOURCE_PATTERN = re.compile(r"^/api/v1/(dataset|chart|dashboard)/(?:(\d+))?$")
+TABLE_PATTERN = re.compile(r"^/api/v1/database/1/table/([^/]+)/[^/]+/$")
+DASHBOARD_CHARTS_PATTERN = re.compile(r"^/api/v1/dashboard/(\d+)/charts$")
+DATASET_REFRESH_PATTERN = re.compile(r"^/api/v1/dataset/(\d+)/refresh$")
+PAGE_PATTERN = re.compile(r"page:(\d+),page_size:(\d+)")
+
+# Columns of the Superset views (scripts/create-superset-views.sql) and the continuous aggregates
+# charts are routed to, as Superset's table metadata reports them
+VIEW_COLUMNS: Dict[str, Dict[str, str]] = {
+    "v_realtime_production": {
+        "date": "DATE", "time_string": "VARCHAR(8)", "shift_name": "VARCHAR(50)",
+        "equipment_code": "VARCHAR(50)", "equipment_name": "VARCHAR(100)", "equipment_type": "VARCHAR(50)",
+        "product_code": "VARCHAR(50)", "product_name": "VARCHAR(100)", "planned_hours": "NUMERIC",
+        "operating_hours": "NUMERIC", "total_parts_produced": "INTEGER", "good_parts": "INTEGER",
+        "reject_parts": "INTEGER", "quality_rate": "NUMERIC", "cycle_time_actual": "NUMERIC",
+        "cycle_time_standard": "NUMERIC", "speed_rate": "NUMERIC", "operator_id": "VARCHAR(50)",
+        "work_order": "VARCHAR(50)", "created_at": "TIMESTAMP WITHOUT TIME ZONE",
+    },
+    "v_equipment_status": {
+        "equipment_code": "VARCHAR(50)", "equipment_name": "VARCHAR(100)", "equipment_type": "VARCHAR(50)",
+        "location_code": "VARCHAR(50)", "department": "VARCHAR(100)", "current_status": "TEXT",
+        "oee_7_day_avg": "NUMERIC", "availability_7_day_avg": "NUMERIC", "performance_7_day_avg": "NUMERIC",
+        "quality_7_day_avg": "NUMERIC", "last_activity": "TIMESTAMP WITHOUT TIME ZONE",
+    },
+    "v_downtime_analysis": {
+        "date": "DATE", "equipment_code": "VARCHAR(50)", "equipment_name": "VARCHAR(100)",
+        "equipment_type": "VARCHAR(50)", "reason_code": "VARCHAR(50)", "reason_description": "VARCHAR(255)",
+        "category_level_1": "VARCHAR(100)", "category_level_2": "VARCHAR(100)", "category_level_3": "VARCHAR(100)",
+        "occurrence_count": "BIGINT", "total_hours": "NUMERIC", "avg_minutes": "NUMERIC",
+        "max_minutes": "NUMERIC", "min_minutes": "NUMERIC",
+    },
+    "v_quality_metrics": {
+        "date": "DATE", "equipment_code": "VARCHAR(50)", "equipment_name": "VARCHAR(100)",
+        "product_code": "VARCHAR(50)", "product_name": "VARCHAR(100)", "inspection_type": "VARCHAR(50)",
+        "inspection_count": "BIGINT", "total_samples": "BIGINT", "total_defects": "BIGINT",
+        "dppm": "NUMERIC", "quality_rate": "NUMERIC",
+    },
+    "v_scrap_analysis": {
+        "date": "DATE", "equipment_code": "VARCHAR(50)", "equipment_name": "VARCHAR(100)",
+        "product_code": "VARCHAR(50)", "product_name": "VARCHAR(100)", "defect_code": "VARCHAR(50)",
+        "defect_name": "VARCHAR(100)", "defect_category": "VARCHAR(50)", "severity_level": "INTEGER",
+        "scrap_events": "BIGINT", "total_quantity": "BIGINT", "total_weight_kg": "NUMERIC",
+        "total_cost": "NUMERIC", "rework_quantity": "BIGINT", "avg_cost_per_event": "NUMERIC",
+    },
+    "v_oee_hourly_trend": {
+        "date": "DATE", "hour": "NUMERIC", "equipment_code": "VARCHAR(50)", "equipment_name": "VARCHAR(100)",
+        "equipment_type": "VARCHAR(50)", "avg_oee": "NUMERIC", "avg_availability": "NUMERIC",
+        "avg_performance": "NUMERIC", "avg_quality": "NUMERIC", "total_parts": "BIGINT", "good_parts": "BIGINT",
+    },
+    "v_shift_performance": {
+        "shift_code": "VARCHAR(20)", "shift_name": "VARCHAR(50)", "equipment_type": "VARCHAR(50)",
+        "days_worked": "BIGINT", "avg_oee": "NUMERIC", "avg_availability": "NUMERIC",
+        "avg_performance": "NUMERIC", "avg_quality": "NUMERIC", "total_parts_produced": "BIGINT",
+        "total_good_parts": "BIGINT", "total_downtime_hours": "NUMERIC",
+    },
+    "v_kpi_summary": {
+        "active_equipment": "BIGINT", "current_oee": "NUMERIC", "current_availability": "NUMERIC",
+        "current_performance": "NUMERIC", "current_quality": "NUMERIC", "today_production": "BIGINT",
+        "today_good_production": "BIGINT", "mtd_oee": "NUMERIC", "mtd_production": "BIGINT",
+        "mtd_good_production": "BIGINT", "mtd_downtime_hours": "NUMERIC", "avg_mtbf_hours": "NUMERIC",
+        "avg_mttr_hours": "NUMERIC",
+    },
+    "oee_5min": {
+        "bucket": "TIMESTAMP WITH TIME ZONE", "equipment_id": "VARCHAR(50)", "avg_oee": "DOUBLE PRECISION",
+        "avg_availability": "DOUBLE PRECISION", "avg_performance": "DOUBLE PRECISION",
+        "avg_quality": "DOUBLE PRECISION", "total_production": "DOUBLE PRECISION",
+        "total_good": "DOUBLE PRECISION", "total_reject": "DOUBLE PRECISION", "sample_count": "BIGINT",
+    },
+    "oee_hourly": {
+        "bucket": "TIMESTAMP WITH TIME ZONE", "equipment_id": "VARCHAR(50)", "avg_oee": "DOUBLE PRECISION",
+        "avg_availability": "DOUBLE PRECISION", "avg_performance": "DOUBLE PRECISION",
+        "avg_quality": "DOUBLE PRECISION", "total_production": "DOUBLE PRECISION",
+        "total_good": "DOUBLE PRECISION", "total_reject": "DOUBLE PRECISION", "sample_count": "BIGINT",
+        "min_oee": "DOUBLE PRECISION", "max_oee": "DOUBLE PRECISION",
+    },
+    "sensor_1min": {
+        "bucket": "TIMESTAMP WITH TIME ZONE", "equipment_id": "VARCHAR(50)", "sensor_name": "VARCHAR(100)",
+        "avg_value": "DOUBLE PRECISION", "min_value": "DOUBLE PRECISION", "max_value": "DOUBLE PRECISION",
+        "stddev_value": "DOUBLE PRECISION", "sample_count": "BIGINT",
+    },
+}
+
+
+
+class MockSupersetState:
+    def __init__(
+        self,
+        latency: float = 0.05,
+        error_rate: float = 0.0,
+        token_ttl: Optional[float] = None,
+        query_latency: float = 0.2
+    ):
+        self.latency = latency
+        # Extra time a chart data query takes when its result is not cached
+        self.query_latency = query_latency
+        self.data_cache: set = set()
+        self.error_rate = error_rate
+        # When set, access tokens expire after token_ttl seconds and are enforced
+        self.token_ttl = token_ttl
+        self.logins = 0
+        self.refreshes = 0
+        self.guest_tokens = 0
+        # Lifetime of minted guest tokens, like GUEST_TOKEN_JWT_EXP_TIMEDELTA
+        self.guest_token_ttl = 300.0
+        self.lock = threading.Lock()
+        self.next_id = 1
+        self.objects: Dict[str, Dict[int, Dict[str, Any]]] = {"dataset": {}, "chart": {}, "dashboard": {}}
+        self.request_count = 0
+        # Column name -> SQL type of the views the mock can describe; others are reported as missing
+        self.table_columns: Dict[str, Dict[str, str]] = {name: dict(columns) for name, columns in VIEW_COLUMNS.items()}
+
+    def reset(self) -> None:
+        with self.lock:
+            self.next_id = 1
+            self.objects = {"dataset": {}, "chart": {}, "dashboard": {}}
+            self.request_count = 0
+            self.data_cache = set()
+
+    def create(self, resource: str, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self.lock:
+            if resource == "dataset":
+                for existing in self.objects["dataset"].values():
+                    if (existing["table_name"] == body.get("table_name")
+                            and existing["database"] == body.get("database")):
+                        return 422, {"message": {"table_name": ["Dataset already exists"]}}
+            if resource == "dashboard" and body.get("slug"):
+                for existing in self.objects["dashboard"].values():
+                    if existing.get("slug") == body["slug"]:
+                        return 422, {"message": {"slug": ["Must be unique"]}}
+            object_id = self.next_id
+            self.next_id += 1
+            self.objects[resource][object_id] = dict(body, id=object_id, uuid=body.get("uuid") or str(uuid.uuid4()))
+            return 201, {"id": object_id, "result": body}
+
+    def dashboard_charts(self, dashboard_id: int) -> Tuple[int, Dict[str, Any]]:
+        """GET /api/v1/dashboard/<id>/charts: the charts laid out on a dashboard, with their form_data"""
+        with self.lock:
+            dashboard = self.objects["dashboard"].get(dashboard_id)
+            if dashboard is None:
+                return 404, {"message": "Not found"}
+            position = json.loads(dashboard.get("position_json") or "{}")
+            chart_ids = [
+                component["meta"]["chartId"] for component in position.values()
+                if isinstance(component, dict) and component.get("type") == "CHART"
+            ]
+            charts = [self.objects["chart"][chart_id] for chart_id in chart_ids if chart_id in self.objects["chart"]]
+        return 200, {"result": [
+            {
+                "id": chart["id"],
+                "slice_name": chart["slice_name"],
+                "viz_type": chart.get("viz_type"),
+                "form_data": dict(
+                    json.loads(chart.get("params") or "{}"),
+                    slice_id=chart["id"],
+                    viz_type=chart.get("viz_type"),
+                    datasource=f"{chart.get('datasource_id')}__{chart.get('datasource_type', 'table')}",
+                ),
+            }
+            for chart in charts
+        ]}
+
+    def chart_data(self, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        """POST /api/v1/chart/data: cold queries take query_latency, repeated ones are served from cache"""
+        results = []
+        if body.get("result_type") == "query":
+            with self.lock:
+                dataset = self.objects["dataset"].get(body.get("datasource", {}).get("id"), {})
+            table = f"{dataset.get('schema') or 'public'}.{dataset.get('table_name', 'unknown')}"
+            for query in body.get("queries", []):
+                select = ", ".join(query.get("columns", []) + [str(metric) for metric in query.get("metrics", [])])
+                results.append({"query": f"SELECT {select or '*'} FROM {table}", "language": "sql"})
+            return 200, {"result": results}
+        for query in body.get("queries", []):
+            cache_key = hashlib.md5(
+                json.dumps([body.get("datasource"), query], sort_keys=True).encode()
+            ).hexdigest()
+            with self.lock:
+                is_cached = not body.get("force") and cache_key in self.data_cache
+            if not is_cached:
+                time.sleep(self.query_latency)
+                with self.lock:
+                    self.data_cache.add(cache_key)
+            results.append({
+                "cache_key": cache_key,
+                "is_cached": is_cached,
+                "rowcount": int(cache_key[:4], 16) % 500 + 1,
+                "data": [],
+            })
+        return 200, {"result": results}
+
+    def issue_token(self, kind: str) -> str:
+        """An unsigned JWT carrying an `exp` claim, like Superset's flask-jwt tokens"""
+        ttl = self.token_ttl if kind == "access" and self.token_ttl else 3600
+        if kind == "guest":
+            ttl = self.guest_token_ttl
+        header = base64.urlsafe_b64encode(b'{"alg":"none"}').rstrip(b"=").decode()
+        claims = json.dumps({"type": kind, "exp": time.time() + ttl, "jti": random.random()}).encode()
+        return f"{header}.{base64.urlsafe_b64encode(claims).rstrip(b'=').decode()}.mock"
+
+    def token_valid(self, authorization: Optional[str]) -> bool:
+        if not self.token_ttl:
+            return True
+        if not authorization or not authorization.startswith("Bearer "):
+            return False
+        payload = authorization[7:].split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return json.loads(base64.urlsafe_b64decode(payload))["exp"] > time.time()
+
+    def import_bundle(self, archive: bytes) -> Tuple[int, Dict[str, Any]]:
+        """Upsert every dataset, chart and dashboard of an import ZIP, matching on UUID"""
+        with zipfile.ZipFile(io.BytesIO(archive)) as bundle:
+            documents = [
+                (name.split("/")[1], yaml.safe_load(bundle.read(name)))
+                for name in bundle.namelist() if name.count("/") >= 2
+            ]
+        with self.lock:
+            for folder, document in documents:
+                resource = folder.rstrip("s")
+                if resource not in self.objects:
+                    continue
+                existing = next(
+                    (obj for obj in self.objects[resource].values() if obj.get("uuid") == document["uuid"]),
+                    None
+                )
+                if existing is not None:
+                    existing.update(document)
+                else:
+                    self.objects[resource][self.next_id] = dict(document, id=self.next_id, database=1)
+                    self.next_id += 1
+        return 200, {"message": "OK"}
+
+    def update(self, resource: str, object_id: int, body: Dict[str, Any]) -> Tuple[int, Dict[str, Any]]:
+        with self.lock:
+            if object_id not in self.objects[resource]:
+                return 404, {"message": "Not found"}
+            self.objects[resource][object_id].update(body)
+            return 200, {"id": object_id, "result": body}
+
+    def refresh_dataset(self, dataset_id: int) -> Tuple[int, Dict[str, Any]]:
+        """Re-read a dataset's columns from its table, like Superset's dataset refresh"""
+        with self.lock:
+            dataset = self.objects["dataset"].get(dataset_id)
+            if dataset is None:
+                return 404, {"message": "Not found"}
+            columns = self.table_columns.get(dataset["table_name"])
+            if columns is None:
+                return 422, {"message": "Table does not exist"}
+            dataset["columns"] = [{"column_name": name, "type": column_type} for name, column_type in columns.items()]
+            return 200, {"message": "OK"}
+
+    def delete(self, resource: str, object_id: int) -> Tuple[int, Dict[str, Any]]:
+        with self.lock:
+            if self.objects[resource].pop(object_id, None) is None:
+                return 404, {"message": "Not found"}
+            return 200, {"message": "OK"}
+
+
+def make_handler(state: MockSupersetState):
+    class MockSupersetHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _read_body(self) -> Optional[Dict[str, Any]]:
+            raw = self._read_body_bytes()
+            return json.loads(raw) if raw else None
+
+        def _read_form_file(self) -> bytes:
+            """Return the uploaded file of a multipart/form-data request"""
+            raw = self._read_body_bytes()
+            message = BytesParser(policy=default).parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + raw
+            )
+            for part in message.iter_parts():
+                if part.get_filename():
+                    return part.get_payload(decode=True)
+            return b""
+
+        def _send(self, status: int, payload: Dict[str, Any]) -> None:
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _begin(self) -> Optional[str]:
+            """Count and delay a request; returns None when a 503 was injected instead"""
+            with state.lock:
+                state.request_count += 1
+            time.sleep(state.latency)
+            if state.error_rate and random.random() < state.error_rate:
+                self._read_body_bytes()
+                self._send(503, {"message": "Injected failure"})
+                return None
+            path = self.path.split("?", 1)[0]
+            if path.startswith("/api/v1/") and not path.startswith("/api/v1/security/"):
+                if not state.token_valid(self.headers.get("Authorization")):
+                    self._read_body_bytes()
+                    self._send(401, {"msg": "Token has expired"})
+                    return None
+            return path
+
+        def _read_body_bytes(self) -> bytes:
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _listed(self, resource: str, obj: Dict[str, Any]) -> Dict[str, Any]:
+            if resource == "dataset":
+                return dict(obj, database={"id": obj["database"], "database_name": "Manufacturing TimescaleDB"})
+            return obj
+
+        def do_GET(self):
+            path = self._begin()
+            if path is None:
+                return
+            if path == "/health":
+                self._send(200, {"status": "OK"})
+            elif path == "/api/v1/security/csrf_token/":
+                self._send(200, {"result": "mock-csrf-token"})
+            elif TABLE_PATTERN.match(path):
+                table_name = TABLE_PATTERN.match(path).group(1)
+                columns = state.table_columns.get(table_name)
+                if columns is None:
+                    self._send(404, {"message": "Table not found"})
+                else:
+                    self._send(200, {
+                        "name": table_name,
+                        "columns": [{"name": name, "type": column_type} for name, column_type in columns.items()]
+                    })
+            elif DASHBOARD_CHARTS_PATTERN.match(path):
+                status, payload = state.dashboard_charts(int(DASHBOARD_CHARTS_PATTERN.match(path).group(1)))
+                self._send(status, payload)
+            elif path == "/api/v1/database/1":
+                self._send(200, {"result": {"id": 1, "database_name": "Manufacturing TimescaleDB", "uuid": None}})
+            elif path == "/api/v1/database/":
+                self._send(200, {"count": 1, "result": [{"id": 1, "database_name": "Manufacturing TimescaleDB"}]})
+            else:
+                match = RESOURCE_PATTERN.match(path)
+                if not match:
+                    self._send(404, {"message": "Not found"})
+                    return
+                resource, object_id = match.groups()
+                with state.lock:
+                    objects = state.objects[resource]
+                    if object_id:
+                        found = objects.get(int(object_id))
+                        self._send(200 if found else 404, {"result": found} if found else {"message": "Not found"})
+                    else:
+                        results = [self._listed(resource, obj) for obj in objects.values()]
+                        page = PAGE_PATTERN.search(unquote(self.path))
+                        if page:
+                            page_number, page_size = int(page.group(1)), int(page.group(2))
+                            results = results[page_number * page_size:(page_number + 1) * page_size]
+                        self._send(200, {"count": len(objects), "result": results})
+
+        def do_POST(self):
+            path = self._begin()
+            if path is None:
+                return
+            body = {} if path.endswith("/import/") else self._read_body() or {}
+            if path == "/api/v1/security/login":
+                with state.lock:
+                    state.logins += 1
+                self._send(200, {"access_token": state.issue_token("access"), "refresh_token": state.issue_token("refresh")})
+                return
+            if path == "/api/v1/security/refresh":
+                with state.lock:
+                    state.refreshes += 1
+                self._send(200, {"access_token": state.issue_token("access")})
+                return
+            if path == "/api/v1/security/guest_token/":
+                if not state.token_valid(self.headers.get("Authorization")):
+                    self._send(401, {"msg": "Token has expired"})
+                    return
+                with state.lock:
+                    state.guest_tokens += 1
+                self._send(200, {"token": state.issue_token("guest")})
+                return
+            if path == "/api/v1/chart/data":
+                status, payload = state.chart_data(body)
+                self._send(status, payload)
+                return
+            if path == "/api/v1/dashboard/import/":
+                status, payload = state.import_bundle(self._read_form_file())
+                self._send(status, payload)
+                return
+            match = RESOURCE_PATTERN.match(path)
+            if not match or match.group(2):
+                self._send(404, {"message": "Not found"})
+                return
+            status, payload = state.create(match.group(1), body)
+            self._send(status, payload)
+
+        def do_PUT(self):
+            path = self._begin()
+            if path is None:
+                return
+            body = self._read_body() or {}
+            refresh = DATASET_REFRESH_PATTERN.match(path)
+            if refresh:
+                status, payload = state.refresh_dataset(int(refresh.group(1)))
+                self._send(status, payload)
+                return
+            match = RESOURCE_PATTERN.match(path)
+            if not match or not match.group(2):
+                self._send(404, {"message": "Not found"})
+                return
+            status, payload = state.update(match.group(1), int(match.group(2)), body)
+            self._send(status, payload)
+
+        def do_DELETE(self):
+            path = self._begin()
+            if path is None:
+                return
+            match = RESOURCE_PATTERN.match(path)
+            if not match:
+                self._send(404, {"message": "Not found"})
+                return
+            if not match.group(2):
+                # Bulk delete: DELETE /api/v1/<resource>/?q=!(1,2,3)
+                ids = re.findall(r"\d+", unquote(self.path.partition("?q=")[2]))
+                for object_id in ids:
+                    state.delete(match.group(1), int(object_id))
+                self._send(200, {"message": f"Deleted {len(ids)} {match.group(1)}s"})
+                return
+            status, payload = state.delete(match.group(1), int(match.group(2)))
+            self._send(status, payload)
+
+    return MockSupersetHandler
+
+
+class MockSuperset:
+    """Run a mock Superset on a background thread: `with MockSuperset() as mock: ...`"""
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.05,
+        error_rate: float = 0.0,
+        token_ttl: Optional[float] = None,
+        query_latency: float = 0.2
+    ):
+        self.state = MockSupersetState(latency, error_rate, token_ttl, query_latency)
+        self.server = ThreadingHTTPServer((host, port), make_handler(self.state))
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self) -> "MockSuperset":
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main():
+    """Serve the mock until interrupted"""
+    parser = argparse.ArgumentParser(description="Run a local mock Superset API")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds added to every request")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 503")
+    parser.add_argument("--query-latency", type=float, default=0.2, help="Extra seconds for uncached chart data")
+    args = parser.parse_args()
+
+    with MockSuperset(
+        port=args.port, latency=args.latency, error_rate=args.error_rate, query_latency=args.query_latency
+    ) as mock:
+        print(f"🧪 Mock Superset listening on {mock.url} (latency {args.latency * 1000:.0f}ms)")
+        try:
+            mock.thread.join()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Multi-tenant Superset provisioning
+Provisions every Superset instance of an inventory in parallel worker processes,
+with per-instance timeouts and retries, and writes one merged result manifest
+
+Usage:
+    python provision_fleet.py --inventory inventory.json --workers 8 --manifest fleet-manifest.json
+"""
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List
+
+from dashboard_compiler import load_spec_file
+
+
+def load_inventory(path: Path) -> List[Dict[str, Any]]:
+    """Read the instance list; passwords may be given inline or via `password_env`
+
+    A password written on an instance wins over a `password_env` in defaults.
+    """
+    inventory = load_spec_file(path)
+    instances = inventory["instances"] if isinstance(inventory, dict) else inventory
+    defaults = inventory.get("defaults", {}) if isinstance(inventory, dict) else {}
+
+    resolved = []
+    for entry in instances:
+        instance = dict(defaults, **entry)
+        if "name" not in instance or "url" not in instance:
+            raise ValueError(f"Inventory entry needs a name and a url: {instance}")
+        password_env = instance.pop("password_env", None)
+        if password_env and "password" not in entry:
+            instance["password"] = os.environ.get(password_env, "")
+        resolved.append(instance)
+    return resolved
+
+
+def _provision_worker(instance: Dict[str, Any], options: Dict[str, Any], log_path: str, results) -> None:
+    """Worker process entry point: provision one instance, logging its output to a file"""
+    from provisioning_journal import default_journal_path
+    from superset_api import load_creator_module
+
+    with open(log_path, "a") as log, contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+        try:
+            creator_module = load_creator_module()
+            creator = creator_module.SupersetDashboardCreator(
+                instance["url"],
+                instance.get("username", "admin"),
+                instance.get("password", "admin"),
+                # A retried attempt resumes from whatever the killed one already created
+                journal_path=default_journal_path(instance["url"])
+            )
+            dashboards = creator.create_all_dashboards(**options)
+            failed = [key for key, dashboard_id in dashboards.items() if not dashboard_id]
+            if not dashboards:
+                error = "no dashboards provisioned"
+            elif failed:
+                error = f"dashboards failed: {', '.join(failed)}"
+            else:
+                error = None
+            results.put({"dashboards": dashboards, "error": error})
+        except Exception as e:
+            results.put({"dashboards": {}, "error": str(e)})
+
+
+def provision_instance(
+    instance: Dict[str, Any],
+    options: Dict[str, Any],
+    log_dir: Path,
+    timeout: float = 600,
+    retries: int = 2
+) -> Dict[str, Any]:
+    """Provision one instance in a child process, retrying with backoff and killing it on timeout
+
+    `timeout` and `retries` can be overridden per instance in the inventory.
+    """
+    timeout = float(instance.get("timeout", timeout))
+    retries = int(instance.get("retries", retries))
+    log_path = log_dir / f"{instance['name']}.log"
+    started = time.perf_counter()
+
+    outcome: Dict[str, Any] = {"dashboards": {}, "error": "not started"}
+    attempt = 0
+    for attempt in range(1, retries + 2):
+        results = multiprocessing.Queue()
+        process = multiprocessing.Process(
+            target=_provision_worker,
+            args=(instance, options, str(log_path), results),
+            daemon=True
+        )
+        process.start()
+        process.join(timeout)
+
+        if process.is_alive():
+            process.terminate()
+            process.join()
+            outcome = {"dashboards": {}, "error": f"timed out after {timeout:.0f}s"}
+        elif not results.empty():
+            outcome = results.get()
+        else:
+            outcome = {"dashboards": {}, "error": f"worker exited with code {process.exitcode}"}
+
+        if outcome["error"] is None:
+            break
+        if attempt <= retries:
+            time.sleep(min(2 ** attempt, 30))
+
+    return {
+        "url": instance["url"],
+        "status": "ok" if outcome["error"] is None else "failed",
+        "attempts": attempt,
+        "duration_s": round(time.perf_counter() - started, 3),
+        "dashboards": outcome["dashboards"],
+        "error": outcome["error"],
+        "log": str(log_path),
+    }
+
+
+def print_latency_summary(results: Dict[str, Dict[str, Any]]) -> None:
+    durations = sorted(result["duration_s"] for result in results.values())
+    print("\n" + "="*50)
+    print("🌍 FLEET PROVISIONING SUMMARY")
+    print("="*50)
+    print(f"{'instance':<24} {'status':<8} {'attempts':>8} {'seconds':>9}")
+    for name, result in sorted(results.items(), key=lambda item: item[1]["duration_s"], reverse=True):
+        icon = "✅" if result["status"] == "ok" else "❌"
+        print(f"{name:<24} {icon} {result['status']:<5} {result['attempts']:>8} {result['duration_s']:>9.2f}")
+    if durations:
+        median = durations[len(durations) // 2]
+        p95 = durations[min(len(durations) - 1, int(len(durations) * 0.95))]
+        print(f"\n⏱️  median {median:.2f}s, p95 {p95:.2f}s, slowest {durations[-1]:.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provision dashboards on many Superset instances in parallel")
+    parser.add_argument("--inventory", type=Path, required=True, help="JSON/YAML list of Superset instances")
+    parser.add_argument("--workers", type=int, default=8, help="Instances provisioned at the same time")
+    parser.add_argument("--timeout", type=float, default=600, help="Seconds per attempt before an instance is killed")
+    parser.add_argument("--retries", type=int, default=2, help="Extra attempts per instance after a failure")
+    parser.add_argument("--concurrency", type=int, default=8, help="API calls in flight within each instance")
+    parser.add_argument("--sync", action="store_true", help="Diff against existing objects instead of blind creates")
+    parser.add_argument("--import-bundle", action="store_true", help="Provision each instance with one ZIP import")
+    parser.add_argument("--manifest", type=Path, default=Path("fleet-manifest.json"))
+    parser.add_argument("--log-dir", type=Path, default=Path("fleet-logs"))
+    args = parser.parse_args()
+
+    instances = load_inventory(args.inventory)
+    args.log_dir.mkdir(parents=True, exist_ok=True)
+    options = {
+        "concurrency": args.concurrency,
+        "sync": args.sync,
+        "import_bundle": args.import_bundle,
+    }
+
+    print(f"🚀 Provisioning {len(instances)} Superset instances ({args.workers} at a time)...")
+    started = time.perf_counter()
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def run(instance: Dict[str, Any]) -> None:
+        result = provision_instance(instance, options, args.log_dir, args.timeout, args.retries)
+        results[instance["name"]] = result
+        icon = "✅" if result["status"] == "ok" else "❌"
+        print(f"{icon} {instance['name']}: {result['status']} in {result['duration_s']:.2f}s "
+              f"({result['attempts']} attempt(s)){'' if result['error'] is None else ' - ' + result['error']}")
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        list(executor.map(run, instances))
+
+    manifest = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "duration_s": round(time.perf_counter() - started, 3),
+        "instances": dict(sorted(results.items())),
+    }
+    with open(args.manifest, "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    print_latency_summary(results)
+    print(f"\n💾 Manifest saved to {args.manifest}")
+
+    if any(result["status"] != "ok" for result in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
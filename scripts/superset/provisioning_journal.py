@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Append-only JSONL checkpoint journal for dashboard provisioning
+Records every dataset, chart and dashboard a run creates together with its
+spec hash. A run that died half-way is resumed from its journal instead of
+re-creating (or colliding with) what it already made, and can be rolled back
+with a few bulk deletes.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from superset_auth import DEFAULT_CACHE_DIR
+
+# Delete dependants before what they depend on
+ROLLBACK_ORDER = ("dashboard", "chart", "dataset")
+
+
+def default_journal_path(base_url: str) -> Path:
+    instance = hashlib.sha256(base_url.encode()).hexdigest()[:16]
+    return DEFAULT_CACHE_DIR / f"{instance}.journal.jsonl"
+
+
+class ProvisioningJournal:
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.run_id: Optional[str] = None
+        self.resumed = False
+        self.objects: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        self.resume_hits = 0
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _read(self) -> List[Dict[str, Any]]:
+        if not self.path.exists():
+            return []
+        entries = []
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # A crash mid-write leaves at most one truncated trailing line
+                    continue
+        return entries
+
+    def last_run(self) -> Tuple[Optional[str], str, List[Dict[str, Any]]]:
+        """The most recent run ID, its status (running/completed/rolled_back) and its created objects"""
+        run_id, status, objects = None, "completed", []
+        for entry in self._read():
+            if entry["event"] == "run_started":
+                run_id, status, objects = entry["run_id"], "running", []
+            elif entry.get("run_id") != run_id:
+                continue
+            elif entry["event"] == "created":
+                objects.append(entry)
+            elif entry["event"] in ("run_completed", "rolled_back"):
+                status = entry["event"].replace("run_", "")
+        return run_id, status, objects
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        entry = dict(entry, run_id=self.run_id, ts=datetime.now(timezone.utc).isoformat())
+        with self._lock:
+            if self._file is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._file = open(self.path, "a")
+            self._file.write(json.dumps(entry) + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def begin(self) -> None:
+        """Resume the last run if it never completed, otherwise start a new one"""
+        run_id, status, objects = self.last_run()
+        if run_id and status == "running":
+            self.run_id = run_id
+            self.resumed = True
+            self.objects = {(entry["kind"], entry["name"]): entry for entry in objects}
+            print(f"♻️ Resuming provisioning run {run_id} ({len(objects)} objects already created)")
+            return
+        self.run_id = uuid.uuid4().hex[:12]
+        self._append({"event": "run_started"})
+
+    def lookup(self, kind: str, name: str, spec_hash: str) -> Optional[int]:
+        """ID of an object this run already created from the same spec, if any"""
+        entry = self.objects.get((kind, name))
+        if entry is not None and entry["spec_hash"] == spec_hash:
+            with self._lock:
+                self.resume_hits += 1
+            return entry["id"]
+        return None
+
+    def record(self, kind: str, name: str, object_id: int, spec_hash: str) -> None:
+        entry = {"event": "created", "kind": kind, "name": name, "id": object_id, "spec_hash": spec_hash}
+        with self._lock:
+            self.objects[(kind, name)] = entry
+        self._append(entry)
+
+    def complete(self) -> None:
+        self._append({"event": "run_completed"})
+
+    def rollback(self, session: requests.Session, base_url: str) -> bool:
+        """Bulk-delete everything the last unfinished run created, dashboards first"""
+        run_id, status, objects = self.last_run()
+        if run_id is None or status != "running":
+            print("ℹ️ No unfinished provisioning run to roll back")
+            return True
+        self.run_id = run_id
+
+        ok = True
+        for kind in ROLLBACK_ORDER:
+            ids = sorted({entry["id"] for entry in objects if entry["kind"] == kind})
+            if not ids:
+                continue
+            response = session.delete(
+                f"{base_url}/api/v1/{kind}/",
+                params={"q": f"!({','.join(str(object_id) for object_id in ids)})"}
+            )
+            if response.status_code == 200:
+                print(f"🗑️ Deleted {len(ids)} {kind}(s) from run {run_id}")
+            else:
+                print(f"❌ Failed to delete {kind}s {ids}: {response.text}")
+                ok = False
+
+        if ok:
+            self._append({"event": "rolled_back"})
+        return ok
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+Query-cost analyzer for the provisioned charts
+Fetches the SQL Superset generates for every chart (result_type "query"), runs
+EXPLAIN (ANALYZE, BUFFERS) on it through a small connection pool to the
+Manufacturing TimescaleDB, and flags sequential scans on hypertables, queries
+that scan every chunk (no chunk exclusion) and expensive or spilling sorts,
+ranked by the planner's estimated cost
+
+EXPLAIN ANALYZE executes the query, inside a read-only transaction that is
+rolled back; pass --no-analyze to only plan it.
+
+Usage:
+    MANUFACTURING_DB_HOST=localhost python query_cost.py --url http://localhost:8088 --output query-cost.json
+"""
+
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from dashboard_bundle import manufacturing_sqlalchemy_uri
+from superset_api import chart_query_context, dashboard_charts, load_creator_module
+
+# A sort whose own cost is at least this share of the whole plan is flagged
+SORT_COST_SHARE = 0.25
+# Sequential scans expected to read more rows than this are flagged on any table
+LARGE_SCAN_ROWS = 100_000
+
+CHUNKS_SQL = """
+    SELECT chunk_name, hypertable_name
+    FROM timescaledb_information.chunks
+"""
+
+
+def walk_plan(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get("Plans", []):
+        yield from walk_plan(child)
+
+
+def self_cost(node: Dict[str, Any]) -> float:
+    """The node's own estimated cost, excluding its children"""
+    return node.get("Total Cost", 0.0) - sum(child.get("Total Cost", 0.0) for child in node.get("Plans", []))
+
+
+def analyze_plan(plan: Dict[str, Any], chunk_hypertables: Dict[str, str]) -> List[str]:
+    """Findings for one EXPLAIN (FORMAT JSON) plan
+
+    chunk_hypertables maps chunk relation names to their hypertable.
+    """
+    findings = []
+    root = plan["Plan"]
+    total_cost = root.get("Total Cost", 0.0) or 1.0
+
+    chunk_totals: Dict[str, int] = {}
+    for hypertable in chunk_hypertables.values():
+        chunk_totals[hypertable] = chunk_totals.get(hypertable, 0) + 1
+    scanned_chunks: Dict[str, set] = {}
+    seq_scanned_chunks: Dict[str, int] = {}
+
+    for node in walk_plan(root):
+        node_type = node.get("Node Type", "")
+        relation = node.get("Relation Name")
+        hypertable = chunk_hypertables.get(relation) if relation else None
+        if relation in chunk_totals:
+            # Plain table scan of a hypertable's parent (e.g. chunk expansion disabled)
+            hypertable = relation
+
+        if hypertable and node_type.endswith("Scan"):
+            scanned_chunks.setdefault(hypertable, set()).add(relation)
+            if node_type == "Seq Scan":
+                seq_scanned_chunks[hypertable] = seq_scanned_chunks.get(hypertable, 0) + 1
+        elif node_type == "Seq Scan" and node.get("Plan Rows", 0) > LARGE_SCAN_ROWS:
+            findings.append(f"seq scan on {relation} (~{node['Plan Rows']:,} rows estimated)")
+
+        if node_type in ("Sort", "Incremental Sort"):
+            keys = ", ".join(node.get("Sort Key", []))
+            if node.get("Sort Space Type") == "Disk":
+                findings.append(f"sort on [{keys}] spilled to disk ({node.get('Sort Space Used', '?')} kB)")
+            elif self_cost(node) / total_cost >= SORT_COST_SHARE:
+                findings.append(f"sort on [{keys}] is {self_cost(node) / total_cost:.0%} of the plan cost")
+
+    for hypertable, count in sorted(seq_scanned_chunks.items()):
+        findings.append(f"seq scan on hypertable {hypertable} ({count} chunk(s))")
+    for hypertable, chunks in sorted(scanned_chunks.items()):
+        total = chunk_totals.get(hypertable, 0)
+        if total > 1 and len(chunks) >= total:
+            findings.append(f"no chunk exclusion on {hypertable}: all {total} chunks scanned (add a time filter)")
+
+    return findings
+
+
+class QueryCostAnalyzer:
+    def __init__(self, session, base_url: str, dsn: str, workers: int = 2, analyze: bool = True, timeout_s: float = 60):
+        try:
+            from psycopg2.pool import ThreadedConnectionPool
+        except ImportError:
+            sys.exit("❌ query_cost.py needs psycopg2: pip install psycopg2-binary")
+        self.session = session
+        self.base_url = base_url
+        self.workers = workers
+        self.analyze = analyze
+        self.timeout_ms = int(timeout_s * 1000)
+        self.pool = ThreadedConnectionPool(1, workers, dsn)
+        self.chunk_hypertables: Dict[str, str] = {}
+
+    def load_chunks(self) -> None:
+        """Map every TimescaleDB chunk to its hypertable (empty when TimescaleDB is not installed)"""
+        connection = self.pool.getconn()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute(CHUNKS_SQL)
+                self.chunk_hypertables = dict(cursor.fetchall())
+        except Exception as e:
+            print(f"⚠️ Could not list TimescaleDB chunks: {str(e)}")
+        finally:
+            connection.rollback()
+            self.pool.putconn(connection)
+
+    def chart_sql(self, chart: Dict[str, Any]) -> Optional[str]:
+        """The SQL Superset would run for a chart, without running it"""
+        response = self.session.post(
+            f"{self.base_url}/api/v1/chart/data",
+            json=chart_query_context(chart["form_data"], result_type="query")
+        )
+        if response.status_code != 200:
+            return None
+        queries = [result.get("query") for result in response.json().get("result", []) if result.get("query")]
+        return queries[0] if queries else None
+
+    def explain(self, sql: str) -> Dict[str, Any]:
+        options = "ANALYZE, BUFFERS, FORMAT JSON" if self.analyze else "FORMAT JSON"
+        connection = self.pool.getconn()
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION READ ONLY")
+                cursor.execute("SET LOCAL statement_timeout = %s", (self.timeout_ms,))
+                cursor.execute(f"EXPLAIN ({options}) {sql.strip().rstrip(';')}")
+                return cursor.fetchone()[0][0]
+        finally:
+            # Never keep anything an analyzed query did
+            connection.rollback()
+            self.pool.putconn(connection)
+
+    def analyze_chart(self, chart: Dict[str, Any]) -> Dict[str, Any]:
+        result: Dict[str, Any] = {
+            "chart_id": chart["id"],
+            "name": f"{chart['dashboard']}/{chart['slice_name']}",
+            "estimated_cost": None,
+            "findings": [],
+            "error": None,
+        }
+        try:
+            sql = self.chart_sql(chart)
+            if sql is None:
+                return dict(result, error="Superset returned no SQL for this chart")
+            plan = self.explain(sql)
+            result.update(
+                sql=sql,
+                estimated_cost=plan["Plan"].get("Total Cost"),
+                estimated_rows=plan["Plan"].get("Plan Rows"),
+                execution_ms=plan.get("Execution Time"),
+                shared_blocks_read=plan["Plan"].get("Shared Read Blocks"),
+                findings=analyze_plan(plan, self.chunk_hypertables),
+            )
+        except Exception as e:
+            result["error"] = str(e).strip()
+        return result
+
+    def run(self, slugs: List[str]) -> List[Dict[str, Any]]:
+        self.load_chunks()
+        charts = dashboard_charts(self.session, self.base_url, slugs)
+        print(f"🔬 Explaining {len(charts)} chart queries ({len(set(self.chunk_hypertables.values()))} hypertables)")
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            results = list(executor.map(self.analyze_chart, charts))
+        self.pool.closeall()
+        return sorted(results, key=lambda result: result["estimated_cost"] or 0, reverse=True)
+
+
+def print_report(results: List[Dict[str, Any]]) -> None:
+    print(f"\n{'chart':<48} {'est. cost':>12} {'rows':>9} {'exec ms':>9}")
+    for result in results:
+        if result["error"]:
+            print(f"{result['name'][:48]:<48} ❌ {result['error'].splitlines()[0]}")
+            continue
+        execution_ms = f"{result['execution_ms']:.1f}" if result.get("execution_ms") is not None else "-"
+        print(f"{result['name'][:48]:<48} {result['estimated_cost']:>12,.0f} "
+              f"{result['estimated_rows'] or 0:>9,} {execution_ms:>9}")
+        for finding in result["findings"]:
+            print(f"   ⚠️ {finding}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="EXPLAIN the SQL of every provisioned chart and flag costly plans")
+    parser.add_argument("--url", default=os.environ.get("SUPERSET_URL", "http://localhost:8088"))
+    parser.add_argument("--username", default=os.environ.get("SUPERSET_USERNAME", "admin"))
+    parser.add_argument("--password", default=os.environ.get("SUPERSET_PASSWORD", "admin"))
+    parser.add_argument("--dsn", help="Manufacturing database DSN (default: from the MANUFACTURING_DB_* variables)")
+    parser.add_argument("--dashboards", nargs="+", help="Dashboard slugs (default: every provisioned dashboard)")
+    parser.add_argument("--workers", type=int, default=2, help="Queries explained at the same time (pool size)")
+    parser.add_argument("--no-analyze", action="store_true", help="Plan only; do not execute the queries")
+    parser.add_argument("--timeout", type=float, default=60, help="statement_timeout per query in seconds")
+    parser.add_argument("--output", type=Path, default=Path("query-cost.json"))
+    args = parser.parse_args()
+
+    creator_module = load_creator_module()
+    slugs = args.dashboards or [spec["slug"] for spec in creator_module.DASHBOARD_SPECS]
+    dsn = args.dsn or manufacturing_sqlalchemy_uri(os.environ.get("MANUFACTURING_DB_PASSWORD", "postgres"))
+
+    creator = creator_module.SupersetDashboardCreator(args.url, args.username, args.password)
+    if not creator.authenticate():
+        sys.exit(1)
+
+    analyzer = QueryCostAnalyzer(
+        creator.session, args.url, dsn, workers=args.workers, analyze=not args.no_analyze, timeout_s=args.timeout
+    )
+    results = analyzer.run(slugs)
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "analyze": not args.no_analyze,
+            "charts": results,
+        }, f, indent=2)
+    print_report(results)
+    flagged = sum(1 for result in results if result["findings"])
+    print(f"\n📋 {flagged} of {len(results)} chart queries flagged; report saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
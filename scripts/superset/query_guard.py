@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+Query guards for the provisioned charts
+Fills in the time window, row limit and time grain a chart spec leaves out,
+from its viz type and the size class of its view, and reports charts that would
+still scan a whole fact table (no time column or no time range) unless the
+spec sets "allow_unbounded": true
+"""
+
+import re
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+# How much history a view can return, and the time window charts on it get by default
+SIZE_CLASSES: Dict[str, Dict[str, Any]] = {
+    # One row per equipment, shift or KPI: bounded by construction
+    "snapshot": {"time_range": None},
+    # One row per day and dimension
+    "daily": {"time_range": "Last 30 days"},
+    # One row per production record or hour: grows with every ingest
+    "fact": {"time_range": "Last 7 days"},
+}
+
+DATASET_SIZE_CLASS: Dict[str, str] = {
+    "v_realtime_production": "fact",
+    "v_oee_hourly_trend": "fact",
+    "v_quality_metrics": "daily",
+    "v_downtime_analysis": "daily",
+    "v_scrap_analysis": "daily",
+    "v_equipment_status": "snapshot",
+    "v_shift_performance": "snapshot",
+    "v_kpi_summary": "snapshot",
+    "oee_5min": "fact",
+    "oee_hourly": "fact",
+    "sensor_1min": "fact",
+}
+
+# Temporal column the time window is applied to, for charts that do not name one
+DATASET_TIME_COLUMNS: Dict[str, str] = {
+    "v_realtime_production": "created_at",
+    "v_oee_hourly_trend": "date",
+    "v_quality_metrics": "date",
+    "v_downtime_analysis": "date",
+    "v_scrap_analysis": "date",
+    "oee_5min": "bucket",
+    "oee_hourly": "bucket",
+    "sensor_1min": "bucket",
+}
+
+# Every temporal column of each view; a chart's granularity_sqla must name one of them
+# to bound its query (views not listed here are not checked)
+DATASET_TEMPORAL_COLUMNS: Dict[str, Set[str]] = {
+    "v_realtime_production": {"created_at", "date"},
+    "v_oee_hourly_trend": {"date"},
+    "v_quality_metrics": {"date"},
+    "v_downtime_analysis": {"date"},
+    "v_scrap_analysis": {"date"},
+    "v_equipment_status": {"last_activity"},
+    "oee_5min": {"bucket"},
+    "oee_hourly": {"bucket"},
+    "sensor_1min": {"bucket"},
+}
+
+# Rows a chart of each viz type can usefully draw; the global ROW_LIMIT is 5000
+VIZ_ROW_LIMITS: Dict[str, int] = {
+    "big_number_total": 1,
+    "big_number": 1000,
+    "gauge_chart": 1,
+    "pie": 25,
+    "bar": 200,
+    "table": 500,
+    "heatmap": 5000,
+    "line": 5000,
+    "area": 5000,
+}
+DEFAULT_ROW_LIMIT = 1000
+
+# Viz types that bucket their time column by time_grain_sqla
+TIME_SERIES_VIZ_TYPES = {"line", "area", "big_number", "echarts_timeseries_line", "echarts_area"}
+
+# Superset time grains, finest first, with their bucket width in seconds
+TIME_GRAINS: List[Tuple[str, int]] = [
+    ("PT1M", 60),
+    ("PT5M", 300),
+    ("PT15M", 900),
+    ("PT30M", 1800),
+    ("PT1H", 3600),
+    ("P1D", 86400),
+    ("P1W", 7 * 86400),
+]
+# The default grain is the finest one that keeps a series under this many points
+MAX_TIME_BUCKETS = 500
+
+UNBOUNDED_TIME_RANGES = {"", "No filter"}
+
+_UNIT_SECONDS = {
+    "second": 1,
+    "minute": 60,
+    "hour": 3600,
+    "day": 86400,
+    "week": 7 * 86400,
+    "month": 30 * 86400,
+    "quarter": 91 * 86400,
+    "year": 365 * 86400,
+}
+_LAST_RANGE = re.compile(r"last\s+(?:(\d+)\s+)?(second|minute|hour|day|week|month|quarter|year)s?", re.IGNORECASE)
+
+
+def time_range_seconds(time_range: Optional[str]) -> Optional[int]:
+    """Length of a relative Superset time range ("Last day", "Last 24 hours"), None if not relative"""
+    match = _LAST_RANGE.fullmatch((time_range or "").strip())
+    if not match:
+        return None
+    return int(match.group(1) or 1) * _UNIT_SECONDS[match.group(2).lower()]
+
+
+def grain_seconds(time_grain: Optional[str]) -> Optional[int]:
+    return dict(TIME_GRAINS).get(time_grain)
+
+
+def default_time_grain(time_range: Optional[str]) -> Optional[str]:
+    """The finest grain that keeps a relative time range under MAX_TIME_BUCKETS buckets"""
+    seconds = time_range_seconds(time_range)
+    if seconds is None:
+        return None
+    for grain, width in TIME_GRAINS:
+        if seconds / width <= MAX_TIME_BUCKETS:
+            return grain
+    return TIME_GRAINS[-1][0]
+
+
+def is_time_column(dataset: str, column: Optional[str]) -> bool:
+    """Whether column is a temporal column of the dataset (any column, for datasets without a known list)"""
+    if not column:
+        return False
+    return dataset not in DATASET_TEMPORAL_COLUMNS or column in DATASET_TEMPORAL_COLUMNS[dataset]
+
+
+def guarded_params(chart_spec: Dict[str, Any]) -> Dict[str, Any]:
+    """A chart's params with the default time column, time window, grain and row limit filled in
+
+    Values set explicitly in the spec are kept. A time column the dataset does
+    not have gets no time window, so unbounded_problem reports it.
+    """
+    params = dict(chart_spec["params"])
+    dataset = chart_spec["dataset"]
+    size_class = SIZE_CLASSES[DATASET_SIZE_CLASS.get(dataset, "fact")]
+
+    if size_class["time_range"]:
+        if not params.get("granularity_sqla") and dataset in DATASET_TIME_COLUMNS:
+            params["granularity_sqla"] = DATASET_TIME_COLUMNS[dataset]
+        if is_time_column(dataset, params.get("granularity_sqla")):
+            params.setdefault("time_range", size_class["time_range"])
+
+    if chart_spec["viz_type"] in TIME_SERIES_VIZ_TYPES and is_time_column(dataset, params.get("granularity_sqla")):
+        grain = default_time_grain(params.get("time_range"))
+        if grain:
+            params.setdefault("time_grain_sqla", grain)
+
+    params.setdefault("row_limit", VIZ_ROW_LIMITS.get(chart_spec["viz_type"], DEFAULT_ROW_LIMIT))
+    return params
+
+
+def unbounded_problem(chart_spec: Dict[str, Any], params: Dict[str, Any]) -> Optional[str]:
+    """Why a chart (with guarded params) would scan its whole view, or None if it is bounded"""
+    if chart_spec.get("allow_unbounded"):
+        return None
+    if DATASET_SIZE_CLASS.get(chart_spec["dataset"], "fact") == "snapshot":
+        return None
+    if not params.get("granularity_sqla"):
+        return f"no time column to bound {chart_spec['dataset']} (set params.granularity_sqla or allow_unbounded)"
+    if not is_time_column(chart_spec["dataset"], params["granularity_sqla"]):
+        expected = " or ".join(repr(column) for column in sorted(DATASET_TEMPORAL_COLUMNS[chart_spec["dataset"]]))
+        return f"granularity_sqla '{params['granularity_sqla']}' is not a time column of {chart_spec['dataset']} (use {expected})"
+    if params.get("time_range", "").strip() in UNBOUNDED_TIME_RANGES:
+        return f"time_range '{params['time_range']}' scans all of {chart_spec['dataset']} (narrow it or set allow_unbounded)"
+    return None
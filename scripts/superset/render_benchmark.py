@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Dashboard render benchmark
+Replays the /api/v1/chart/data query of every chart on the provisioned
+dashboards, cold (force=true, bypassing the cache) and warm, at a configurable
+concurrency, and writes per-chart p50/p95/p99 latency, rows returned and cache
+hit ratio to a JSON file that can be diffed or compared against a baseline run
+
+Usage:
+    python render_benchmark.py --url http://localhost:8088 --repeat 5 --output render-benchmark.json
+    python render_benchmark.py --baseline render-benchmark.json   # fail on p95 regressions
+    python render_benchmark.py --mock                             # self-test against the mock Superset
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from superset_api import chart_query_context, dashboard_charts, load_creator_module
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    """Nearest-rank percentile (q in 0-100) of a list of values"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q / 100 * len(ordered))) - 1))]
+
+
+def latency_stats(samples: List[float]) -> Dict[str, Optional[float]]:
+    def ms(value: Optional[float]) -> Optional[float]:
+        return round(value * 1000, 1) if value is not None else None
+
+    return {
+        "p50_ms": ms(percentile(samples, 50)),
+        "p95_ms": ms(percentile(samples, 95)),
+        "p99_ms": ms(percentile(samples, 99)),
+        "max_ms": ms(max(samples) if samples else None),
+    }
+
+
+class RenderBenchmark:
+    def __init__(self, session, base_url: str, concurrency: int = 4, repeat: int = 5):
+        self.session = session
+        self.base_url = base_url
+        self.concurrency = concurrency
+        self.repeat = repeat
+
+    def query(self, chart: Dict[str, Any], force: bool) -> Dict[str, Any]:
+        """Run one chart data request; no transport retries, so failures show up as errors"""
+        started = time.perf_counter()
+        try:
+            response = self.session.post(
+                f"{self.base_url}/api/v1/chart/data",
+                json=chart_query_context(chart["form_data"], force=force),
+                retries=0
+            )
+            elapsed = time.perf_counter() - started
+            if response.status_code != 200:
+                return {"elapsed": elapsed, "error": f"HTTP {response.status_code}"}
+            results = response.json().get("result", [])
+            return {
+                "elapsed": elapsed,
+                "error": None,
+                "rows": sum(result.get("rowcount") or 0 for result in results),
+                "cached": all(result.get("is_cached") for result in results) if results else False,
+            }
+        except Exception as e:
+            return {"elapsed": time.perf_counter() - started, "error": str(e)}
+
+    def run_phase(self, charts: List[Dict[str, Any]], force: bool) -> List[List[Dict[str, Any]]]:
+        """Replay every chart `repeat` times; returns the samples per chart, in chart order"""
+        jobs = [index for _ in range(self.repeat) for index in range(len(charts))]
+        samples: List[List[Dict[str, Any]]] = [[] for _ in charts]
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            for index, sample in zip(jobs, executor.map(lambda index: self.query(charts[index], force), jobs)):
+                samples[index].append(sample)
+        return samples
+
+    def run(self, slugs: List[str]) -> Dict[str, Any]:
+        charts = dashboard_charts(self.session, self.base_url, slugs)
+        print(f"🎯 Benchmarking {len(charts)} charts on {len(slugs)} dashboards "
+              f"({self.repeat}x cold, {self.repeat}x warm, {self.concurrency} concurrent)")
+
+        started = time.perf_counter()
+        cold = self.run_phase(charts, force=True)
+        # The last cold run of each chart left its result in the cache
+        warm = self.run_phase(charts, force=False)
+        duration_s = time.perf_counter() - started
+
+        report_charts = {}
+        for chart, cold_samples, warm_samples in zip(charts, cold, warm):
+            ok_cold = [sample for sample in cold_samples if not sample["error"]]
+            ok_warm = [sample for sample in warm_samples if not sample["error"]]
+            errors = [sample["error"] for sample in cold_samples + warm_samples if sample["error"]]
+            report_charts[f"{chart['dashboard']}/{chart['slice_name']}"] = {
+                "chart_id": chart["id"],
+                "viz_type": chart.get("viz_type") or chart["form_data"].get("viz_type"),
+                "cold": latency_stats([sample["elapsed"] for sample in ok_cold]),
+                "warm": latency_stats([sample["elapsed"] for sample in ok_warm]),
+                "rows": max((sample["rows"] for sample in ok_cold + ok_warm), default=None),
+                "cache_hit_ratio": (
+                    round(sum(1 for sample in ok_warm if sample["cached"]) / len(ok_warm), 3) if ok_warm else None
+                ),
+                "errors": len(errors),
+                "first_error": errors[0] if errors else None,
+            }
+
+        def phase_samples(phase):
+            return [sample for samples in phase for sample in samples if not sample["error"]]
+
+        all_warm = phase_samples(warm)
+        return {
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+            "base_url": self.base_url,
+            "concurrency": self.concurrency,
+            "repeat": self.repeat,
+            "duration_s": round(duration_s, 3),
+            "summary": {
+                "charts": len(charts),
+                "cold": latency_stats([sample["elapsed"] for sample in phase_samples(cold)]),
+                "warm": latency_stats([sample["elapsed"] for sample in all_warm]),
+                "cache_hit_ratio": (
+                    round(sum(1 for sample in all_warm if sample["cached"]) / len(all_warm), 3) if all_warm else None
+                ),
+                "errors": sum(chart["errors"] for chart in report_charts.values()),
+            },
+            "charts": report_charts,
+        }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    print(f"\n{'chart':<48} {'rows':>6} {'cold p50':>9} {'cold p95':>9} {'warm p50':>9} {'warm p95':>9} {'hit':>5}")
+    for name, chart in sorted(report["charts"].items(), key=lambda item: item[1]["cold"]["p95_ms"] or 0, reverse=True):
+        hit = f"{chart['cache_hit_ratio']:.0%}" if chart["cache_hit_ratio"] is not None else "-"
+        print(f"{name[:48]:<48} {chart['rows'] or 0:>6} {chart['cold']['p50_ms'] or 0:>9} "
+              f"{chart['cold']['p95_ms'] or 0:>9} {chart['warm']['p50_ms'] or 0:>9} {chart['warm']['p95_ms'] or 0:>9} "
+              f"{hit:>5}{'  ❌ ' + str(chart['errors']) + ' errors' if chart['errors'] else ''}")
+    summary = report["summary"]
+    print(f"\n⏱️  cold p50/p95/p99 {summary['cold']['p50_ms']}/{summary['cold']['p95_ms']}/{summary['cold']['p99_ms']}ms, "
+          f"warm {summary['warm']['p50_ms']}/{summary['warm']['p95_ms']}/{summary['warm']['p99_ms']}ms, "
+          f"cache hit ratio {summary['cache_hit_ratio']}, {summary['errors']} errors")
+
+
+def compare(report: Dict[str, Any], baseline: Dict[str, Any], threshold: float) -> List[str]:
+    """Charts whose cold or warm p95 got more than `threshold` (fraction) slower than the baseline"""
+    regressions = []
+    for name, chart in sorted(report["charts"].items()):
+        previous = baseline.get("charts", {}).get(name)
+        if previous is None:
+            continue
+        for phase in ("cold", "warm"):
+            before, after = previous[phase]["p95_ms"], chart[phase]["p95_ms"]
+            if before and after and after > before * (1 + threshold):
+                regressions.append(f"{name} {phase} p95 {before}ms -> {after}ms (+{(after / before - 1):.0%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark chart data queries of the provisioned dashboards")
+    parser.add_argument("--url", default=os.environ.get("SUPERSET_URL", "http://localhost:8088"))
+    parser.add_argument("--username", default=os.environ.get("SUPERSET_USERNAME", "admin"))
+    parser.add_argument("--password", default=os.environ.get("SUPERSET_PASSWORD", "admin"))
+    parser.add_argument("--dashboards", nargs="+", help="Dashboard slugs (default: every provisioned dashboard)")
+    parser.add_argument("--concurrency", type=int, default=4, help="Chart data requests in flight")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per chart and phase")
+    parser.add_argument("--output", type=Path, default=Path("render-benchmark.json"))
+    parser.add_argument("--baseline", type=Path, help="Previous report; exit 1 if any chart's p95 regressed")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed p95 slowdown vs. baseline (0.2 = 20%%)")
+    parser.add_argument("--mock", action="store_true", help="Provision and benchmark a local mock Superset")
+    args = parser.parse_args()
+
+    creator_module = load_creator_module()
+    slugs = args.dashboards or [spec["slug"] for spec in creator_module.DASHBOARD_SPECS]
+
+    with contextlib.ExitStack() as stack:
+        url = args.url
+        if args.mock:
+            from mock_superset import MockSuperset
+
+            url = stack.enter_context(MockSuperset(latency=0.005)).url
+            with contextlib.redirect_stdout(io.StringIO()):
+                creator_module.SupersetDashboardCreator(url, token_cache_dir=None).create_all_dashboards(
+                    concurrency=8, validate="off"
+                )
+
+        creator = creator_module.SupersetDashboardCreator(
+            url, args.username, args.password, pool_size=max(10, args.concurrency),
+            token_cache_dir=None if args.mock else creator_module.DEFAULT_CACHE_DIR
+        )
+        if not creator.authenticate():
+            sys.exit(1)
+
+        report = RenderBenchmark(creator.session, url, args.concurrency, args.repeat).run(slugs)
+
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    print_report(report)
+    print(f"\n💾 Report saved to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        if regressions:
+            print(f"\n❌ {len(regressions)} regression(s) vs. {args.baseline}:")
+            for regression in regressions:
+                print(f"   - {regression}")
+            sys.exit(1)
+        print(f"\n✅ No p95 regressions vs. {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+Small helpers shared by the Superset provisioning tools
+"""
+
+import hashlib
+import importlib.util
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+import requests
+
+
+def load_creator_module():
+    """Import automated-dashboard-creator.py (not importable by name because of the dashes)"""
+    path = Path(__file__).with_name("automated-dashboard-creator.py")
+    spec = importlib.util.spec_from_file_location("automated_dashboard_creator", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def list_all(
+    session: requests.Session,
+    base_url: str,
+    resource: str,
+    columns: Optional[List[str]] = None,
+    filters: Optional[str] = None,
+    page_size: int = 100
+) -> Iterator[Dict[str, Any]]:
+    """Yield every object of a resource (dataset, chart, dashboard) using paginated list calls
+
+    `filters` is a rison filter list body, e.g. "(col:database,opr:rel_o_m,value:1)".
+    """
+    page = 0
+    seen = 0
+    while True:
+        parts = []
+        if columns:
+            parts.append(f"columns:!({','.join(columns)})")
+        if filters:
+            parts.append(f"filters:!({filters})")
+        parts.append(f"page:{page},page_size:{page_size}")
+
+        response = session.get(f"{base_url}/api/v1/{resource}/", params={"q": f"({','.join(parts)})"})
+        response.raise_for_status()
+        payload = response.json()
+        objects = payload.get("result", [])
+        yield from objects
+
+        seen += len(objects)
+        page += 1
+        if not objects or seen >= payload.get("count", seen):
+            break
+
+
+def dashboard_charts(session: requests.Session, base_url: str, slugs: List[str]) -> List[Dict[str, Any]]:
+    """Every chart laid out on the given dashboards (by slug), with its form_data and dashboard slug"""
+    dashboards = {
+        dashboard["slug"]: dashboard["id"]
+        for dashboard in list_all(session, base_url, "dashboard", columns=["id", "slug"])
+        if dashboard.get("slug") in slugs
+    }
+    charts = []
+    for slug in slugs:
+        if slug not in dashboards:
+            print(f"⚠️ Dashboard {slug} not found, skipping")
+            continue
+        response = session.get(f"{base_url}/api/v1/dashboard/{dashboards[slug]}/charts")
+        response.raise_for_status()
+        for chart in response.json()["result"]:
+            charts.append(dict(chart, dashboard=slug))
+    return charts
+
+
+def fingerprint(spec: Any) -> str:
+    """Content hash of a JSON-serialisable spec, independent of key order"""
+    canonical = json.dumps(spec, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def load_json_field(value: Any) -> Any:
+    """Superset returns params/position_json/json_metadata as JSON strings; decode them if needed"""
+    if isinstance(value, str):
+        try:
+            return json.loads(value) if value else {}
+        except ValueError:
+            return value
+    return value if value is not None else {}
+
+
+def chart_query_context(form_data: Dict[str, Any], result_type: str = "full", force: bool = False) -> Dict[str, Any]:
+    """Build a /api/v1/chart/data request body from a chart's form_data
+
+    Charts created through the REST API have no saved query_context, so the
+    query is derived from the params the way Explore does for the common viz
+    types: groupby/columns, metric(s), time column, range, grain, filters and row limit.
+    """
+    datasource_id, datasource_type = str(form_data["datasource"]).split("__", 1)
+    metrics = form_data.get("metrics") or ([form_data["metric"]] if form_data.get("metric") else [])
+    columns = [
+        column
+        for param in ("groupby", "columns", "all_columns")
+        for column in form_data.get(param) or []
+    ]
+
+    filters, where = [], []
+    for adhoc in form_data.get("adhoc_filters") or []:
+        if adhoc.get("expressionType") == "SQL" and adhoc.get("sqlExpression"):
+            where.append(f"({adhoc['sqlExpression']})")
+        elif adhoc.get("subject"):
+            filters.append({"col": adhoc["subject"], "op": adhoc["operator"], "val": adhoc.get("comparator")})
+
+    extras: Dict[str, Any] = {}
+    if form_data.get("time_grain_sqla"):
+        extras["time_grain_sqla"] = form_data["time_grain_sqla"]
+    if where:
+        extras["where"] = " AND ".join(where)
+
+    query: Dict[str, Any] = {
+        "columns": columns,
+        "metrics": metrics,
+        "filters": filters,
+        "extras": extras,
+        "time_range": form_data.get("time_range") or "No filter",
+    }
+    if form_data.get("granularity_sqla"):
+        query["granularity"] = form_data["granularity_sqla"]
+    if form_data.get("row_limit"):
+        query["row_limit"] = form_data["row_limit"]
+
+    return {
+        "datasource": {"id": int(datasource_id), "type": datasource_type},
+        "queries": [query],
+        "form_data": form_data,
+        "result_type": result_type,
+        "result_format": "json",
+        "force": force,
+    }
+
+
+def saved_query_context(chart_spec: Dict[str, Any], dataset_id: int) -> str:
+    """The query_context saved with a provisioned chart, as Explore saves one
+
+    Superset's own cache warm-up (and manufacturing_superset.cache_warmup) runs
+    non-legacy charts from it. It is derived from the params; the chart is
+    also saved with query_context_generation so that Explore replaces it with
+    the frontend's query context the first time the chart is opened and saved.
+    """
+    form_data = dict(chart_spec["params"], datasource=f"{dataset_id}__table", viz_type=chart_spec["viz_type"])
+    return json.dumps(chart_query_context(form_data))
@@ -0,0 +1,194 @@
+#!/usr/bin/env python3
+"""
+Access-token lifecycle for the Superset provisioning tools
+Keeps one CSRF/access token pair per Superset instance, shared by all worker
+threads, refreshes it shortly before the JWT expires and caches it on disk so
+repeated CLI runs skip the login round-trips
+"""
+
+import base64
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import requests
+
+from instrumentation import Instrumentation
+
+DEFAULT_CACHE_DIR = Path(os.environ.get(
+    "SUPERSET_TOKEN_CACHE_DIR", Path.home() / ".cache" / "superset-provisioning"
+))
+
+
+def jwt_expiry(token: Optional[str]) -> float:
+    """The `exp` claim of a JWT (unverified), or 0 if it cannot be read"""
+    try:
+        payload = token.split(".")[1]
+        payload += "=" * (-len(payload) % 4)
+        return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+    except Exception:
+        return 0.0
+
+
+class TokenManager:
+    def __init__(
+        self,
+        session: requests.Session,
+        base_url: str,
+        username: str,
+        password: str,
+        cache_dir: Optional[Path] = DEFAULT_CACHE_DIR,
+        refresh_margin: float = 60,
+        instrumentation: Optional[Instrumentation] = None
+    ):
+        self.session = session
+        self.base_url = base_url
+        self.username = username
+        self.password = password
+        self.refresh_margin = refresh_margin
+        self.instrumentation = instrumentation or Instrumentation(enabled=False)
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.csrf_token: Optional[str] = None
+        self.logins = 0
+        self.refreshes = 0
+        self._lock = threading.Lock()
+        self.cache_path = None
+        if cache_dir is not None:
+            instance = hashlib.sha256(f"{base_url}|{username}".encode()).hexdigest()[:16]
+            self.cache_path = Path(cache_dir) / f"{instance}.json"
+
+    @property
+    def expires_at(self) -> float:
+        return jwt_expiry(self.access_token)
+
+    def needs_refresh(self) -> bool:
+        """True when there is no token or it expires within refresh_margin seconds
+
+        Tokens without a readable `exp` are kept until Superset rejects them with a 401.
+        """
+        if self.access_token is None:
+            return True
+        expires_at = self.expires_at
+        return bool(expires_at) and expires_at - time.time() < self.refresh_margin
+
+    def _apply(self) -> None:
+        if self.csrf_token:
+            self.session.headers.update({"X-CSRFToken": self.csrf_token})
+        if self.access_token:
+            self.session.headers.update({"Authorization": f"Bearer {self.access_token}"})
+
+    def _load_cache(self) -> bool:
+        if self.cache_path is None or not self.cache_path.exists():
+            return False
+        try:
+            cached = json.loads(self.cache_path.read_text())
+        except (OSError, ValueError):
+            return False
+        self.access_token = cached.get("access_token")
+        self.refresh_token = cached.get("refresh_token")
+        self.csrf_token = cached.get("csrf_token")
+        self.session.cookies.update(cached.get("cookies", {}))
+        self._apply()
+        return True
+
+    def _save_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            document: Dict[str, Any] = {
+                "base_url": self.base_url,
+                "username": self.username,
+                "access_token": self.access_token,
+                "refresh_token": self.refresh_token,
+                "csrf_token": self.csrf_token,
+                "cookies": requests.utils.dict_from_cookiejar(self.session.cookies),
+            }
+            # Tokens are credentials: create the file owner-readable only
+            fd = os.open(self.cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, "w") as f:
+                json.dump(document, f)
+        except OSError as e:
+            print(f"⚠️ Could not cache tokens: {str(e)}")
+
+    def _fetch_csrf(self) -> None:
+        with self.instrumentation.span("csrf_fetch") as span:
+            response = self.session.get(f"{self.base_url}/api/v1/security/csrf_token/")
+            span.ok = response.status_code == 200
+        if response.status_code == 200:
+            self.csrf_token = response.json()["result"]
+            self._apply()
+
+    def login(self) -> bool:
+        """Full login: exchange credentials for an access/refresh pair, then fetch a CSRF token"""
+        self.session.headers.pop("Authorization", None)
+        with self.instrumentation.span("login") as span:
+            response = self.session.post(
+                f"{self.base_url}/api/v1/security/login",
+                json={
+                    "username": self.username,
+                    "password": self.password,
+                    "provider": "db",
+                    "refresh": True
+                }
+            )
+            span.ok = response.status_code == 200
+        if response.status_code != 200:
+            print(f"❌ Authentication failed: {response.text}")
+            return False
+
+        tokens = response.json()
+        self.access_token = tokens["access_token"]
+        self.refresh_token = tokens.get("refresh_token")
+        self._apply()
+        self._fetch_csrf()
+        self.logins += 1
+        self._save_cache()
+        return True
+
+    def refresh(self) -> bool:
+        """Exchange the refresh token for a new access token, falling back to a full login"""
+        if self.refresh_token:
+            with self.instrumentation.span("token_refresh") as span:
+                response = self.session.post(
+                    f"{self.base_url}/api/v1/security/refresh",
+                    headers={"Authorization": f"Bearer {self.refresh_token}"}
+                )
+                span.ok = response.status_code == 200
+            if response.status_code == 200:
+                self.access_token = response.json()["access_token"]
+                self._apply()
+                self.refreshes += 1
+                self._save_cache()
+                return True
+        return self.login()
+
+    def authenticate(self) -> bool:
+        """Restore cached tokens when they are still usable, otherwise refresh or log in"""
+        with self._lock:
+            if self._load_cache():
+                if not self.needs_refresh():
+                    return True
+                return self.refresh()
+            return self.login()
+
+    def ensure_fresh(self, force: bool = False) -> bool:
+        """Called before every API call; only one thread refreshes, the others reuse its result"""
+        if self.access_token is None:
+            return False
+        if not force and not self.needs_refresh():
+            return True
+        token_before = self.access_token
+        with self._lock:
+            if self.access_token != token_before or (not force and not self.needs_refresh()):
+                return True
+            return self.refresh()
+
+    def invalidate_cache(self) -> None:
+        if self.cache_path is not None and self.cache_path.exists():
+            self.cache_path.unlink()
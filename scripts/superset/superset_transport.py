@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+"""
+HTTP transport for the Superset provisioning tools
+A requests.Session with a sized keep-alive connection pool, per-call timeouts,
+exponential backoff with jitter on 429/5xx, token refresh on expiry/401,
+and per-endpoint timing metrics
+
+Only idempotent methods are retried after a read timeout or a 5xx, as the
+server may have committed the first attempt. POSTs (creating charts,
+dashboards, ...) are retried only when the request never reached Superset
+(connection errors) or was refused with 429.
+"""
+
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple, Union
+
+import requests
+from requests.adapters import HTTPAdapter
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+# Safe to retry for any method: the request was not processed
+UNPROCESSED_STATUSES = {429}
+# The calls that obtain the tokens themselves; every other call (guest_token/ included) is authenticated
+TOKEN_ENDPOINTS = ("/api/v1/security/login", "/api/v1/security/refresh", "/api/v1/security/csrf_token/")
+ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+Timeout = Union[float, Tuple[float, float]]
+
+
+def endpoint_name(method: str, url: str) -> str:
+    """Group calls by endpoint: `POST /api/v1/chart/`, `PUT /api/v1/chart/{id}`"""
+    path = re.sub(r"^https?://[^/]+", "", url).split("?", 1)[0]
+    return f"{method.upper()} {ID_SEGMENT.sub('/{id}', path)}"
+
+
+class TransportMetrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints: Dict[str, Dict[str, float]] = {}
+
+    def record(self, endpoint: str, elapsed: float, retries: int, failed: bool) -> None:
+        with self._lock:
+            stats = self.endpoints.setdefault(
+                endpoint, {"calls": 0, "retries": 0, "failures": 0, "total_s": 0.0, "max_s": 0.0}
+            )
+            stats["calls"] += 1
+            stats["retries"] += retries
+            stats["failures"] += int(failed)
+            stats["total_s"] += elapsed
+            stats["max_s"] = max(stats["max_s"], elapsed)
+
+    @property
+    def total_retries(self) -> int:
+        return int(sum(stats["retries"] for stats in self.endpoints.values()))
+
+    def summary(self, top: int = 5) -> str:
+        calls = int(sum(stats["calls"] for stats in self.endpoints.values()))
+        lines = [f"{calls} calls, {self.total_retries} retries"]
+        slowest = sorted(self.endpoints.items(), key=lambda item: item[1]["total_s"], reverse=True)[:top]
+        for endpoint, stats in slowest:
+            lines.append(
+                f"   {endpoint}: {int(stats['calls'])} calls, {stats['total_s']:.2f}s total, "
+                f"{stats['max_s'] * 1000:.0f}ms max, {int(stats['retries'])} retries"
+            )
+        return "\n".join(lines)
+
+
+class SupersetTransport(requests.Session):
+    def __init__(
+        self,
+        pool_size: int = 10,
+        timeout: Timeout = (5, 60),
+        max_retries: int = 4,
+        backoff_base: float = 0.5,
+        backoff_max: float = 30.0
+    ):
+        super().__init__()
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.metrics = TransportMetrics()
+        # Optional TokenManager; when set, tokens are refreshed before they expire and after a 401
+        self.token_manager = None
+        self.pool_size = 0
+        self._pool_lock = threading.Lock()
+        self.ensure_pool_size(pool_size)
+        self.headers.update({"Connection": "keep-alive"})
+
+    def ensure_pool_size(self, pool_size: int) -> None:
+        """Grow the keep-alive pool so every concurrent worker can hold a connection"""
+        with self._pool_lock:
+            if pool_size <= self.pool_size:
+                return
+            adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+            self.mount("http://", adapter)
+            self.mount("https://", adapter)
+            self.pool_size = pool_size
+
+    def backoff(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        """Full-jitter exponential backoff, honouring a numeric Retry-After header"""
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), self.backoff_max)
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+
+    def request(self, method: str, url: str, *args: Any, **kwargs: Any) -> requests.Response:
+        """Send a request, retrying transient failures; pass retries=0 to disable retrying
+
+        A POST that times out reading the response is not retried and the
+        timeout is raised (ConnectTimeout is a ConnectionError, so it still is).
+        """
+        max_retries = kwargs.pop("retries", self.max_retries)
+        kwargs.setdefault("timeout", self.timeout)
+        endpoint = endpoint_name(method, url)
+        authenticated = self.token_manager is not None and not any(path in url for path in TOKEN_ENDPOINTS)
+        reauthenticated = False
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        retry_errors = (requests.ConnectionError, requests.Timeout) if idempotent else (requests.ConnectionError,)
+        retry_statuses = RETRY_STATUSES if idempotent else UNPROCESSED_STATUSES
+        started = time.perf_counter()
+        attempt = 0
+
+        if authenticated:
+            self.token_manager.ensure_fresh()
+
+        while True:
+            try:
+                response = super().request(method, url, *args, **kwargs)
+            except retry_errors:
+                if attempt >= max_retries:
+                    self.metrics.record(endpoint, time.perf_counter() - started, attempt, failed=True)
+                    raise
+                time.sleep(self.backoff(attempt))
+                attempt += 1
+                continue
+
+            if response.status_code == 401 and authenticated and not reauthenticated:
+                reauthenticated = True
+                if self.token_manager.ensure_fresh(force=True):
+                    continue
+
+            if response.status_code in retry_statuses and attempt < max_retries:
+                time.sleep(self.backoff(attempt, response.headers.get("Retry-After")))
+                attempt += 1
+                continue
+
+            self.metrics.record(endpoint, time.perf_counter() - started, attempt, failed=response.status_code >= 400)
+            return response
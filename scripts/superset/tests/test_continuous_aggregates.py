@@ -0,0 +1,49 @@
+import pytest
+
+from continuous_aggregates import route_chart
+from dashboard_compiler import load_specs
+
+
+def trend_chart(dataset, time_column, metric_column, aggregate="SUM"):
+    return {
+        "dataset": dataset,
+        "params": {
+            "granularity_sqla": time_column,
+            "time_grain_sqla": "PT1H",
+            "time_range": "Last week",
+            "metrics": [{
+                "expressionType": "SIMPLE",
+                "column": {"column_name": metric_column},
+                "aggregate": aggregate,
+                "label": "Parts",
+            }],
+        },
+    }
+
+
+@pytest.mark.parametrize("chart_spec", [
+    trend_chart("v_realtime_production", "created_at", "total_parts_produced"),
+    trend_chart("v_realtime_production", "date", "good_parts"),
+    trend_chart("v_oee_hourly_trend", "date", "avg_oee", "AVG"),
+])
+def test_star_schema_views_are_not_routed(chart_spec):
+    assert route_chart(chart_spec) is None
+
+
+def test_oee_metrics_are_routed_to_the_coarsest_fitting_aggregate():
+    aggregate, params = route_chart(trend_chart("oee_metrics", "timestamp", "production_count"))
+
+    assert aggregate == "oee_hourly"
+    assert params["granularity_sqla"] == "bucket"
+    assert params["metrics"] == [{
+        "expressionType": "SIMPLE",
+        "column": {"column_name": "total_production"},
+        "aggregate": "SUM",
+        "label": "Parts",
+    }]
+
+
+def test_compiled_specs_keep_star_schema_charts_on_their_views():
+    for spec in load_specs():
+        for chart in spec["charts"]:
+            assert "routed_from" not in chart, chart["slice_name"]
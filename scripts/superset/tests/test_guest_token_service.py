@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from guest_token_service import GuestTokenService
+from mock_superset import MockSuperset
+from superset_auth import TokenManager
+from superset_transport import SupersetTransport
+
+TOKEN_TTL = 1.0
+
+
+@pytest.fixture
+def mock():
+    with MockSuperset(latency=0, token_ttl=TOKEN_TTL) as mock:
+        yield mock
+
+
+def service_for(mock, refresh_margin):
+    session = SupersetTransport(max_retries=0)
+    session.token_manager = TokenManager(session, mock.url, "admin", "admin", cache_dir=None, refresh_margin=refresh_margin)
+    assert session.token_manager.authenticate()
+    return GuestTokenService(session, mock.url, batch_window=0)
+
+
+@pytest.mark.parametrize("refresh_margin", [
+    # Refreshed before the mint, as the token is about to expire
+    TOKEN_TTL,
+    # Refreshed after Superset rejects the expired token with a 401
+    0,
+])
+def test_mints_again_after_the_access_token_expires(mock, refresh_margin):
+    service = service_for(mock, refresh_margin)
+    user = {"username": "hmi-line-3"}
+
+    service.guest_token(user, "dashboard-a")
+    time.sleep(TOKEN_TTL + 0.2)
+    token, expires_at = service.guest_token(user, "dashboard-b")
+
+    assert token and expires_at > time.time()
+    assert service.mints == 2 and service.failures == 0
+    assert mock.state.refreshes >= 1
+    assert mock.state.guest_tokens == 2
@@ -0,0 +1,36 @@
+import json
+
+from provision_fleet import load_inventory
+
+
+def write_inventory(tmp_path, inventory):
+    path = tmp_path / "inventory.json"
+    path.write_text(json.dumps(inventory))
+    return path
+
+
+def test_inline_password_wins_over_default_password_env(tmp_path, monkeypatch):
+    monkeypatch.setenv("FLEET_ADMIN_PASSWORD", "from-env")
+    path = write_inventory(tmp_path, {
+        "defaults": {"username": "admin", "password_env": "FLEET_ADMIN_PASSWORD"},
+        "instances": [
+            {"name": "inline", "url": "http://inline:8088", "password": "inline-secret"},
+            {"name": "env", "url": "http://env:8088"},
+        ],
+    })
+
+    instances = {instance["name"]: instance for instance in load_inventory(path)}
+
+    assert instances["inline"]["password"] == "inline-secret"
+    assert instances["env"]["password"] == "from-env"
+    assert all("password_env" not in instance for instance in instances.values())
+
+
+def test_instance_password_env_wins_over_default_password(tmp_path, monkeypatch):
+    monkeypatch.setenv("PLANT_PASSWORD", "plant-secret")
+    path = write_inventory(tmp_path, {
+        "defaults": {"password": "default-secret"},
+        "instances": [{"name": "plant", "url": "http://plant:8088", "password_env": "PLANT_PASSWORD"}],
+    })
+
+    assert load_inventory(path)[0]["password"] == "plant-secret"
@@ -0,0 +1,5 @@
+"""
+Manufacturing extensions for Apache Superset
+Celery tasks and helpers loaded by superset_config.py; mounted into the
+Superset containers at /app/pythonpath/manufacturing_superset
+"""
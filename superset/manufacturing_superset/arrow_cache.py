@@ -0,0 +1,38 @@
+"""
+Data cache backends storing chart results as compressed Arrow IPC
+(manufacturing_superset.arrow_codec) instead of pickles
+
+Opt-in (DATA_CACHE_CODEC in superset_config.py), through DATA_CACHE_CONFIG:
+    'CACHE_TYPE': 'manufacturing_superset.arrow_cache.ArrowRedisCache',
+    'CACHE_OPTIONS': {'compression': 'zstd', 'compression_level': None, 'min_rows': 1000},
+or ArrowTieredRedisCache with the TieredRedisCache options as well.
+scripts/superset/cache_codec_benchmark.py compares the codecs with the pickle default.
+"""
+
+from typing import Any, Optional
+
+from flask_caching.backends.rediscache import RedisCache
+
+from manufacturing_superset.arrow_codec import DEFAULT_MIN_ROWS, ArrowSerializer
+from manufacturing_superset.tiered_cache import TieredRedisCache
+
+
+class _ArrowCodecMixin:
+    def __init__(
+        self,
+        *args: Any,
+        compression: str = "zstd",
+        compression_level: Optional[int] = None,
+        min_rows: int = DEFAULT_MIN_ROWS,
+        **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.serializer = ArrowSerializer(compression, compression_level, min_rows)
+
+
+class ArrowRedisCache(_ArrowCodecMixin, RedisCache):
+    """flask-caching RedisCache storing DataFrames as compressed Arrow IPC"""
+
+
+class ArrowTieredRedisCache(_ArrowCodecMixin, TieredRedisCache):
+    """TieredRedisCache (in-process L1 over Redis) storing DataFrames as compressed Arrow IPC"""
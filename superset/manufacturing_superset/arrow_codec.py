@@ -0,0 +1,170 @@
+"""
+Columnar, compressed codec for the data cache
+Superset caches a chart result as a dict whose "df" is a pandas DataFrame,
+pickled as is: numeric blocks raw and uncompressed, text columns one Python
+object per cell. ArrowSerializer stores
+the DataFrames of a cached value as Arrow IPC streams with zstd or lz4
+compressed buffers and pickles only the small remainder (query, status,
+filters, ...). Reads decode nothing up front: a frame is decompressed and
+converted to pandas the first time its key is read, so metadata-only reads stay
+cheap. Frames are decoded with the options of Superset's
+SupersetResultSet.convert_table_to_df (integer columns with nulls stay
+object), and a frame that would not come back with its own dtypes (e.g. an
+object column holding only ints) is pickled, so a cache hit returns exactly
+what the uncached query did. Values without DataFrames, frames Arrow cannot
+represent, and entries written by the plain pickle serializer are handled as
+before, and so are frames under min_rows rows: the Arrow schema (with its
+pandas metadata) costs more than pickling a KPI tile.
+
+Used by the cache backends in manufacturing_superset.arrow_cache; kept free of
+Flask imports so scripts/superset/cache_codec_benchmark.py can load it.
+"""
+
+import logging
+import pickle
+import struct
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+from cachelib.serializers import RedisSerializer
+
+logger = logging.getLogger(__name__)
+
+# Marks an Arrow-encoded entry; pickled entries start with b"!" (RedisSerializer)
+MAGIC = b"ARW1"
+_LENGTH = struct.Struct("!I")
+
+CODECS = ("zstd", "lz4", "none")
+# Smaller frames are pickled: their Arrow payloads are larger and slower (cache_codec_benchmark.py)
+DEFAULT_MIN_ROWS = 1000
+# How SupersetResultSet.convert_table_to_df builds the frames Superset caches
+TO_PANDAS_OPTIONS = {"integer_object_nulls": True}
+
+
+def decode_frame(buffer: Any) -> pd.DataFrame:
+    with pa.ipc.open_stream(pa.py_buffer(buffer)) as reader:
+        return reader.read_all().to_pandas(**TO_PANDAS_OPTIONS)
+
+
+def round_trips(df: pd.DataFrame, table: pa.Table) -> bool:
+    """Whether decode_frame gives the table back with df's dtypes, judged from the schema and null counts"""
+    decoded = table.schema.empty_table().to_pandas(**TO_PANDAS_OPTIONS)
+    for name in df.columns:
+        expected = decoded[name].dtype
+        field_type = table.schema.field(name).type
+        nullable = pa.types.is_integer(field_type) or pa.types.is_boolean(field_type)
+        if nullable and table.column(name).null_count and not isinstance(expected, pd.api.extensions.ExtensionDtype):
+            # Integers (with integer_object_nulls) and booleans with nulls come back as objects
+            expected = np.dtype(object)
+        # By name: the empty table's categoricals have no categories yet
+        if str(expected) != str(df[name].dtype):
+            return False
+    return True
+
+
+class LazyCacheValue(dict):
+    """A cached dict whose DataFrames are decoded from Arrow on first access"""
+
+    def __init__(self, value: Dict[str, Any], frames: Dict[str, memoryview]):
+        super().__init__(value)
+        self._frames = frames
+        # The tiered cache shares one value between request threads
+        self._lock = threading.Lock()
+
+    def _decode(self, key: Any) -> None:
+        with self._lock:
+            buffer = self._frames.pop(key, None)
+            if buffer is not None:
+                dict.__setitem__(self, key, decode_frame(buffer))
+
+    def __getitem__(self, key: Any) -> Any:
+        if key in self._frames:
+            self._decode(key)
+        return dict.__getitem__(self, key)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        return self[key] if key in self else default
+
+    def values(self):
+        for key in list(self._frames):
+            self._decode(key)
+        return dict.values(self)
+
+    def items(self):
+        for key in list(self._frames):
+            self._decode(key)
+        return dict.items(self)
+
+    def copy(self) -> Dict[str, Any]:
+        return dict(self.items())
+
+    def __reduce__(self):
+        return dict, (dict(self.items()),)
+
+
+class ArrowSerializer(RedisSerializer):
+    def __init__(self, compression: str = "zstd", compression_level: Optional[int] = None, min_rows: int = DEFAULT_MIN_ROWS):
+        if compression not in CODECS:
+            raise ValueError(f"compression must be one of {', '.join(CODECS)}, not {compression!r}")
+        self.compression = compression
+        self.min_rows = min_rows
+        codec = None if compression == "none" else pa.Codec(compression, compression_level)
+        self.write_options = pa.ipc.IpcWriteOptions(compression=codec)
+
+    def encode_frame(self, df: pd.DataFrame) -> Optional[bytes]:
+        """One DataFrame as a compressed Arrow IPC stream, or None if Arrow cannot round-trip it and its dtypes"""
+        if len(df) < self.min_rows:
+            return None
+        if not all(isinstance(column, str) for column in df.columns) or not df.columns.is_unique:
+            return None
+        try:
+            table = pa.Table.from_pandas(df)
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError) as e:
+            logger.debug("Caching a DataFrame with pickle, Arrow cannot encode it: %s", str(e))
+            return None
+        if not round_trips(df, table):
+            logger.debug("Caching a DataFrame with pickle, Arrow would not restore its dtypes")
+            return None
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema, options=self.write_options) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes()
+
+    def dumps(self, value: Any, protocol: int = pickle.HIGHEST_PROTOCOL) -> bytes:
+        if not isinstance(value, dict):
+            return super().dumps(value, protocol)
+        frames: List[Tuple[str, bytes]] = []
+        rest: Dict[str, Any] = {}
+        for key, item in value.items():
+            encoded = self.encode_frame(item) if isinstance(item, pd.DataFrame) and isinstance(key, str) else None
+            if encoded is None:
+                rest[key] = item
+            else:
+                frames.append((key, encoded))
+        if not frames:
+            return super().dumps(value, protocol)
+
+        header = pickle.dumps((rest, [(key, len(encoded)) for key, encoded in frames]), protocol)
+        return b"".join([MAGIC, _LENGTH.pack(len(header)), header, *(encoded for _, encoded in frames)])
+
+    def loads(self, value: Optional[bytes]) -> Any:
+        if value is None or not value.startswith(MAGIC):
+            return super().loads(value)
+        try:
+            view = memoryview(value)
+            offset = len(MAGIC) + _LENGTH.size
+            (header_length,) = _LENGTH.unpack_from(view, len(MAGIC))
+            rest, lengths = pickle.loads(view[offset:offset + header_length])
+            offset += header_length
+            frames: Dict[str, memoryview] = {}
+            for key, length in lengths:
+                frames[key] = view[offset:offset + length]
+                offset += length
+        except (pickle.PickleError, struct.error, ValueError, EOFError) as e:
+            # A corrupt entry is a cache miss, as with RedisSerializer
+            logger.warning("Discarding unreadable Arrow cache entry: %s", str(e))
+            return None
+        return LazyCacheValue({**rest, **dict.fromkeys(frames)}, frames)
@@ -0,0 +1,177 @@
+"""
+One-shot startup bootstrap of the Manufacturing Superset deployment
+Superset builds its app, and with it APP_INITIALIZER, in every gunicorn worker
+and Celery process. Work that is needed once per deployment runs here
+instead. Registering the Manufacturing database connections is one such task.
+
+The first process to boot takes a Postgres advisory lock on the metadata
+database. It runs MANUFACTURING_BOOTSTRAP_TASKS and stamps the bootstrap
+version in the manufacturing_bootstrap table. A later process that finds the
+stamp current skips the tasks after one SELECT. A process that finds the lock
+taken leaves the work to the holder.
+
+The version combines MANUFACTURING_BOOTSTRAP_VERSION with a hash of the
+settings in MANUFACTURING_BOOTSTRAP_SETTINGS. Changing a setting such as
+MANUFACTURING_DB_HOST therefore runs the tasks again on the next boot.
+"""
+
+import functools
+import hashlib
+import json
+import logging
+import os
+import socket
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, Mapping, Optional
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, Text, select, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+
+logger = logging.getLogger(__name__)
+
+BOOTSTRAP_NAME = "manufacturing_superset"
+LOCK_NAME = "manufacturing_superset.bootstrap"
+LOCK_POLL_INTERVAL = 0.5
+
+metadata = MetaData()
+bootstrap_state = Table(
+    "manufacturing_bootstrap",
+    metadata,
+    Column("name", String(64), primary_key=True),
+    Column("version", String(80), nullable=False),
+    Column("completed_at", DateTime(timezone=True), nullable=False),
+    Column("completed_by", String(255)),
+    Column("phases", Text),
+)
+
+
+class StartupTimings:
+    """Wall time in ms of each named startup phase, in the order the phases finished"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: Dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = round((time.perf_counter() - started) * 1000, 1)
+
+    def wrap(self, name: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(func)
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            with self.phase(name):
+                return func(*args, **kwargs)
+
+        return timed
+
+    def log(self, what: str) -> None:
+        total_ms = (time.perf_counter() - self.started) * 1000
+        logger.info("%s in %.1fms (pid %d): %s", what, total_ms, os.getpid(), json.dumps(self.phases))
+
+
+def bootstrap_version(config: Mapping[str, Any]) -> str:
+    """MANUFACTURING_BOOTSTRAP_VERSION plus a digest of the settings and tasks it depends on"""
+    inputs = {key: config.get(key) for key in config.get("MANUFACTURING_BOOTSTRAP_SETTINGS", ())}
+    inputs["tasks"] = [name for name, _ in config.get("MANUFACTURING_BOOTSTRAP_TASKS", ())]
+    # Hashed, as the settings hold the database password
+    digest = hashlib.sha256(json.dumps(inputs, sort_keys=True, default=str).encode()).hexdigest()[:16]
+    return f"{config.get('MANUFACTURING_BOOTSTRAP_VERSION', '1')}-{digest}"
+
+
+def read_stamp(connection: Connection) -> Optional[str]:
+    try:
+        with connection.begin():
+            return connection.execute(
+                select(bootstrap_state.c.version).where(bootstrap_state.c.name == BOOTSTRAP_NAME)
+            ).scalar()
+    except SQLAlchemyError:
+        # The table does not exist before the first bootstrap of the deployment
+        return None
+
+
+def write_stamp(connection: Connection, version: str, phases: Dict[str, float]) -> None:
+    with connection.begin():
+        metadata.create_all(connection, checkfirst=True)
+        connection.execute(bootstrap_state.delete().where(bootstrap_state.c.name == BOOTSTRAP_NAME))
+        connection.execute(bootstrap_state.insert().values(
+            name=BOOTSTRAP_NAME,
+            version=version,
+            completed_at=datetime.now(timezone.utc),
+            completed_by=f"{socket.gethostname()}:{os.getpid()}",
+            phases=json.dumps(phases),
+        ))
+
+
+def acquire_lock(connection: Connection, wait_seconds: float = 0) -> bool:
+    """Take the bootstrap's session-level advisory lock, retrying for up to wait_seconds"""
+    if connection.dialect.name != "postgresql":
+        # e.g. SQLite in development, with a single process
+        return True
+    deadline = time.monotonic() + wait_seconds
+    while True:
+        with connection.begin():
+            locked = connection.execute(text("SELECT pg_try_advisory_lock(hashtext(:name))"), {"name": LOCK_NAME}).scalar()
+        if locked or time.monotonic() >= deadline:
+            return bool(locked)
+        time.sleep(LOCK_POLL_INTERVAL)
+
+
+def release_lock(connection: Connection) -> None:
+    if connection.dialect.name == "postgresql":
+        with connection.begin():
+            connection.execute(text("SELECT pg_advisory_unlock(hashtext(:name))"), {"name": LOCK_NAME})
+
+
+def run_bootstrap(
+    engine: Engine,
+    config: Mapping[str, Any],
+    timings: Optional[StartupTimings] = None,
+    wait_seconds: float = 0,
+) -> str:
+    """Run MANUFACTURING_BOOTSTRAP_TASKS unless the current version already ran
+
+    Returns "current" (nothing to do), "ran", "locked" (another process holds
+    the lock) or "failed". A failed task leaves the stamp as it was, so the
+    next boot tries again.
+    """
+    timings = timings or StartupTimings()
+    version = bootstrap_version(config)
+    with engine.connect() as connection:
+        with timings.phase("bootstrap.check"):
+            stamped = read_stamp(connection)
+        if stamped == version:
+            return "current"
+
+        with timings.phase("bootstrap.lock"):
+            locked = acquire_lock(connection, wait_seconds)
+        if not locked:
+            logger.info("Bootstrap %s is running in another process, not waiting for it", version)
+            return "locked"
+        try:
+            # The previous lock holder may have completed this version meanwhile
+            if read_stamp(connection) == version:
+                return "current"
+
+            task_phases = {}
+            for name, task in config.get("MANUFACTURING_BOOTSTRAP_TASKS", ()):
+                phase = f"bootstrap.{name}"
+                with timings.phase(phase):
+                    try:
+                        task(config)
+                    except Exception:
+                        logger.exception("Bootstrap task %s failed, it runs again on the next boot", name)
+                        return "failed"
+                task_phases[name] = timings.phases[phase]
+            write_stamp(connection, version, task_phases)
+        finally:
+            release_lock(connection)
+
+    logger.info("Bootstrap %s complete (previously %s): %s", version, stamped or "never run", json.dumps(task_phases))
+    return "ran"
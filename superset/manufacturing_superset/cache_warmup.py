@@ -0,0 +1,173 @@
+"""
+Cache warm-up for the provisioned manufacturing dashboards
+Re-runs every chart query of the managed dashboards through Superset's own
+query path on a Celery beat schedule. Each freshness tier (realtime, operational,
+rollup) is force-refreshed shortly before its cache timeout runs out, so the
+first operator to open a dashboard hits a warm cache instead of TimescaleDB
+"""
+
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from flask import current_app
+from superset.charts.schemas import ChartDataQueryContextSchema
+from superset.extensions import cache_manager, celery_app, db, security_manager
+from superset.models.dashboard import Dashboard
+from superset.utils.core import override_user
+from superset.views.utils import get_viz
+from superset.viz import viz_types
+
+try:
+    from superset.commands.chart.data.get_data_command import ChartDataCommand
+except ImportError:  # older Superset 3.x releases kept the chart commands under superset.charts
+    from superset.charts.data.commands.get_data_command import ChartDataCommand
+
+logger = logging.getLogger(__name__)
+
+STATS_CACHE_KEY = "manufacturing:cache_warmup:last_run"
+
+
+def query_context_payload(chart, force: bool = False) -> Optional[Dict[str, Any]]:
+    """The chart's saved query context with force set, or None if it has none
+
+    The provisioning tooling saves one with every chart; charts saved from
+    Explore carry the frontend's own, so the warmed entries have the cache
+    keys the dashboards request.
+    """
+    if not chart.query_context:
+        return None
+    payload = json.loads(chart.query_context)
+    payload["force"] = force
+    return payload
+
+
+def effective_cache_timeout(chart) -> Optional[int]:
+    """The timeout Superset caches the chart's results for: chart, dataset, database, then the default"""
+    for timeout in (chart.cache_timeout, chart.datasource.cache_timeout, chart.datasource.database.cache_timeout):
+        if timeout is not None:
+            return timeout
+    return current_app.config["DATA_CACHE_CONFIG"].get("CACHE_DEFAULT_TIMEOUT")
+
+
+def chart_tier(chart, tiers: Dict[str, int]) -> Optional[str]:
+    """The freshness tier whose warm-up keeps the chart's entries warm
+
+    A timeout between two tiers falls in the shorter one, which is warmed
+    often enough for it. Charts that are not cached have no tier.
+    """
+    timeout = effective_cache_timeout(chart)
+    if not timeout or timeout < 0:
+        return None
+    by_timeout = sorted(tiers.items(), key=lambda tier: tier[1])
+    fitting = [name for name, tier_timeout in by_timeout if tier_timeout <= timeout]
+    return fitting[-1] if fitting else by_timeout[0][0]
+
+
+def _run_legacy_viz(chart, force: bool) -> Tuple[str, Optional[str]]:
+    payload = get_viz(
+        datasource_type=chart.datasource.type,
+        datasource_id=chart.datasource.id,
+        form_data=chart.form_data,
+        force=force,
+    ).get_payload()
+    errors = payload.get("errors") or []
+    if errors:
+        return "error", "; ".join(str(e.get("message", e)) for e in errors)
+    return ("hit" if payload.get("is_cached") else "miss"), None
+
+
+def _run_chart_data(chart, force: bool) -> Tuple[str, Optional[str]]:
+    payload = query_context_payload(chart, force)
+    if payload is None:
+        return "error", "chart has no saved query_context; re-provision it or save it from Explore"
+    command = ChartDataCommand(ChartDataQueryContextSchema().load(payload))
+    command.validate()
+    queries = command.run()["queries"]
+    for query in queries:
+        if query.get("error"):
+            return "error", str(query["error"])
+    return ("hit" if all(query.get("is_cached") for query in queries) else "miss"), None
+
+
+def warm_chart(chart, force: bool = False) -> Dict[str, Any]:
+    """Run one chart's query; status is "hit" if it was already cached, "miss" if it was computed now
+
+    Like Superset's ChartWarmUpCacheCommand, legacy viz types (those in
+    superset.viz) run through get_viz and every other type (gauge_chart,
+    table, big_number_total, pie, echarts_*) through ChartDataCommand with
+    the chart's saved query context.
+    """
+    started = time.perf_counter()
+    error = None
+    try:
+        if not chart.datasource:
+            status, error = "error", "chart's datasource does not exist"
+        elif chart.viz_type in viz_types:
+            status, error = _run_legacy_viz(chart, force)
+        else:
+            status, error = _run_chart_data(chart, force)
+    except Exception as e:
+        status, error = "error", str(e)
+
+    return {
+        "chart_id": chart.id,
+        "slice_name": chart.slice_name,
+        "status": status,
+        "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+        "error": error,
+    }
+
+
+@celery_app.task(name="manufacturing.warm_dashboard_caches", soft_time_limit=600)
+def warm_dashboard_caches(
+    slugs: Optional[List[str]] = None,
+    force: bool = False,
+    tier: Optional[str] = None,
+) -> Dict[str, Any]:
+    """Warm the charts of the given dashboards (default: the provisioned ones) and report the hit rate
+
+    With a tier only the charts of that freshness tier (MANUFACTURING_CACHE_TIERS)
+    are warmed. A cache hit does not extend an entry's timeout, so the scheduled
+    per-tier runs force the queries; without force the hit rate tells how many
+    charts were still cached.
+    """
+    config = current_app.config
+    slugs = slugs or config["MANUFACTURING_CACHE_WARMUP_DASHBOARDS"]
+    started = time.perf_counter()
+
+    dashboards = db.session.query(Dashboard).filter(Dashboard.slug.in_(slugs)).all()
+    # A chart shared by several dashboards only needs warming once
+    charts = {chart.id: chart for dashboard in dashboards for chart in dashboard.slices}
+    if tier is not None:
+        tiers = config["MANUFACTURING_CACHE_TIERS"]
+        charts = {
+            chart_id: chart for chart_id, chart in charts.items()
+            if chart.datasource and chart_tier(chart, tiers) == tier
+        }
+
+    with override_user(security_manager.find_user(username=config["MANUFACTURING_CACHE_WARMUP_USER"])):
+        results = [warm_chart(chart, force=force) for chart in charts.values()]
+
+    counts = {status: sum(1 for result in results if result["status"] == status) for status in ("hit", "miss", "error")}
+    queried = counts["hit"] + counts["miss"]
+    stats = {
+        "finished_at": datetime.now(timezone.utc).isoformat(),
+        "force": force,
+        "tier": tier,
+        "dashboards": len(dashboards),
+        "charts": len(results),
+        "hits": counts["hit"],
+        "misses": counts["miss"],
+        "errors": counts["error"],
+        "hit_rate": round(counts["hit"] / queried, 3) if queried else None,
+        "duration_s": round(time.perf_counter() - started, 3),
+        "slowest": sorted(results, key=lambda result: result["duration_ms"], reverse=True)[:3],
+        "failed": [result for result in results if result["status"] == "error"],
+    }
+
+    logger.info("Cache warm-up finished: %s", json.dumps(stats))
+    cache_manager.cache.set(f"{STATS_CACHE_KEY}:{tier}" if tier else STATS_CACHE_KEY, stats, timeout=24 * 3600)
+    return stats
@@ -0,0 +1,140 @@
+"""
+Depth and wait-time metrics of the Superset Celery queues
+Every task is stamped with its publish time, and when a worker starts it the
+wait is recorded in the broker's Redis under the queue it came from. The
+/manufacturing/celery-metrics endpoint (BLUEPRINTS in superset_config.py)
+serves, per queue of MANUFACTURING_CELERY_QUEUES, the tasks waiting in the
+broker and the wait times of the tasks started in the last WAIT_WINDOW
+seconds, in the Prometheus text format.
+"""
+
+import logging
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+import redis
+from celery.signals import before_task_publish, task_prerun
+from flask import Blueprint, Response, current_app
+
+logger = logging.getLogger(__name__)
+
+PUBLISHED_AT_HEADER = "manufacturing_published_at"
+WAIT_SAMPLES_KEY = "manufacturing:celery:wait:{queue}"
+# Wait times are reported over this many seconds, from at most MAX_WAIT_SAMPLES tasks per queue
+WAIT_WINDOW = 300
+MAX_WAIT_SAMPLES = 1000
+WAIT_QUANTILES = (0.5, 0.95, 0.99)
+# kombu's Redis transport keeps each priority level of a queue in its own list
+PRIORITY_SEPARATOR = "\x06\x16"
+PRIORITY_STEPS = (3, 6, 9)
+
+_clients: Dict[int, redis.Redis] = {}
+
+
+def broker_client(broker_url: str) -> redis.Redis:
+    """A Redis client for the broker, one per (forked) worker process"""
+    client = _clients.get(os.getpid())
+    if client is None:
+        client = _clients[os.getpid()] = redis.Redis.from_url(broker_url, socket_timeout=2)
+    return client
+
+
+@before_task_publish.connect
+def stamp_publish_time(headers: Optional[Dict[str, Any]] = None, **kwargs: Any) -> None:
+    if headers is not None:
+        headers.setdefault(PUBLISHED_AT_HEADER, time.time())
+
+
+@task_prerun.connect
+def record_queue_wait(task=None, **kwargs: Any) -> None:
+    """Record how long the task waited in its queue (tasks with an ETA or countdown excluded)"""
+    request = task.request
+    published_at = getattr(request, PUBLISHED_AT_HEADER, None)
+    queue = (request.delivery_info or {}).get("routing_key")
+    if published_at is None or request.eta or not queue:
+        return
+    now = time.time()
+    key = WAIT_SAMPLES_KEY.format(queue=queue)
+    try:
+        pipe = broker_client(task.app.conf.broker_url).pipeline(transaction=False)
+        pipe.lpush(key, f"{now:.3f}:{max(0.0, now - float(published_at)):.3f}")
+        pipe.ltrim(key, 0, MAX_WAIT_SAMPLES - 1)
+        pipe.execute()
+    except redis.RedisError as e:
+        logger.debug("Could not record the queue wait of %s: %s", task.name, str(e))
+
+
+def quantile(ordered: List[float], q: float) -> float:
+    """Nearest-rank quantile (q in 0-1) of a sorted, non-empty list"""
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def queue_metrics(client: redis.Redis, queues: List[str]) -> Dict[str, Dict[str, Any]]:
+    now = time.time()
+    pipe = client.pipeline(transaction=False)
+    for queue in queues:
+        pipe.llen(queue)
+        for step in PRIORITY_STEPS:
+            pipe.llen(f"{queue}{PRIORITY_SEPARATOR}{step}")
+        pipe.lrange(WAIT_SAMPLES_KEY.format(queue=queue), 0, -1)
+    replies = iter(pipe.execute())
+
+    metrics = {}
+    for queue in queues:
+        depth = sum(next(replies) for _ in range(1 + len(PRIORITY_STEPS)))
+        waits = []
+        for sample in next(replies):
+            started_at, wait = (float(part) for part in sample.decode().split(":"))
+            if started_at >= now - WAIT_WINDOW:
+                waits.append(wait)
+        waits.sort()
+        metrics[queue] = {
+            "depth": depth,
+            "started": len(waits),
+            "wait_quantiles": {q: quantile(waits, q) for q in WAIT_QUANTILES} if waits else {},
+            "wait_max": waits[-1] if waits else 0.0,
+        }
+    return metrics
+
+
+def render_metrics(metrics: Dict[str, Dict[str, Any]]) -> str:
+    lines = [
+        "# HELP superset_celery_queue_depth Tasks waiting in the broker",
+        "# TYPE superset_celery_queue_depth gauge",
+    ]
+    lines += [f'superset_celery_queue_depth{{queue="{queue}"}} {stats["depth"]}' for queue, stats in metrics.items()]
+    lines += [
+        f"# HELP superset_celery_queue_started_tasks Tasks started in the last {WAIT_WINDOW}s",
+        "# TYPE superset_celery_queue_started_tasks gauge",
+    ]
+    lines += [f'superset_celery_queue_started_tasks{{queue="{queue}"}} {stats["started"]}' for queue, stats in metrics.items()]
+    lines += [
+        f"# HELP superset_celery_queue_wait_seconds Publish-to-start wait of the tasks started in the last {WAIT_WINDOW}s",
+        "# TYPE superset_celery_queue_wait_seconds gauge",
+    ]
+    for queue, stats in metrics.items():
+        for q, wait in stats["wait_quantiles"].items():
+            lines.append(f'superset_celery_queue_wait_seconds{{queue="{queue}",quantile="{q}"}} {wait}')
+    lines += [
+        f"# HELP superset_celery_queue_wait_max_seconds Longest wait of the tasks started in the last {WAIT_WINDOW}s",
+        "# TYPE superset_celery_queue_wait_max_seconds gauge",
+    ]
+    lines += [f'superset_celery_queue_wait_max_seconds{{queue="{queue}"}} {stats["wait_max"]}' for queue, stats in metrics.items()]
+    return "\n".join(lines) + "\n"
+
+
+celery_metrics_blueprint = Blueprint("manufacturing_celery_metrics", __name__)
+
+
+@celery_metrics_blueprint.route("/manufacturing/celery-metrics")
+def celery_metrics() -> Response:
+    config = current_app.config
+    try:
+        metrics = queue_metrics(
+            broker_client(config["CELERY_CONFIG"].broker_url), list(config["MANUFACTURING_CELERY_QUEUES"])
+        )
+    except redis.RedisError as e:
+        logger.warning("Could not read the Celery queue metrics: %s", str(e))
+        return Response(f"broker unavailable: {str(e)}\n", status=503, mimetype="text/plain")
+    return Response(render_metrics(metrics), mimetype="text/plain; version=0.0.4")
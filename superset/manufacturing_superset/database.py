@@ -0,0 +1,137 @@
+"""
+Access to the Manufacturing TimescaleDB connection registered in Superset
+The primary takes the MQTT ingest writes; an optional read replica is
+registered next to it so dashboards (and with them the cache warm-up) can be
+provisioned on the replica instead.
+"""
+
+import json
+import logging
+from typing import Any, Dict, List, Mapping, Optional
+from urllib.parse import quote
+
+from sqlalchemy.engine.url import make_url
+from superset.extensions import db
+from superset.models.core import Database
+
+logger = logging.getLogger(__name__)
+
+DATABASE_NAME = "Manufacturing TimescaleDB"
+REPLICA_DATABASE_NAME = "Manufacturing TimescaleDB (read replica)"
+
+
+def get_manufacturing_database(database_name: str = DATABASE_NAME) -> Optional[Database]:
+    return db.session.query(Database).filter_by(database_name=database_name).first()
+
+
+def get_manufacturing_databases() -> List[Database]:
+    """The primary and, if registered, the read replica"""
+    return db.session.query(Database).filter(
+        Database.database_name.in_([DATABASE_NAME, REPLICA_DATABASE_NAME])
+    ).all()
+
+
+def engine_context(database: Database):
+    """The database's SQLAlchemy engine as a context manager (named differently across Superset 3.x/4.x)"""
+    get_engine = getattr(database, "get_sqla_engine_with_context", None) or database.get_sqla_engine
+    return get_engine()
+
+
+def sqlalchemy_uri(settings: Mapping[str, Any], host: str, port: int) -> str:
+    return (
+        f"postgresql://{settings['user']}:{quote(settings['password'], safe='')}"
+        f"@{host}:{port}/{settings['database']}"
+    )
+
+
+def engine_extra(settings: Mapping[str, Any]) -> Dict[str, Any]:
+    """The `extra` of a Manufacturing database: engine params for Superset's create_engine()
+
+    Superset runs chart and SQL Lab queries on NullPool engines, one new
+    connection per query, and passes these params to create_engine() as they
+    are, so pool_size/max_overflow cannot go here (NullPool rejects them):
+    connections are capped by PgBouncer's pool instead. Behind PgBouncer
+    (settings["pgbouncer"]) no `options` startup parameter is sent, as
+    PgBouncer refuses connections that carry one; the statement timeout is
+    then PgBouncer's query_timeout.
+    """
+    connect_args: Dict[str, Any] = {
+        "application_name": settings["application_name"],
+        "connect_timeout": settings["connect_timeout"],
+        # Detect dropped connections during long dashboard queries
+        "keepalives": 1,
+        "keepalives_idle": 30,
+        "keepalives_interval": 10,
+        "keepalives_count": 3,
+    }
+    if settings["statement_timeout_ms"] and not settings["pgbouncer"]:
+        connect_args["options"] = f"-c statement_timeout={int(settings['statement_timeout_ms'])}"
+    return {
+        "allows_virtual_table_explore": True,
+        "engine_params": {
+            "pool_pre_ping": settings["pool_pre_ping"],
+            "pool_recycle": settings["pool_recycle"],
+            "connect_args": connect_args,
+        },
+    }
+
+
+def register_database(database_name: str, uri: str, extra: Dict[str, Any], **flags: bool) -> Database:
+    """Create the database connection, or bring an existing one's host, extra and flags up to date
+
+    Keys of an existing extra that are not managed here (e.g. metadata_cache_timeout
+    set in the UI) are kept.
+    """
+    database = get_manufacturing_database(database_name)
+    if database is None:
+        database = Database(database_name=database_name, sqlalchemy_uri=uri, extra=json.dumps(extra), **flags)
+        db.session.add(database)
+        db.session.commit()
+        logger.info("Registered database connection %s", database_name)
+        return database
+
+    current = json.loads(database.extra or "{}")
+    merged = {**current, **extra}
+    url = make_url(uri)
+    # e.g. MANUFACTURING_DB_HOST switched from TimescaleDB to PgBouncer
+    moved = (database.url_object.host, database.url_object.port) != (url.host, url.port)
+    changed = moved or merged != current or any(getattr(database, flag) != value for flag, value in flags.items())
+    if changed:
+        if moved:
+            database.set_sqlalchemy_uri(uri)
+        database.extra = json.dumps(merged)
+        for flag, value in flags.items():
+            setattr(database, flag, value)
+        db.session.commit()
+        logger.info("Updated engine settings of database connection %s", database_name)
+    return database
+
+
+def register_manufacturing_databases(config: Mapping[str, Any]) -> List[Database]:
+    """Register the primary and, if MANUFACTURING_DB_ENGINE names a replica host, the read replica"""
+    settings = config["MANUFACTURING_DB_ENGINE"]
+    extra = engine_extra(settings)
+    databases = [
+        register_database(
+            DATABASE_NAME,
+            sqlalchemy_uri(settings, settings["host"], settings["port"]),
+            extra,
+            expose_in_sqllab=True,
+            allow_ctas=True,
+            allow_cvas=True,
+            allow_dml=True,
+            allow_run_async=True,
+        )
+    ]
+    if settings.get("replica_host"):
+        databases.append(register_database(
+            REPLICA_DATABASE_NAME,
+            sqlalchemy_uri(settings, settings["replica_host"], settings["replica_port"]),
+            extra,
+            expose_in_sqllab=True,
+            allow_ctas=False,
+            allow_cvas=False,
+            allow_dml=False,
+            allow_run_async=True,
+        ))
+    return databases
@@ -0,0 +1,137 @@
+"""
+Materialized-view refresh orchestration
+Refreshes each materialized view of the Manufacturing TimescaleDB on its own
+Celery beat cadence instead of all of them in one refresh_all_views() call,
+skips the refresh when none of the view's source tables changed since the last
+one, records how long each refresh took, and drops the cached chart results of
+every Superset dataset built on the view afterwards
+"""
+
+import json
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from flask import current_app
+from sqlalchemy import bindparam, delete, text
+from superset.connectors.sqla.models import SqlaTable
+from superset.extensions import cache_manager, celery_app, db
+from superset.models.cache import CacheKey
+
+from manufacturing_superset.database import engine_context, get_manufacturing_database, get_manufacturing_databases
+
+logger = logging.getLogger(__name__)
+
+STATE_CACHE_KEY = "manufacturing:matview_refresh:{view}"
+
+# Cumulative write counters of the source tables; any change means new facts
+SOURCE_CHANGES_SQL = text("""
+    SELECT relname, n_tup_ins + n_tup_upd + n_tup_del AS changes
+    FROM pg_stat_user_tables
+    WHERE relname IN :tables
+""").bindparams(bindparam("tables", expanding=True))
+
+# Views and materialized views that select directly from the given relation
+DEPENDENT_VIEWS_SQL = text("""
+    SELECT DISTINCT dependent.relname
+    FROM pg_depend d
+    JOIN pg_rewrite r ON r.oid = d.objid
+    JOIN pg_class dependent ON dependent.oid = r.ev_class
+    WHERE d.refobjid = CAST(:view AS regclass) AND dependent.oid <> d.refobjid
+""")
+
+
+def source_changes(connection, tables: List[str]) -> Dict[str, int]:
+    return {row.relname: int(row.changes) for row in connection.execute(SOURCE_CHANGES_SQL, {"tables": list(tables)})}
+
+
+def invalidate_dependent_caches(database_ids: List[int], table_names: List[str]) -> int:
+    """Delete the cached chart results of every dataset on the given tables/views
+
+    Relies on STORE_CACHE_KEYS_IN_METADATA_DB so Superset records which cache
+    keys belong to which dataset.
+    """
+    datasets = db.session.query(SqlaTable).filter(
+        SqlaTable.database_id.in_(database_ids),
+        SqlaTable.table_name.in_(table_names),
+    ).all()
+    datasource_uids = [dataset.uid for dataset in datasets]
+    if not datasource_uids:
+        return 0
+
+    cache_keys = [
+        cache_key for (cache_key,) in
+        db.session.query(CacheKey.cache_key).filter(CacheKey.datasource_uid.in_(datasource_uids)).all()
+    ]
+    if cache_keys:
+        cache_manager.data_cache.delete_many(*cache_keys)
+        cache_manager.cache.delete_many(*cache_keys)
+        db.session.execute(delete(CacheKey).where(CacheKey.cache_key.in_(cache_keys)))
+        db.session.commit()
+    return len(cache_keys)
+
+
+def record_refresh_metric(connection, view_name: str, duration_s: float) -> None:
+    """Log the refresh in system_metrics, like refresh_all_views() does (best effort)"""
+    try:
+        with connection.begin():
+            connection.execute(
+                text("""
+                    INSERT INTO system_metrics(metric_type, metric_name, metric_value, metric_unit, service_name)
+                    VALUES ('maintenance', 'view_refresh_seconds', :duration, 'seconds', :service)
+                """),
+                {"duration": duration_s, "service": f"materialized_view_refresh:{view_name}"},
+            )
+    except Exception as e:
+        logger.warning("Could not record refresh of %s in system_metrics: %s", view_name, str(e))
+
+
+@celery_app.task(name="manufacturing.refresh_materialized_view", soft_time_limit=900)
+def refresh_materialized_view(view_name: str, force: bool = False) -> Dict[str, Any]:
+    """Refresh one materialized view if its source tables changed (or force), then invalidate its caches"""
+    policy = current_app.config["MANUFACTURING_MATERIALIZED_VIEWS"][view_name]
+    state_key = STATE_CACHE_KEY.format(view=view_name)
+    previous: Dict[str, Any] = cache_manager.cache.get(state_key) or {}
+    result: Dict[str, Any] = {"view": view_name, "refreshed": False}
+
+    database = get_manufacturing_database()
+    if database is None:
+        logger.error("Cannot refresh %s: Manufacturing database is not registered", view_name)
+        return dict(result, error="database not registered")
+
+    with engine_context(database) as engine, engine.connect() as connection:
+        changes = source_changes(connection, policy["sources"])
+        if not force and changes and changes == previous.get("source_changes"):
+            logger.info("Skipping refresh of %s: source tables unchanged", view_name)
+            return dict(result, skipped="sources unchanged")
+
+        started = time.perf_counter()
+        with connection.begin():
+            # Another worker may still be refreshing this view; never queue a second refresh behind it
+            locked = connection.execute(
+                text("SELECT pg_try_advisory_xact_lock(hashtext(:view))"), {"view": view_name}
+            ).scalar()
+            if not locked:
+                logger.info("Skipping refresh of %s: already being refreshed", view_name)
+                return dict(result, skipped="refresh in progress")
+            connection.execute(text(f'REFRESH MATERIALIZED VIEW CONCURRENTLY "{view_name}"'))
+        duration_s = round(time.perf_counter() - started, 3)
+
+        dependents = [row.relname for row in connection.execute(DEPENDENT_VIEWS_SQL, {"view": view_name})]
+        record_refresh_metric(connection, view_name, duration_s)
+
+    # Datasets on the read replica show the refreshed view too, once it has replayed the refresh
+    invalidated = invalidate_dependent_caches(
+        [registered.id for registered in get_manufacturing_databases()], [view_name] + dependents
+    )
+    result.update(
+        refreshed=True,
+        refreshed_at=datetime.now(timezone.utc).isoformat(),
+        duration_s=duration_s,
+        dependents=dependents,
+        cache_keys_invalidated=invalidated,
+    )
+    cache_manager.cache.set(state_key, dict(result, source_changes=changes), timeout=0)
+    logger.info("Refreshed materialized view: %s", json.dumps(result))
+    return result
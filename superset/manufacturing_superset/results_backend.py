@@ -0,0 +1,265 @@
+"""
+Size-bounded SQL Lab results backends
+Async SQL Lab queries run on the Celery workers and leave their result in
+RESULTS_BACKEND, from which the web workers serve it (SQL Lab fetches at most
+DISPLAY_MAX_ROW rows at a time). Superset already hands the backend a
+zlib-compressed Arrow (columnar) payload when RESULTS_BACKEND_USE_MSGPACK is
+on; these backends only bound what is kept: a single result larger than
+max_entry_bytes is refused, and once all results exceed max_bytes the least
+recently read ones are evicted.
+
+Configured in superset_config.py:
+    RESULTS_BACKEND = BoundedRedisResultsBackend(host=..., db=2, max_bytes=2 * 1024 ** 3)
+    RESULTS_BACKEND = BoundedDiskResultsBackend('/app/superset_home/sqllab_results', max_bytes=...)
+"""
+
+import hashlib
+import logging
+import os
+import pickle
+import struct
+import tempfile
+import threading
+import time
+from typing import Any, List, Optional, Tuple
+
+from cachelib.base import BaseCache
+from cachelib.redis import RedisCache
+
+logger = logging.getLogger(__name__)
+
+# Evict down to this share of max_bytes, so a full backend does not evict on every write
+EVICTION_LOW_WATERMARK = 0.9
+
+
+class BoundedRedisResultsBackend(RedisCache):
+    """RedisCache with a byte budget; a sorted set orders result keys by last read"""
+
+    def __init__(
+        self,
+        *args: Any,
+        max_bytes: int = 2 * 1024 ** 3,
+        max_entry_bytes: int = 256 * 1024 ** 2,
+        **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        prefix = self.key_prefix
+        self._lru_key = f"{prefix}__lru"
+        self._sizes_key = f"{prefix}__sizes"
+        self._total_key = f"{prefix}__bytes"
+
+    def get(self, key: str) -> Any:
+        value = super().get(key)
+        if value is not None:
+            self._write_client.zadd(self._lru_key, {key: time.time()}, xx=True)
+        return value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        dump = self.serializer.dumps(value)
+        if len(dump) > self.max_entry_bytes:
+            logger.warning(
+                "Not storing SQL Lab result %s: %d bytes exceeds the %d byte limit", key, len(dump), self.max_entry_bytes
+            )
+            return False
+        timeout = self._normalize_timeout(timeout)
+        previous = int(self._read_client.hget(self._sizes_key, key) or 0)
+
+        pipe = self._write_client.pipeline()
+        if timeout == -1:
+            pipe.set(name=self.key_prefix + key, value=dump)
+        else:
+            pipe.setex(name=self.key_prefix + key, value=dump, time=timeout)
+        pipe.zadd(self._lru_key, {key: time.time()})
+        pipe.hset(self._sizes_key, key, len(dump))
+        pipe.incrby(self._total_key, len(dump) - previous)
+        result, _, _, total = pipe.execute()
+
+        if total > self.max_bytes:
+            self._evict(total)
+        return result
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def delete(self, key: str) -> Any:
+        self._forget([key])
+        return super().delete(key)
+
+    def delete_many(self, *keys: str) -> Any:
+        self._forget(list(keys))
+        return super().delete_many(*keys)
+
+    def clear(self) -> Any:
+        result = super().clear()
+        self._write_client.delete(self._lru_key, self._sizes_key, self._total_key)
+        return result
+
+    def _forget(self, keys: List[str]) -> int:
+        """Drop keys from the LRU bookkeeping; returns the bytes they accounted for"""
+        if not keys:
+            return 0
+        sizes = self._read_client.hmget(self._sizes_key, keys)
+        freed = sum(int(size or 0) for size in sizes)
+        pipe = self._write_client.pipeline()
+        pipe.zrem(self._lru_key, *keys)
+        pipe.hdel(self._sizes_key, *keys)
+        pipe.decrby(self._total_key, freed)
+        pipe.execute()
+        return freed
+
+    def _evict(self, total: int) -> None:
+        target = int(self.max_bytes * EVICTION_LOW_WATERMARK)
+        evicted = 0
+        while total > target:
+            oldest = [key.decode() if isinstance(key, bytes) else key
+                      for key in self._read_client.zrange(self._lru_key, 0, 15)]
+            if not oldest:
+                break
+            victims = []
+            for key, size in zip(oldest, self._read_client.hmget(self._sizes_key, oldest)):
+                if total <= target:
+                    break
+                victims.append(key)
+                total -= int(size or 0)
+            self._forget(victims)
+            self._write_client.delete(*(self.key_prefix + key for key in victims))
+            evicted += len(victims)
+        logger.info("Evicted %d SQL Lab results to stay under %d bytes", evicted, self.max_bytes)
+
+
+class BoundedDiskResultsBackend(BaseCache):
+    """One file per result in a directory shared by the web and Celery workers, LRU by mtime
+
+    Each file holds the expiry time followed by the pickled value. Reads bump
+    the file's mtime, so eviction removes the results read least recently.
+    """
+
+    _HEADER = struct.Struct("!d")
+
+    def __init__(
+        self,
+        cache_dir: str,
+        default_timeout: int = 300,
+        max_bytes: int = 2 * 1024 ** 3,
+        max_entry_bytes: int = 256 * 1024 ** 2
+    ):
+        super().__init__(default_timeout)
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        os.makedirs(cache_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        # Running estimate per process; a full directory scan corrects it before evicting
+        self._approx_bytes = sum(size for _, _, size in self._entries())
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, hashlib.sha256(key.encode()).hexdigest())
+
+    def _entries(self) -> List[Tuple[float, str, int]]:
+        entries = []
+        with os.scandir(self.cache_dir) as scan:
+            for entry in scan:
+                if entry.is_file() and not entry.name.startswith("."):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((stat.st_mtime, entry.path, stat.st_size))
+        return entries
+
+    def get(self, key: str) -> Any:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                (expires_at,) = self._HEADER.unpack(f.read(self._HEADER.size))
+                if expires_at and expires_at < time.time():
+                    raise FileNotFoundError(path)
+                value = pickle.load(f)
+            os.utime(path)
+            return value
+        except FileNotFoundError:
+            self._remove(path)
+            return None
+        except (OSError, pickle.PickleError, struct.error, EOFError):
+            logger.warning("Discarding unreadable SQL Lab result %s", key)
+            self._remove(path)
+            return None
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        timeout = self._normalize_timeout(timeout)
+        dump = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if len(dump) > self.max_entry_bytes:
+            logger.warning(
+                "Not storing SQL Lab result %s: %d bytes exceeds the %d byte limit", key, len(dump), self.max_entry_bytes
+            )
+            return False
+        expires_at = time.time() + timeout if timeout else 0.0
+        try:
+            # Write then rename, so readers never see a partial result
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, prefix=".")
+            with os.fdopen(fd, "wb") as f:
+                f.write(self._HEADER.pack(expires_at))
+                f.write(dump)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logger.error("Could not store SQL Lab result %s: %s", key, str(e))
+            return False
+
+        with self._lock:
+            self._approx_bytes += len(dump) + self._HEADER.size
+            over_budget = self._approx_bytes > self.max_bytes
+        if over_budget:
+            self._evict()
+        return True
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> bool:
+        if self.has(key):
+            return False
+        return self.set(key, value, timeout)
+
+    def has(self, key: str) -> bool:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                (expires_at,) = self._HEADER.unpack(f.read(self._HEADER.size))
+            return not expires_at or expires_at >= time.time()
+        except (OSError, struct.error):
+            return False
+
+    def delete(self, key: str) -> bool:
+        return self._remove(self._path(key))
+
+    def clear(self) -> bool:
+        for _, path, _ in self._entries():
+            self._remove(path)
+        with self._lock:
+            self._approx_bytes = 0
+        return True
+
+    def _remove(self, path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _evict(self) -> None:
+        """Delete the least recently read results down to the low watermark"""
+        now = time.time()
+        entries = sorted(self._entries())
+        total = sum(size for _, _, size in entries)
+        target = int(self.max_bytes * EVICTION_LOW_WATERMARK)
+        evicted = 0
+        for _, path, size in entries:
+            if total <= target:
+                break
+            if self._remove(path):
+                total -= size
+                evicted += 1
+        with self._lock:
+            self._approx_bytes = total
+        logger.info("Evicted %d SQL Lab results in %.3fs to stay under %d bytes", evicted, time.time() - now, self.max_bytes)
@@ -0,0 +1,98 @@
+"""
+Two-level data cache: a small in-process LRU (L1) in front of Redis (L2)
+The hottest small results, i.e. KPI tiles polled every 30s by every open
+dashboard, are served from worker memory without a Redis round-trip or an
+unpickle. L1 entries live at most l1_timeout seconds, which bounds how stale
+one worker can be after another worker or the refresh task replaced the
+Redis entry.
+
+Enabled through DATA_CACHE_CONFIG:
+    'CACHE_TYPE': 'manufacturing_superset.tiered_cache.TieredRedisCache',
+    'CACHE_OPTIONS': {'l1_threshold': 256, 'l1_timeout': 10, 'l1_max_bytes': 65536},
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional, Tuple
+
+from flask_caching.backends.rediscache import RedisCache
+
+
+class TieredRedisCache(RedisCache):
+    def __init__(
+        self,
+        *args: Any,
+        l1_threshold: int = 256,
+        l1_timeout: float = 10,
+        l1_max_bytes: int = 64 * 1024,
+        **kwargs: Any
+    ):
+        super().__init__(*args, **kwargs)
+        self.l1_threshold = l1_threshold
+        self.l1_timeout = l1_timeout
+        # Only small serialized results (KPIs, big numbers, short tables) are kept in memory
+        self.l1_max_bytes = l1_max_bytes
+        self._l1: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._l1_lock = threading.Lock()
+        self.l1_hits = 0
+        self.l1_misses = 0
+
+    def _l1_get(self, key: str) -> Tuple[bool, Any]:
+        with self._l1_lock:
+            entry = self._l1.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._l1[key]
+                self.l1_misses += 1
+                return False, None
+            self._l1.move_to_end(key)
+            self.l1_hits += 1
+            return True, entry[1]
+
+    def _l1_put(self, key: str, value: Any, size: int, timeout: Optional[float] = None) -> None:
+        if size > self.l1_max_bytes:
+            return
+        ttl = self.l1_timeout if not timeout else min(self.l1_timeout, timeout)
+        with self._l1_lock:
+            self._l1[key] = (time.monotonic() + ttl, value)
+            self._l1.move_to_end(key)
+            while len(self._l1) > self.l1_threshold:
+                self._l1.popitem(last=False)
+
+    def _l1_discard(self, *keys: str) -> None:
+        with self._l1_lock:
+            for key in keys:
+                self._l1.pop(key, None)
+
+    def get(self, key: str) -> Any:
+        found, value = self._l1_get(key)
+        if found:
+            return value
+        raw = self._read_client.get(self._get_prefix() + key)
+        value = self.serializer.loads(raw)
+        if value is not None:
+            self._l1_put(key, value, len(raw))
+        return value
+
+    def set(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        result = super().set(key, value, timeout=timeout)
+        self._l1_discard(key)
+        return result
+
+    def add(self, key: str, value: Any, timeout: Optional[int] = None) -> Any:
+        self._l1_discard(key)
+        return super().add(key, value, timeout=timeout)
+
+    def delete(self, key: str) -> Any:
+        self._l1_discard(key)
+        return super().delete(key)
+
+    def delete_many(self, *keys: str) -> Any:
+        self._l1_discard(*keys)
+        return super().delete_many(*keys)
+
+    def clear(self) -> Any:
+        with self._l1_lock:
+            self._l1.clear()
+        return super().clear()
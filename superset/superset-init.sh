@@ -31,34 +31,24 @@ superset init
 echo "Setting up roles and permissions..."
 superset fab create-permissions
 
-# Create Manufacturing database connection
-echo "Creating Manufacturing database connection..."
+# One-shot bootstrap (Manufacturing database connections, ...); the gunicorn workers and
+# Celery processes find it stamped and skip it
+echo "Bootstrapping Manufacturing Superset..."
 python <<EOF
-import os
-from superset import db
-from superset.models.core import Database
+import sys
 
-# Check if database already exists
-existing_db = db.session.query(Database).filter_by(
-    database_name='Manufacturing TimescaleDB'
-).first()
+from superset.app import create_app
 
-if not existing_db:
-    # Create new database connection
-    manufacturing_db = Database(
-        database_name='Manufacturing TimescaleDB',
-        sqlalchemy_uri=f"postgresql://{os.environ.get('MANUFACTURING_DB_USER', 'postgres')}:{os.environ.get('MANUFACTURING_DB_PASSWORD', 'postgres')}@{os.environ.get('MANUFACTURING_DB_HOST', 'timescaledb')}:5432/{os.environ.get('MANUFACTURING_DB_NAME', 'manufacturing')}",
-        expose_in_sqllab=True,
-        allow_ctas=True,
-        allow_cvas=True,
-        allow_dml=True,
-        allow_multi_schema_metadata_fetch=True,
-    )
-    db.session.add(manufacturing_db)
-    db.session.commit()
-    print("Manufacturing database connection created successfully")
-else:
-    print("Manufacturing database connection already exists")
+app = create_app()
+with app.app_context():
+    from superset import db
+    from manufacturing_superset.bootstrap import StartupTimings, bootstrap_version, run_bootstrap
+
+    # create_app() already ran the bootstrap unless a worker that booted first holds the lock: wait for it
+    outcome = run_bootstrap(db.engine, app.config, StartupTimings(), wait_seconds=120)
+    if outcome not in ("current", "ran"):
+        sys.exit(f"Bootstrap {bootstrap_version(app.config)} did not complete: {outcome}")
+    print(f"Bootstrap {bootstrap_version(app.config)} is current")
 EOF
 
 echo "Superset initialization complete!"
@@ -36,16 +36,239 @@ CACHE_CONFIG = {
 
 DATA_CACHE_CONFIG = CACHE_CONFIG
 
+# Per-dataset/chart cache_timeout values are set by the provisioning tooling from
+# its freshness policy (scripts/superset/cache_policy.py); CACHE_DEFAULT_TIMEOUT
+# only applies to objects without one.
+# Optional in-process L1 cache in front of Redis for the hottest small results (KPI tiles)
+if os.environ.get('DATA_CACHE_L1_ENABLED', 'false').lower() == 'true':
+    DATA_CACHE_CONFIG = {
+        **CACHE_CONFIG,
+        'CACHE_TYPE': 'manufacturing_superset.tiered_cache.TieredRedisCache',
+        'CACHE_OPTIONS': {
+            'l1_threshold': int(os.environ.get('DATA_CACHE_L1_ENTRIES', 256)),
+            'l1_timeout': float(os.environ.get('DATA_CACHE_L1_TIMEOUT', 10)),
+            'l1_max_bytes': int(os.environ.get('DATA_CACHE_L1_MAX_BYTES', 64 * 1024)),
+        },
+    }
+
+# Chart results are pickled, Superset's default. DATA_CACHE_CODEC=zstd (or lz4, none) caches
+# results of DATA_CACHE_ARROW_MIN_ROWS rows or more as compressed Arrow IPC instead
+# (manufacturing_superset.arrow_cache). It trades write and hit latency for Redis memory,
+# per scripts/superset/cache_codec_benchmark.py on the 91-column sample, p50s:
+#     10 rows      1.6x the bytes of pickle, writes 15ms vs 1ms, hits 4.5ms vs 1.1ms
+#     1,000 rows   0.25x the bytes,          writes 20ms vs 1.4ms, hits 5.4ms vs 1.4ms
+#     20,000 rows  0.17x the bytes,          writes 81ms vs 16ms, hits 33ms vs 6ms
+# Opt in when Redis memory, not chart latency, is the constraint; below the threshold
+# results stay pickled, as small Arrow payloads are larger than their pickles.
+DATA_CACHE_CODEC = os.environ.get('DATA_CACHE_CODEC', 'pickle').lower()
+if DATA_CACHE_CODEC != 'pickle':
+    DATA_CACHE_CONFIG = {
+        **DATA_CACHE_CONFIG,
+        'CACHE_TYPE': 'manufacturing_superset.arrow_cache.'
+                      + ('ArrowTieredRedisCache' if DATA_CACHE_CONFIG is not CACHE_CONFIG else 'ArrowRedisCache'),
+        'CACHE_OPTIONS': {
+            **DATA_CACHE_CONFIG.get('CACHE_OPTIONS', {}),
+            'compression': DATA_CACHE_CODEC,
+            'min_rows': int(os.environ.get('DATA_CACHE_ARROW_MIN_ROWS', 1000)),
+        },
+    }
+
+# SQL Lab runs queries asynchronously on the Celery workers (allow_run_async is set on
+# the Manufacturing database); their results land in RESULTS_BACKEND as zlib-compressed
+# Arrow (msgpack) payloads, bounded in size with least-recently-read eviction
+# (manufacturing_superset.results_backend). SQLLAB_RESULTS_BACKEND=disk keeps them in
+# superset_home, which the web and worker containers share, instead of Redis.
+from manufacturing_superset.results_backend import BoundedDiskResultsBackend, BoundedRedisResultsBackend
+
+RESULTS_BACKEND_USE_MSGPACK = True
+SQLLAB_RESULTS_TIMEOUT = int(os.environ.get('SQLLAB_RESULTS_TIMEOUT', 24 * 3600))
+SQLLAB_RESULTS_MAX_BYTES = int(os.environ.get('SQLLAB_RESULTS_MAX_BYTES', 2 * 1024 ** 3))
+SQLLAB_RESULTS_MAX_ENTRY_BYTES = int(os.environ.get('SQLLAB_RESULTS_MAX_ENTRY_BYTES', 256 * 1024 ** 2))
+if os.environ.get('SQLLAB_RESULTS_BACKEND', 'redis').lower() == 'disk':
+    RESULTS_BACKEND = BoundedDiskResultsBackend(
+        os.environ.get('SQLLAB_RESULTS_DIR', '/app/superset_home/sqllab_results'),
+        default_timeout=SQLLAB_RESULTS_TIMEOUT,
+        max_bytes=SQLLAB_RESULTS_MAX_BYTES,
+        max_entry_bytes=SQLLAB_RESULTS_MAX_ENTRY_BYTES,
+    )
+else:
+    RESULTS_BACKEND = BoundedRedisResultsBackend(
+        host=os.environ.get('REDIS_HOST', 'superset-redis'),
+        port=int(os.environ.get('REDIS_PORT', 6379)),
+        db=int(os.environ.get('REDIS_SQLLAB_RESULTS_DB', 2)),
+        key_prefix='sqllab_results_',
+        default_timeout=SQLLAB_RESULTS_TIMEOUT,
+        max_bytes=SQLLAB_RESULTS_MAX_BYTES,
+        max_entry_bytes=SQLLAB_RESULTS_MAX_ENTRY_BYTES,
+    )
+
+# Async queries may run for up to 10 minutes on a worker; synchronous ones still time out
+# with the web request. SQL Lab shows DISPLAY_MAX_ROW rows of a result at a time and
+# stores at most SQL_MAX_ROW.
+SQLLAB_ASYNC_TIME_LIMIT_SEC = int(os.environ.get('SQLLAB_ASYNC_TIME_LIMIT_SEC', 600))
+SQLLAB_TIMEOUT = int(os.environ.get('SQLLAB_TIMEOUT', 30))
+DISPLAY_MAX_ROW = int(os.environ.get('SQLLAB_DISPLAY_MAX_ROW', 1000))
+SQL_MAX_ROW = int(os.environ.get('SQLLAB_MAX_ROW', 100000))
+
+# Manufacturing TimescaleDB connection, registered on startup with these settings in its
+# `extra` (manufacturing_superset.database). Superset opens a new connection per chart or
+# SQL Lab query (NullPool), so pool sizing belongs to PgBouncer: point MANUFACTURING_DB_HOST/
+# PORT at PgBouncer (transaction pooling, default_pool_size/reserve_pool_size sized for the
+# gunicorn + Celery concurrency) and set MANUFACTURING_DB_PGBOUNCER=true, which drops the
+# `options` startup parameter PgBouncer rejects; its query_timeout then replaces
+# statement_timeout. With MANUFACTURING_DB_REPLICA_HOST set, a read-only
+# "Manufacturing TimescaleDB (read replica)" connection is registered as well; dashboards
+# provisioned on it (automated-dashboard-creator.py --database) and their cache warm-ups
+# stay off the primary that the MQTT ingest writes to.
+MANUFACTURING_DB_ENGINE = {
+    'user': os.environ.get('MANUFACTURING_DB_USER', 'postgres'),
+    'password': os.environ.get('MANUFACTURING_DB_PASSWORD', 'postgres'),
+    'database': os.environ.get('MANUFACTURING_DB_NAME', 'manufacturing'),
+    'host': os.environ.get('MANUFACTURING_DB_HOST', 'timescaledb'),
+    'port': int(os.environ.get('MANUFACTURING_DB_PORT', 5432)),
+    'replica_host': os.environ.get('MANUFACTURING_DB_REPLICA_HOST'),
+    'replica_port': int(os.environ.get('MANUFACTURING_DB_REPLICA_PORT', os.environ.get('MANUFACTURING_DB_PORT', 5432))),
+    'pgbouncer': os.environ.get('MANUFACTURING_DB_PGBOUNCER', 'false').lower() == 'true',
+    'pool_pre_ping': os.environ.get('MANUFACTURING_DB_POOL_PRE_PING', 'true').lower() == 'true',
+    'pool_recycle': int(os.environ.get('MANUFACTURING_DB_POOL_RECYCLE', 1800)),
+    'statement_timeout_ms': int(os.environ.get('MANUFACTURING_DB_STATEMENT_TIMEOUT_MS', 120000)),
+    'connect_timeout': int(os.environ.get('MANUFACTURING_DB_CONNECT_TIMEOUT', 10)),
+    'application_name': os.environ.get('MANUFACTURING_DB_APPLICATION_NAME', 'superset'),
+}
+
+# Cache warm-up (manufacturing_superset.cache_warmup)
+# The charts of the provisioned dashboards are force-refreshed per freshness tier shortly
+# before that tier's cache timeout runs out (a cache hit does not extend it), and all of
+# them just after each shift change
+MANUFACTURING_CACHE_WARMUP_DASHBOARDS = os.environ.get(
+    'CACHE_WARMUP_DASHBOARDS',
+    'manufacturing-overview,production-metrics,quality-analytics,equipment-performance'
+).split(',')
+MANUFACTURING_CACHE_WARMUP_USER = os.environ.get('CACHE_WARMUP_USER', 'admin')
+MANUFACTURING_SHIFT_CHANGES = os.environ.get('MANUFACTURING_SHIFT_CHANGES', '06:00,14:00,22:00').split(',')
+# Cache timeouts of the freshness tiers, as set on the datasets and charts by the provisioning
+# tooling (FRESHNESS_TIERS in scripts/superset/cache_policy.py)
+MANUFACTURING_CACHE_TIERS = {
+    'realtime': 30,
+    'operational': 300,
+    'rollup': 4 * 3600,
+}
+
+def cache_warmup_interval(timeout):
+    """Refresh a fifth of the timeout (at most a minute) before it runs out, to cover the warm-up itself"""
+    return timedelta(seconds=max(1, timeout - min(60, max(5, timeout // 5))))
+
+def tier_warmups():
+    """One forced warm-up beat entry per freshness tier, at that tier's interval"""
+    schedule = {}
+    for tier, timeout in MANUFACTURING_CACHE_TIERS.items():
+        interval = cache_warmup_interval(timeout)
+        schedule[f'manufacturing.warm_dashboard_caches.{tier}'] = {
+            'task': 'manufacturing.warm_dashboard_caches',
+            'schedule': interval,
+            'kwargs': {'tier': tier, 'force': True},
+            # A run still queued when the next one is due would only repeat it
+            'options': {'expires': interval.total_seconds()},
+        }
+    return schedule
+
+def shift_change_warmups():
+    """Beat entries that force-refresh the dashboard caches one minute after each shift change"""
+    schedule = {}
+    for shift_change in MANUFACTURING_SHIFT_CHANGES:
+        hour, minute = (int(part) for part in shift_change.strip().split(':'))
+        minute, hour = (minute + 1) % 60, (hour + (minute + 1) // 60) % 24
+        schedule[f'manufacturing.warm_dashboard_caches.shift_{shift_change.strip()}'] = {
+            'task': 'manufacturing.warm_dashboard_caches',
+            'schedule': crontab(minute=minute, hour=hour),
+            'kwargs': {'force': True},
+        }
+    return schedule
+
+# Materialized-view refresh (manufacturing_superset.matview_refresh)
+# Each view is refreshed on its own cadence, only when its source fact tables changed
+MANUFACTURING_MATERIALIZED_VIEWS = {
+    'view_oee_daily': {
+        'sources': ['fact_production', 'fact_downtime'],
+        'every': timedelta(minutes=5),
+    },
+    'view_scrap_summary': {
+        'sources': ['fact_scrap', 'fact_production'],
+        'every': timedelta(minutes=15),
+    },
+    'view_reliability_summary': {
+        'sources': ['fact_downtime', 'fact_production'],
+        'every': timedelta(minutes=30),
+    },
+}
+
+# Record which cache keys belong to which dataset, so refreshed views can be invalidated
+STORE_CACHE_KEYS_IN_METADATA_DB = True
+
+def materialized_view_refreshes():
+    """One beat entry per materialized view, at that view's cadence"""
+    return {
+        f'manufacturing.refresh_materialized_view.{view_name}': {
+            'task': 'manufacturing.refresh_materialized_view',
+            'schedule': policy['every'],
+            'args': (view_name,),
+        }
+        for view_name, policy in MANUFACTURING_MATERIALIZED_VIEWS.items()
+    }
+
+# Celery queues (manufacturing_superset.celery_queues)
+# Interactive SQL Lab and async chart queries, scheduled reports and background maintenance
+# (warm-ups, view refreshes, pruning) each have their own queue and worker service
+# (docker-compose.superset.yml), so a burst of reports cannot hold the slots interactive
+# queries wait for. A worker consumes the queue named by CELERY_WORKER_QUEUE and takes its
+# concurrency and prefetch from here. Depth and wait time per queue are served at
+# /manufacturing/celery-metrics.
+MANUFACTURING_CELERY_QUEUES = {
+    # One task per process at a time, so a long query never has another waiting behind it
+    'interactive': {
+        'concurrency': int(os.environ.get('CELERY_INTERACTIVE_CONCURRENCY', 4)),
+        'prefetch_multiplier': 1,
+    },
+    'reports': {
+        'concurrency': int(os.environ.get('CELERY_REPORTS_CONCURRENCY', 2)),
+        'prefetch_multiplier': 1,
+    },
+    'maintenance': {
+        'concurrency': int(os.environ.get('CELERY_MAINTENANCE_CONCURRENCY', 2)),
+        'prefetch_multiplier': 2,
+    },
+}
+CELERY_WORKER_QUEUE = os.environ.get('CELERY_WORKER_QUEUE', 'interactive')
+CELERY_WORKER_SETTINGS = MANUFACTURING_CELERY_QUEUES.get(CELERY_WORKER_QUEUE, MANUFACTURING_CELERY_QUEUES['interactive'])
+
+from manufacturing_superset.celery_queues import celery_metrics_blueprint
+
+BLUEPRINTS = [celery_metrics_blueprint]
+
 # Celery configuration
 class CeleryConfig:
     broker_url = f"redis://{os.environ.get('REDIS_HOST', 'superset-redis')}:{os.environ.get('REDIS_PORT', 6379)}/{os.environ.get('REDIS_CELERY_DB', 0)}"
     imports = (
         'superset.sql_lab',
         'superset.tasks',
+        'manufacturing_superset.cache_warmup',
+        'manufacturing_superset.matview_refresh',
+        'manufacturing_superset.celery_queues',
     )
     result_backend = f"redis://{os.environ.get('REDIS_HOST', 'superset-redis')}:{os.environ.get('REDIS_PORT', 6379)}/{os.environ.get('REDIS_RESULTS_DB', 1)}"
-    worker_prefetch_multiplier = 10
+    worker_concurrency = CELERY_WORKER_SETTINGS['concurrency']
+    worker_prefetch_multiplier = CELERY_WORKER_SETTINGS['prefetch_multiplier']
     task_acks_late = True
+    # Exact task names are matched before the patterns; anything unrouted is maintenance
+    task_default_queue = 'maintenance'
+    task_routes = {
+        'sql_lab.*': {'queue': 'interactive'},
+        'load_chart_data_into_cache': {'queue': 'interactive'},
+        'load_explore_json_into_cache': {'queue': 'interactive'},
+        'reports.prune_log': {'queue': 'maintenance'},
+        'reports.*': {'queue': 'reports'},
+        'manufacturing.*': {'queue': 'maintenance'},
+    }
     task_annotations = {
         'sql_lab.get_sql_results': {
             'rate_limit': '100/s',
@@ -60,6 +283,9 @@ class CeleryConfig:
             'task': 'reports.prune_log',
             'schedule': crontab(minute=0, hour=0),
         },
+        **tier_warmups(),
+        **shift_change_warmups(),
+        **materialized_view_refreshes(),
     }
 
 CELERY_CONFIG = CeleryConfig
@@ -131,41 +357,53 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def init_manufacturing_database():
-    """Initialize the manufacturing database connection"""
-    try:
-        from superset.models.core import Database
-        
-        # Check if database already exists
-        existing_db = db.session.query(Database).filter_by(
-            database_name='Manufacturing TimescaleDB'
-        ).first()
-        
-        if not existing_db:
-            # Create new database connection
-            manufacturing_db = Database(
-                database_name='Manufacturing TimescaleDB',
-                sqlalchemy_uri=f"postgresql://{os.environ.get('MANUFACTURING_DB_USER', 'postgres')}:{os.environ.get('MANUFACTURING_DB_PASSWORD', 'postgres')}@{os.environ.get('MANUFACTURING_DB_HOST', 'timescaledb')}:5432/{os.environ.get('MANUFACTURING_DB_NAME', 'manufacturing')}",
-                expose_in_sqllab=True,
-                allow_ctas=True,
-                allow_cvas=True,
-                allow_dml=True,
-                allow_multi_schema_metadata_fetch=True,
-            )
-            db.session.add(manufacturing_db)
-            db.session.commit()
-            logger.info("Manufacturing database connection created successfully")
-    except Exception as e:
-        logger.error(f"Failed to create manufacturing database connection: {str(e)}")
+def init_manufacturing_database(config):
+    """Register the manufacturing database connection(s) with the engine settings of MANUFACTURING_DB_ENGINE"""
+    from manufacturing_superset.database import register_manufacturing_databases
+
+    for database in register_manufacturing_databases(config):
+        logger.info(f"Manufacturing database connection ready: {database.database_name}")
+
+# Startup work done once per deployment, not in every gunicorn worker and Celery process:
+# the first process to boot runs the tasks under a Postgres advisory lock and stamps the
+# version; they run again when the version or one of the settings below changes
+MANUFACTURING_BOOTSTRAP_VERSION = os.getenv('MANUFACTURING_BOOTSTRAP_VERSION', '1')
+MANUFACTURING_BOOTSTRAP_SETTINGS = ('MANUFACTURING_DB_ENGINE',)
+MANUFACTURING_BOOTSTRAP_TASKS = [
+    ('manufacturing_databases', init_manufacturing_database),
+]
 
 # Run initialization after app starts
 from superset.initialization import SupersetAppInitializer
+from manufacturing_superset.bootstrap import StartupTimings, run_bootstrap
 
 class CustomSupersetAppInitializer(SupersetAppInitializer):
+    # Steps of Superset's init_app timed at startup (steps this Superset version lacks are skipped);
+    # init_app_in_ctx includes configure_fab and init_views
+    TIMED_PHASES = (
+        'configure_logging',
+        'setup_db',
+        'configure_celery',
+        'setup_event_logger',
+        'register_blueprints',
+        'configure_middlewares',
+        'configure_cache',
+        'configure_fab',
+        'init_views',
+        'init_app_in_ctx',
+        'post_init',
+    )
+
     def init_app(self):
+        timings = StartupTimings()
+        for phase in self.TIMED_PHASES:
+            if hasattr(self, phase):
+                setattr(self, phase, timings.wrap(phase, getattr(self, phase)))
         super().init_app()
         with self.superset_app.app_context():
-            init_manufacturing_database()
+            with timings.phase('bootstrap'):
+                run_bootstrap(db.engine, self.superset_app.config, timings)
+        timings.log("Superset app initialized")
 
 # Use custom initializer
 APP_INITIALIZER = CustomSupersetAppInitializer
\ No newline at end of file